@@ -77,7 +77,7 @@ const PetFormModal = ({
         new Date(initialFormData.birth_year, initialFormData.birth_month - 1, 15)
     );
 
-    const [photoFile, setPhotoFile] = useState<File | null>(null);
+    const [photoFiles, setPhotoFiles] = useState<File[]>([]);
     const [photoPreview, setPhotoPreview] = useState<string>('');
     const [photoError, setPhotoError] = useState<string | null>(null);
     const fileInputRef = useRef<HTMLInputElement>(null);
@@ -87,7 +87,7 @@ const PetFormModal = ({
             setFormData(initialFormData);
             setBirthDate(new Date(initialFormData.birth_year, initialFormData.birth_month - 1, 15));
             setFormError(null);
-            setPhotoFile(null);
+            setPhotoFiles([]);
             setPhotoPreview('');
             setPhotoError(null);
         }
@@ -112,27 +112,27 @@ const PetFormModal = ({
     };
 
     const handlePhotoChange = (e: React.ChangeEvent<HTMLInputElement>) => {
-        const file = e.target.files?.[0];
-        if (!file) return;
+        const files = Array.from(e.target.files ?? []);
+        if (files.length === 0) return;
 
-        if (file.size > 1024 * 1024 * 2) {
+        if (files.some(file => file.size > 1024 * 1024 * 2)) {
             setPhotoError('Zdjęcie musi być mniejsze niż 2MB');
             return;
         }
 
         setPhotoError(null);
 
-        setPhotoFile(file);
+        setPhotoFiles(files);
 
         const reader = new FileReader();
         reader.onloadend = () => {
             setPhotoPreview(reader.result as string);
         };
-        reader.readAsDataURL(file);
+        reader.readAsDataURL(files[0]);
     };
 
     const handleRemovePhoto = () => {
-        setPhotoFile(null);
+        setPhotoFiles([]);
         setPhotoPreview('');
         setPhotoError(null);
         if (fileInputRef.current) {
@@ -210,9 +210,7 @@ const PetFormModal = ({
 
             formDataToSend.append('json', JSON.stringify(petData));
 
-            if (photoFile) {
-                formDataToSend.append('photo', photoFile);
-            }
+            photoFiles.forEach(file => formDataToSend.append('photo', file));
 
             const response = await postWithAuth('/api/addPet', formDataToSend);
 
@@ -501,6 +499,7 @@ const PetFormModal = ({
                                     <input
                                         type="file"
                                         accept="image/*"
+                                        multiple
                                         ref={fileInputRef}
                                         style={{ display: 'none' }}
                                         onChange={handlePhotoChange}
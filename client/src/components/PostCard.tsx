@@ -84,6 +84,7 @@ const PostCard: React.FC<PostCardProps> = ({
                             <LocationOnIcon color="primary" sx={{ mr: 1, fontSize: '1.1rem' }} />
                             <Typography variant="body2" color="text.secondary">
                                 {post.city}, {post.postal_code}
+                                {post.distance != null && ` (${post.distance} km)`}
                             </Typography>
                         </Box>
                     </Box>
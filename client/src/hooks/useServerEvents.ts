@@ -0,0 +1,35 @@
+import { useEffect, useRef } from 'react';
+
+export type ServerEventType =
+  | 'application_created'
+  | 'application_cancelled'
+  | 'application_accepted'
+  | 'application_declined';
+
+export interface ServerEventData {
+  post_id: number;
+}
+
+type ServerEventHandlers = Partial<Record<ServerEventType, (data: ServerEventData) => void>>;
+
+// One EventSource per mounted component; the browser reconnects on its own
+// and the auth cookie goes along with the request.
+export const useServerEvents = (handlers: ServerEventHandlers) => {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  const eventTypes = Object.keys(handlers).sort().join(',');
+
+  useEffect(() => {
+    const source = new EventSource('/api/events');
+
+    eventTypes.split(',').filter(Boolean).forEach((type) => {
+      source.addEventListener(type, (event) => {
+        const handler = handlersRef.current[type as ServerEventType];
+        handler?.(JSON.parse((event as MessageEvent).data));
+      });
+    });
+
+    return () => source.close();
+  }, [eventTypes]);
+};
@@ -16,7 +16,7 @@ import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 
 import { useNotification } from '../../contexts/NotificationContext';
-import { Post } from '../../types';
+import { DashboardPostsResponse, Post } from '../../types';
 import { getWithAuth, putWithAuth } from '../../utils/auth';
 
 const AdminPostsPage = () => {
@@ -40,18 +40,30 @@ const AdminPostsPage = () => {
         const fetchPosts = async () => {
             setLoading(true);
             try {
-                const response = await getWithAuth('/api/getDashboardPost');
-    
-                if (response.ok) {
-                    const data = await response.json();
-                    if (Array.isArray(data)) {
-                        setPosts(data);
-                        setFilteredPosts(data);
+                const allPosts: Post[] = [];
+                let cursor: string | null = null;
+
+                do {
+                    const queryParams = new URLSearchParams({ limit: '100' });
+                    if (cursor) {
+                        queryParams.set('cursor', cursor);
                     }
-                } else {
-                    console.error('Nie udało się pobrać ogłoszeń');
-                    showNotification('Nie udało się pobrać ogłoszeń', 'error');
-                }
+
+                    const response = await getWithAuth(`/api/getDashboardPost?${queryParams}`);
+
+                    if (!response.ok) {
+                        console.error('Nie udało się pobrać ogłoszeń');
+                        showNotification('Nie udało się pobrać ogłoszeń', 'error');
+                        return;
+                    }
+
+                    const data: DashboardPostsResponse = await response.json();
+                    allPosts.push(...data.post_lst);
+                    cursor = data.next_cursor;
+                } while (cursor);
+
+                setPosts(allPosts);
+                setFilteredPosts(allPosts);
             } catch (error) {
                 console.error('Błąd podczas pobierania ogłoszeń:', error);
                 showNotification('Błąd podczas pobierania ogłoszeń', 'error');
@@ -15,10 +15,11 @@ import {
     CardContent,
     Badge,
 } from '@mui/material';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { Link } from 'react-router-dom';
 
 import { useAuth } from '../../contexts/AuthProvider';
+import { useServerEvents } from '../../hooks/useServerEvents';
 import { getWithAuth } from '../../utils/auth';
 
 const DashboardPage = () => {
@@ -26,19 +27,25 @@ const DashboardPage = () => {
     const theme = useTheme();
     const [applicationCount, setApplicationCount] = useState(0);
 
-    useEffect(() => {
-        const fetchApplicationCount = async () => {
-            try {
-                const response = await getWithAuth('/api/getApplicationsCount');
-                const data = await response.json();
-                setApplicationCount(data.active_applications_cnt);
-            } catch (error) {
-                console.error('Error fetching application count:', error);
-            }
-        };
+    const fetchApplicationCount = useCallback(async () => {
+        try {
+            const response = await getWithAuth('/api/getApplicationsCount');
+            const data = await response.json();
+            setApplicationCount(data.active_applications_cnt);
+        } catch (error) {
+            console.error('Error fetching application count:', error);
+        }
+    }, []);
 
+    useEffect(() => {
         fetchApplicationCount();
-    }, []);
+    }, [fetchApplicationCount]);
+
+    // refetched only when an applicant comes or goes, no polling
+    useServerEvents({
+        application_created: fetchApplicationCount,
+        application_cancelled: fetchApplicationCount,
+    });
 
     return (
         <>
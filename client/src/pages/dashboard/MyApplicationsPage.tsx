@@ -1,11 +1,12 @@
 import SearchIcon from '@mui/icons-material/Search';
 import { Box, Typography, Grid, CircularProgress, Paper, alpha, useTheme, Button } from '@mui/material';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
 
 import BackButton from '../../components/BackButton';
 import PostCard from '../../components/PostCard';
 import { useNotification } from '../../contexts/NotificationContext';
+import { useServerEvents } from '../../hooks/useServerEvents';
 import { MyPostsResponse, Post } from '../../types';
 import { getWithAuth } from '../../utils/auth';
 import { convertBackendPosts } from '../../utils/postUtils';
@@ -17,28 +18,33 @@ const MyApplicationsPage = () => {
     const { showNotification } = useNotification();
     const theme = useTheme();
 
-    useEffect(() => {
-        const fetchUserApplications = async () => {
-            setLoading(true);
-            try {
-                const response = await getWithAuth('/api/getMyApplications');
-
-                if (response.ok) {
-                    const data = await response.json() as MyPostsResponse;
-                    setApplications(convertBackendPosts(data.post_lst));
-                } else {
-                    throw new Error('Failed to fetch user applications');
-                }
-            } catch (error) {
-                console.error('Error fetching user applications:', error);
-                showNotification('Nie udało się załadować Twoich aplikacji', 'error');
-            } finally {
-                setLoading(false);
+    const fetchUserApplications = useCallback(async () => {
+        setLoading(true);
+        try {
+            const response = await getWithAuth('/api/getMyApplications');
+
+            if (response.ok) {
+                const data = await response.json() as MyPostsResponse;
+                setApplications(convertBackendPosts(data.post_lst));
+            } else {
+                throw new Error('Failed to fetch user applications');
             }
-        };
+        } catch (error) {
+            console.error('Error fetching user applications:', error);
+            showNotification('Nie udało się załadować Twoich aplikacji', 'error');
+        } finally {
+            setLoading(false);
+        }
+    }, [showNotification]);
 
+    useEffect(() => {
         fetchUserApplications();
-    }, [showNotification]);
+    }, [fetchUserApplications]);
+
+    useServerEvents({
+        application_accepted: fetchUserApplications,
+        application_declined: fetchUserApplications,
+    });
 
 
     const handlePostClick = (postId: number) => {
@@ -19,7 +19,7 @@ import BackButton from '../../components/BackButton';
 import CitySearchSelect from '../../components/CitySearchSelect';
 import PostCard from '../../components/PostCard';
 import { useNotification } from '../../contexts/NotificationContext';
-import { Post } from '../../types';
+import { DashboardPostsResponse, Post } from '../../types';
 import { getWithAuth } from '../../utils/auth';
 import { validateNumber } from '../../utils/validation';
 
@@ -42,7 +42,9 @@ const SearchPostsPage = () => {
     });
 
     const [posts, setPosts] = useState<Post[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [kilometersError, setKilometersError] = useState<string | null>(null);
     const [cityError, setCityError] = useState<string | null>(null);
 
@@ -67,7 +69,9 @@ const SearchPostsPage = () => {
             const queryParams = new URLSearchParams({
                 city: searchModel.city,
                 postal_code: searchModel.postal_code,
-                kms: searchModel.kms.toString()
+                kms: searchModel.kms.toString(),
+                sort: 'distance',
+                photo_size: '96'
             });
 
             setSearchParams(queryParams);
@@ -78,18 +82,48 @@ const SearchPostsPage = () => {
                 throw new Error('Nie udało się pobrać ogłoszeń');
             }
 
-            const data = await response.json();
-            setPosts(data);
+            const data: DashboardPostsResponse = await response.json();
+            setPosts(data.post_lst);
+            setNextCursor(data.next_cursor);
 
         } catch (err) {
             showNotification('Nie udało się pobrać ogłoszeń. Spróbuj ponownie.', 'error');
             console.error('Błąd podczas pobierania ogłoszeń:', err);
             setPosts([]);
+            setNextCursor(null);
         } finally {
             setLoading(false);
         }
     }, [kilometersError, searchModel, setSearchParams, showNotification]);
 
+    const fetchMorePosts = async () => {
+        if (!nextCursor) {
+            return;
+        }
+
+        setLoadingMore(true);
+
+        try {
+            const queryParams = new URLSearchParams(searchParams);
+            queryParams.set('cursor', nextCursor);
+
+            const response = await getWithAuth(`/api/getDashboardPost?${queryParams}`);
+
+            if (!response.ok) {
+                throw new Error('Nie udało się pobrać ogłoszeń');
+            }
+
+            const data: DashboardPostsResponse = await response.json();
+            setPosts(prev => [...prev, ...data.post_lst]);
+            setNextCursor(data.next_cursor);
+        } catch (err) {
+            showNotification('Nie udało się pobrać kolejnych ogłoszeń. Spróbuj ponownie.', 'error');
+            console.error('Błąd podczas pobierania ogłoszeń:', err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
 
     useEffect(() => {
         if (searchParams.has('city') && searchParams.has('postal_code')) {
@@ -347,6 +381,20 @@ const SearchPostsPage = () => {
                             ))}
                         </Grid>
                     )}
+
+                    {nextCursor && (
+                        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 4 }}>
+                            <Button
+                                variant="outlined"
+                                color="secondary"
+                                onClick={fetchMorePosts}
+                                disabled={loadingMore}
+                                sx={{ borderRadius: '24px', textTransform: 'none', px: 4 }}
+                            >
+                                {loadingMore ? <CircularProgress size={24} /> : 'Pokaż więcej'}
+                            </Button>
+                        </Box>
+                    )}
                 </>
             )}
         </Box>
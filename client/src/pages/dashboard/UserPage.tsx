@@ -6,6 +6,8 @@ import PetsIcon from '@mui/icons-material/Pets';
 import StarIcon from '@mui/icons-material/Star';
 import {
     Box,
+    Button,
+    CircularProgress,
     Typography,
     Card,
     CardContent,
@@ -35,7 +37,9 @@ import { getWithAuth } from '../../utils/auth';
 interface UserResponse {
     user: User;
     pets: Pet[];
+    pets_next_cursor: string | null;
     ratings: IRating[];
+    ratings_next_cursor: string | null;
 }
 
 const UserPage = () => {
@@ -46,6 +50,8 @@ const UserPage = () => {
     const { showNotification } = useNotification();
     const [anchorEl, setAnchorEl] = useState<null | HTMLElement>(null);
     const [reportModalOpen, setReportModalOpen] = useState(false);
+    const [loadingMorePets, setLoadingMorePets] = useState(false);
+    const [loadingMoreRatings, setLoadingMoreRatings] = useState(false);
 
     const handleMenuClick = (event: React.MouseEvent<HTMLElement>) => {
         setAnchorEl(event.currentTarget);
@@ -87,6 +93,62 @@ const UserPage = () => {
         }
     }, [userId, showNotification]);
 
+    const fetchMorePets = async () => {
+        if (!userDetails?.pets_next_cursor) {
+            return;
+        }
+
+        setLoadingMorePets(true);
+
+        try {
+            const queryParams = new URLSearchParams({ cursor: userDetails.pets_next_cursor });
+            const response = await getWithAuth(`/api/user/${userId}/pets?${queryParams}`);
+
+            if (!response.ok) {
+                throw new Error('Nie udało się pobrać zwierząt');
+            }
+
+            const data: { pets: Pet[]; next_cursor: string | null } = await response.json();
+            setUserDetails(prev => prev && {
+                ...prev,
+                pets: [...prev.pets, ...data.pets],
+                pets_next_cursor: data.next_cursor,
+            });
+        } catch {
+            showNotification('Nie udało się pobrać kolejnych zwierząt. Spróbuj ponownie.', 'error');
+        } finally {
+            setLoadingMorePets(false);
+        }
+    };
+
+    const fetchMoreRatings = async () => {
+        if (!userDetails?.ratings_next_cursor) {
+            return;
+        }
+
+        setLoadingMoreRatings(true);
+
+        try {
+            const queryParams = new URLSearchParams({ cursor: userDetails.ratings_next_cursor });
+            const response = await getWithAuth(`/api/user/${userId}/ratings?${queryParams}`);
+
+            if (!response.ok) {
+                throw new Error('Nie udało się pobrać opinii');
+            }
+
+            const data: { ratings: IRating[]; next_cursor: string | null } = await response.json();
+            setUserDetails(prev => prev && {
+                ...prev,
+                ratings: [...prev.ratings, ...data.ratings],
+                ratings_next_cursor: data.next_cursor,
+            });
+        } catch {
+            showNotification('Nie udało się pobrać kolejnych opinii. Spróbuj ponownie.', 'error');
+        } finally {
+            setLoadingMoreRatings(false);
+        }
+    };
+
     if (loading) {
         return (
             <Container maxWidth="lg" sx={{ py: { xs: 2, md: 4 } }}>
@@ -151,7 +213,7 @@ const UserPage = () => {
         );
     }
 
-    const { user, pets, ratings } = userDetails;
+    const { user, pets, pets_next_cursor, ratings, ratings_next_cursor } = userDetails;
 
     if (user.is_banned) {
         return (
@@ -366,7 +428,7 @@ const UserPage = () => {
                     }}
                 >
                     <PetsIcon sx={{ mr: 1, fontSize: 36 }} />
-                    Zwierzęta ({pets?.length || 0})
+                    Zwierzęta ({user.pet_count ?? pets?.length ?? 0})
                 </Typography>
 
                 <Divider />
@@ -379,6 +441,19 @@ const UserPage = () => {
                             <PetCard pet={pet} size="medium" />
                         </Grid>
                     ))}
+                    {pets_next_cursor && (
+                        <Grid item xs={12} sx={{ display: 'flex', justifyContent: 'center' }}>
+                            <Button
+                                variant="outlined"
+                                color="secondary"
+                                onClick={fetchMorePets}
+                                disabled={loadingMorePets}
+                                sx={{ borderRadius: '24px', textTransform: 'none', px: 4 }}
+                            >
+                                {loadingMorePets ? <CircularProgress size={24} /> : 'Pokaż więcej'}
+                            </Button>
+                        </Grid>
+                    )}
                 </Grid>
             ) : (
                 <Paper
@@ -410,7 +485,7 @@ const UserPage = () => {
                     }}
                 >
                     <StarIcon sx={{ mr: 1, fontSize: 36 }} />
-                    Opinie ({ratings?.length || 0})
+                    Opinie ({user.rating_count ?? ratings?.length ?? 0})
                 </Typography>
 
                 <Divider sx={{ mb: 3 }} />
@@ -450,6 +525,19 @@ const UserPage = () => {
                                 </Card>
                             </Grid>
                         ))}
+                        {ratings_next_cursor && (
+                            <Grid item xs={12} sx={{ display: 'flex', justifyContent: 'center' }}>
+                                <Button
+                                    variant="outlined"
+                                    color="secondary"
+                                    onClick={fetchMoreRatings}
+                                    disabled={loadingMoreRatings}
+                                    sx={{ borderRadius: '24px', textTransform: 'none', px: 4 }}
+                                >
+                                    {loadingMoreRatings ? <CircularProgress size={24} /> : 'Pokaż więcej'}
+                                </Button>
+                            </Grid>
+                        )}
                     </Grid>
                 ) : (
                     <Paper
@@ -7,6 +7,7 @@ export interface Pet {
     birth_date: string;
     creation_date: string;
     photo?: string;
+    photos?: string[];
     description?: string;
 }
 
@@ -29,6 +30,12 @@ export interface Post {
     status?: string;
     pending_applications?: number;
     is_active?: boolean;
+    distance?: number | null;
+}
+
+export interface DashboardPostsResponse {
+    post_lst: Post[];
+    next_cursor: string | null;
 }
 
 export interface MyPostsResponse {
@@ -58,7 +65,10 @@ export interface User {
     city: string;
     postal_code: string;
     rating?: number;
+    rating_count?: number;
+    pet_count?: number;
     photo?: string;
+    photos?: string[];
     description?: string;
     is_banned?: boolean;
 }
@@ -7,6 +7,13 @@ export default defineConfig({
   server: {
     allowedHosts: true,
     proxy: {
+      // Server-Sent Events go to the gevent workers, listed before '/api' to win
+      '/api/events': {
+        target: 'http://localhost:5001',
+        changeOrigin: true,
+        secure: false,
+        rewrite: (path) => path.replace(/^\/api/, ''),
+      },
       '/api': {
         target: 'http://localhost:5000',
         changeOrigin: true,
@@ -23,6 +30,12 @@ export default defineConfig({
   },
   preview: {
     proxy: {
+      '/api/events': {
+        target: 'http://events:5001',
+        changeOrigin: true,
+        secure: false,
+        rewrite: (path) => path.replace(/^\/api/, ''),
+      },
       '/api': {
         target: 'http://backend:5000',
         changeOrigin: true,
@@ -7,8 +7,12 @@ CREATE DATABASE petbuddies;
 -- Create schema for project
 CREATE SCHEMA IF NOT EXISTS petbuddies_schema;
 
--- Ensure the schema is used
-SET search_path TO petbuddies_schema;
+-- Ensure the schema is used (public holds the cube/earthdistance functions)
+SET search_path TO petbuddies_schema, public;
+
+-- Great-circle distance support for the location indexes
+CREATE EXTENSION IF NOT EXISTS cube SCHEMA public;
+CREATE EXTENSION IF NOT EXISTS earthdistance SCHEMA public;
 
 -- Create the User table
 CREATE TABLE petbuddies_schema."User" (
@@ -27,7 +31,13 @@ CREATE TABLE petbuddies_schema."User" (
     "email" VARCHAR(255) NOT NULL UNIQUE,
     "description" TEXT,
     "is_banned" BOOLEAN NOT NULL DEFAULT false,
-    "is_admin" BOOLEAN NOT NULL DEFAULT false
+    "is_admin" BOOLEAN NOT NULL DEFAULT false,
+    "latitude" FLOAT,
+    "longitude" FLOAT,
+    "rating_count" INTEGER NOT NULL DEFAULT 0,
+    "rating_sum" INTEGER NOT NULL DEFAULT 0,
+    "pending_applications" INTEGER NOT NULL DEFAULT 0,
+    "version" INTEGER NOT NULL DEFAULT 1
 );
 
 -- Create the Pet table
@@ -46,24 +56,41 @@ CREATE TABLE petbuddies_schema."Pet" (
     CONSTRAINT fk_ownership_user FOREIGN KEY ("user_id") REFERENCES petbuddies_schema."User"("user_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Owner's pets (profile pages, /getMyPets) in pet_id order
+CREATE INDEX ix_pet_user ON petbuddies_schema."Pet" ("user_id", "pet_id");
+
 -- Create the UserPhoto table
 CREATE TABLE petbuddies_schema."UserPhoto" (
     "user_photo_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     "user_id" INTEGER NOT NULL,
     "photo_name" VARCHAR(255) NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'ready',
 
     CONSTRAINT fk_user_photo FOREIGN KEY ("user_id") REFERENCES petbuddies_schema."User"("user_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Photo names are content hashes shared by identical uploads
+CREATE INDEX ix_user_photo_name ON petbuddies_schema."UserPhoto" ("photo_name");
+
+-- Per-user photo lists in upload order (utils/photo_queries.py)
+CREATE INDEX ix_user_photo_user ON petbuddies_schema."UserPhoto" ("user_id", "user_photo_id");
+
 -- Create the PetPhoto table
 CREATE TABLE petbuddies_schema."PetPhoto" (
     "pet_photo_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     "pet_id" INTEGER NOT NULL,
     "photo_name" VARCHAR(255) NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'ready',
 
     CONSTRAINT fk_pet_photo FOREIGN KEY ("pet_id") REFERENCES petbuddies_schema."Pet"("pet_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Photo names are content hashes shared by identical uploads
+CREATE INDEX ix_pet_photo_name ON petbuddies_schema."PetPhoto" ("photo_name");
+
+-- Per-pet photo lists and cover photos in upload order (utils/photo_queries.py)
+CREATE INDEX ix_pet_photo_pet ON petbuddies_schema."PetPhoto" ("pet_id", "pet_photo_id");
+
 -- Create the ReportType table
 CREATE TABLE petbuddies_schema."ReportType" (
     "report_type_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -87,9 +114,25 @@ CREATE TABLE petbuddies_schema."Post" (
     "description" TEXT,
     "cost" NUMERIC(10,2),
     "is_active" BOOLEAN NOT NULL,
+    "latitude" FLOAT,
+    "longitude" FLOAT,
+    "pending_applications" INTEGER NOT NULL DEFAULT 0,
+    "version" INTEGER NOT NULL DEFAULT 1,
     CONSTRAINT fk_post_user FOREIGN KEY ("user_id") REFERENCES petbuddies_schema."User"("user_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Radius search over active posts (earth_box @> ll_to_earth(...))
+CREATE INDEX ix_post_active_location ON petbuddies_schema."Post"
+    USING gist (ll_to_earth("latitude", "longitude"))
+    WHERE "is_active";
+
+-- Active posts without coordinates, matched by the owner's postal code instead
+CREATE INDEX ix_post_active_unlocated ON petbuddies_schema."Post" ("post_id")
+    WHERE "is_active" AND "latitude" IS NULL;
+
+-- Owner's posts (/getMyPosts)
+CREATE INDEX ix_post_user ON petbuddies_schema."Post" ("user_id");
+
 -- Create the AdditionalServicesDict table
 CREATE TABLE petbuddies_schema."AdditionalServicesDict" (
     "additional_services_dict_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -104,11 +147,17 @@ CREATE TABLE petbuddies_schema."MedDocs" (
     "end_date" DATE,
     "validated_date" DATE,
     "doc_type_id" INTEGER NOT NULL,
-    "doc" BYTEA NOT NULL,
+    "storage_key" VARCHAR(255) NOT NULL UNIQUE,
+    "file_name" VARCHAR(255) NOT NULL,
+    "content_type" VARCHAR(255) NOT NULL,
+    "size" BIGINT NOT NULL,
     CONSTRAINT fk_meddocs_pet FOREIGN KEY ("pet_id") REFERENCES petbuddies_schema."Pet"("pet_id") ON UPDATE CASCADE ON DELETE CASCADE,
     CONSTRAINT fk_meddocs_doctype FOREIGN KEY ("doc_type_id") REFERENCES petbuddies_schema."MedDocDict"("doc_type_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Documents of a pet, newest first
+CREATE INDEX ix_meddocs_pet ON petbuddies_schema."MedDocs" ("pet_id", "start_date" DESC);
+
 -- Create the PetCare table
 CREATE TABLE petbuddies_schema."PetCare" (
     "petcare_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -118,6 +167,10 @@ CREATE TABLE petbuddies_schema."PetCare" (
     CONSTRAINT fk_petcare_pet FOREIGN KEY ("pet_id") REFERENCES petbuddies_schema."Pet"("pet_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Pets of a post, and posts of a pet (caregiver access to medical documents)
+CREATE INDEX ix_petcare_post ON petbuddies_schema."PetCare" ("post_id", "pet_id");
+CREATE INDEX ix_petcare_pet ON petbuddies_schema."PetCare" ("pet_id");
+
 -- Create the PetCareApplication table
 CREATE TABLE petbuddies_schema."PetCareApplication" (
     "petcareapplication_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -130,6 +183,20 @@ CREATE TABLE petbuddies_schema."PetCareApplication" (
     CONSTRAINT fk_petcareapplication_user FOREIGN KEY ("user_id") REFERENCES petbuddies_schema."User"("user_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- An applicant on a post (apply, cancel, decline, accept, viewer's application)
+CREATE INDEX ix_application_post_user ON petbuddies_schema."PetCareApplication" ("post_id", "user_id");
+
+-- Applicant's own applications (/getMyApplications)
+CREATE INDEX ix_application_user ON petbuddies_schema."PetCareApplication" ("user_id");
+
+-- Applications the owner still sees (/getPost/<id>/applications)
+CREATE INDEX ix_application_post_open ON petbuddies_schema."PetCareApplication" ("post_id")
+    WHERE NOT "cancelled";
+
+-- The accepted caregiver of a post (post detail, /getMyPosts status)
+CREATE INDEX ix_application_post_accepted ON petbuddies_schema."PetCareApplication" ("post_id")
+    WHERE "accepted";
+
 -- Create the CareAgreement table
 -- CREATE TABLE petbuddies_schema."CareAgreement" (
 --    "care_agreement_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -157,6 +224,16 @@ CREATE TABLE petbuddies_schema."Report" (
     CONSTRAINT fk_report_type FOREIGN KEY ("report_type_id") REFERENCES petbuddies_schema."ReportType"("report_type_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Last report of one user on another (the 3 day limit in /user/<id>/report)
+CREATE INDEX ix_report_who_whom_date ON petbuddies_schema."Report" ("who_user_id", "whom_user_id", "report_date", "report_time");
+
+-- Reports on a user (closed when the user is banned)
+CREATE INDEX ix_report_whom ON petbuddies_schema."Report" ("whom_user_id");
+
+-- Admin queue of reports not looked at yet
+CREATE INDEX ix_report_open ON petbuddies_schema."Report" ("report_id")
+    WHERE NOT "was_considered";
+
 -- Create the UserRating table
 CREATE TABLE petbuddies_schema."UserRating" (
     "user_rating_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -168,6 +245,12 @@ CREATE TABLE petbuddies_schema."UserRating" (
     CONSTRAINT fk_rating_user FOREIGN KEY ("user_id") REFERENCES petbuddies_schema."User"("user_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Ratings of a user, newest first (paginated on the profile)
+CREATE INDEX ix_user_rating_user ON petbuddies_schema."UserRating" ("user_id", "user_rating_id" DESC);
+
+-- "Already rated" checks per accepted application
+CREATE INDEX ix_user_rating_application ON petbuddies_schema."UserRating" ("petcareapplication_id");
+
 
 -- Create the AdditionalServices table
 CREATE TABLE petbuddies_schema."AdditionalServices" (
@@ -181,6 +264,43 @@ CREATE TABLE petbuddies_schema."AdditionalServices" (
     CONSTRAINT fk_additionalservices_service FOREIGN KEY ("additional_service_id") REFERENCES petbuddies_schema."AdditionalServicesDict"("additional_services_dict_id") ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- Create the Outbox table (mails written with the change that causes them)
+CREATE TABLE petbuddies_schema."Outbox" (
+    "outbox_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    "recipient" VARCHAR(255) NOT NULL,
+    "subject" VARCHAR(255) NOT NULL,
+    "body" TEXT NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'pending',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "next_attempt_at" TIMESTAMP NOT NULL DEFAULT now(),
+    "created_at" TIMESTAMP NOT NULL DEFAULT now(),
+    "sent_at" TIMESTAMP,
+    "last_error" TEXT
+);
+
+-- The worker only ever scans what is still to be sent
+CREATE INDEX ix_outbox_pending ON petbuddies_schema."Outbox" ("next_attempt_at")
+    WHERE "status" = 'pending';
+
+-- Create the SchemaMigration table (server/migrations, `flask schema upgrade`)
+CREATE TABLE petbuddies_schema."SchemaMigration" (
+    "version" VARCHAR(255) PRIMARY KEY,
+    "applied_at" TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- This file already creates the schema the migrations lead to
+INSERT INTO petbuddies_schema."SchemaMigration" ("version") VALUES
+    ('0001_location'),
+    ('0002_photo_status'),
+    ('0003_photo_names'),
+    ('0004_meddocs_in_storage'),
+    ('0005_rating_aggregates'),
+    ('0006_pending_applications'),
+    ('0007_outbox'),
+    ('0008_route_indexes'),
+    ('0009_versions'),
+    ('0010_unlocated_posts');
+
 -- Create the Postal Codes Dictionary table
 CREATE TABLE petbuddies_schema."DPostalCode" (
     "postal_code_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
@@ -202,6 +322,16 @@ FROM '/var/lib/postgresql/data_files/users.csv'
 DELIMITER ','
 CSV HEADER;
 
+-- Fill in user coordinates from the postal codes dictionary
+UPDATE petbuddies_schema."User" u
+SET "latitude" = pc."latitude", "longitude" = pc."longitude"
+FROM (
+    SELECT DISTINCT ON ("postal_code") "postal_code", "latitude", "longitude"
+    FROM petbuddies_schema."DPostalCode"
+    ORDER BY "postal_code", "postal_code_id"
+) pc
+WHERE pc."postal_code" = u."postal_code";
+
 -- Load pets into database
 COPY petbuddies_schema."Pet" (user_id, pet_name, creation_date, type, race, size, birth_date)
 FROM '/var/lib/postgresql/data_files/pets.csv'
@@ -44,6 +44,9 @@ def create_app(config_class="config.Config"):
     from routes.posts import post_bprt
     from routes.users import user_bprt
     from routes.admins import admin_bprt
+    from routes.storage import storage_bprt
+    from routes.meddocs import meddoc_bprt
+    from routes.events import events_bprt
 
     app.register_blueprint(auth)
     app.register_blueprint(dicts)
@@ -51,5 +54,26 @@ def create_app(config_class="config.Config"):
     app.register_blueprint(post_bprt)
     app.register_blueprint(user_bprt)
     app.register_blueprint(admin_bprt)
+    app.register_blueprint(storage_bprt)
+    app.register_blueprint(meddoc_bprt)
+    app.register_blueprint(events_bprt)
+
+    from commands import (
+        photos_cli,
+        ratings_cli,
+        applications_cli,
+        outbox_cli,
+        reference_cli,
+        dto_cli,
+        schema_cli,
+    )
+
+    app.cli.add_command(photos_cli)
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(applications_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(reference_cli)
+    app.cli.add_command(dto_cli)
+    app.cli.add_command(schema_cli)
 
     return app
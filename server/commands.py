@@ -0,0 +1,370 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, time as day_time
+from decimal import Decimal
+
+import click
+import sqlalchemy
+from PIL import Image
+from flask import current_app
+from flask.cli import AppGroup
+
+from app import db
+from db_models.database_tables import (
+    User,
+    Post,
+    Pet,
+    PetCareApplication,
+    UserRating,
+    UserPhoto,
+    PetPhoto,
+    PHOTO_READY,
+)
+from db_dto.compiled import CompiledDumpMixin
+from db_dto.pet_dto import get_pets_dto
+from db_dto.post_dto import create_post_dto, get_users_dto
+from db_dto.rating_dto import user_ratings_dto
+from utils.file_storage import upload_object, read_object, object_exists
+from utils.migrations import apply_migrations
+from utils.outbox import send_batch
+from utils.reference_snapshot import build_snapshot
+from utils.utils_photo import process_image, resize_image, resize_image_variants
+
+photos_cli = AppGroup("photos", help="Maintenance of stored photos.")
+ratings_cli = AppGroup("ratings", help="Maintenance of the rating aggregates.")
+applications_cli = AppGroup(
+    "applications", help="Maintenance of the pending application counters."
+)
+outbox_cli = AppGroup("outbox", help="Delivery of the queued mails.")
+reference_cli = AppGroup("reference", help="Snapshot of the reference tables.")
+dto_cli = AppGroup("dto", help="Checks of the compiled DTO serializers.")
+schema_cli = AppGroup("schema", help="Versioned migrations of petbuddies_schema.")
+
+
+@photos_cli.command("rebuild-variants")
+def rebuild_variants():
+    """Create the missing size variants of photos uploaded before they existed.
+
+    Only the default size was stored for those photos, so it is the source:
+    smaller variants are resized from it, larger ones get its bytes as they
+    are, since upscaling would only re-encode the same pixels. Variants that
+    already exist are left alone.
+    """
+    default_size = current_app.config["PHOTO_DEFAULT_SIZE"]
+    sizes = [s for s in current_app.config["PHOTO_VARIANTS"] if s != default_size]
+
+    for model, filepath in ((UserPhoto, "user_photo"), (PetPhoto, "pet_photo")):
+        photo_names = (
+            db.session.query(model.photo_name)
+            .filter(model.status == PHOTO_READY)
+            .distinct()
+            .all()
+        )
+
+        rebuilt = 0
+        for (photo_name,) in photo_names:
+            missing = [
+                size for size in sizes if not object_exists(filepath, photo_name, size)
+            ]
+            if not missing:
+                continue
+
+            source = read_object(filepath, photo_name)
+            smaller = [size for size in missing if size < default_size]
+            if smaller:
+                for size, data in process_image(source, smaller).items():
+                    upload_object(data, filepath, photo_name, size)
+            for size in missing:
+                if size > default_size:
+                    upload_object(source, filepath, photo_name, size)
+            rebuilt += 1
+
+        click.echo(f"{filepath}: {rebuilt} of {len(photo_names)} photos rebuilt")
+
+
+def _write_sample_photo(path, width, height):
+    image = Image.radial_gradient("L").resize((width, height)).convert("RGB")
+    image.save(path, "JPEG", quality=90)
+
+
+def _in_child(function, *args):
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return pool.submit(function, *args).result()
+
+
+def _photo_peak_rss(path, image, sizes):
+    """Run one resize path on `image`, return (rss before, peak rss, seconds).
+
+    ru_maxrss only ever grows (and a child starts from its parent's value),
+    so every path gets a fresh process of a parent that stays small.
+    """
+    resize = {
+        # a full-resolution decode per variant, how photos used to be resized
+        "old": lambda: [resize_image(image, (size, size)) for size in sizes],
+        "draft": lambda: resize_image_variants(image, sizes),
+    }[path]
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    resize()
+    elapsed = time.perf_counter() - started
+    return before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed
+
+
+@photos_cli.command("benchmark")
+@click.option("--image", type=click.Path(exists=True, dir_okay=False))
+@click.option("--width", default=8000, show_default=True)
+@click.option("--height", default=6000, show_default=True)
+def benchmark_photos(image, width, height):
+    """Compare peak memory of the old full decode and the draft decode.
+
+    Uses `--image` or a generated JPEG of `--width` x `--height` pixels.
+    """
+    sizes = current_app.config["PHOTO_VARIANTS"]
+    generated = None
+    if image is None:
+        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as generated:
+            pass
+        image = generated.name
+
+    try:
+        if generated is not None:
+            _in_child(_write_sample_photo, image, width, height)
+        with Image.open(image) as img:
+            click.echo(f"{image}: {img.format} {img.width}x{img.height}")
+        for path in ("old", "draft"):
+            before, peak, elapsed = _in_child(_photo_peak_rss, path, image, sizes)
+            # ru_maxrss is in kilobytes on Linux
+            click.echo(
+                f"{path}: peak RSS {peak / 1024:.0f} MB "
+                f"(+{(peak - before) / 1024:.0f} MB while resizing), "
+                f"{elapsed * 1000:.0f} ms"
+            )
+    finally:
+        if generated is not None:
+            os.remove(generated.name)
+
+
+@ratings_cli.command("recount")
+def recount_ratings():
+    """Recompute rating_count/rating_sum of every user from UserRating."""
+    ratings = (
+        db.session.query(
+            UserRating.user_id,
+            sqlalchemy.func.count().label("rating_count"),
+            sqlalchemy.func.sum(UserRating.star_number).label("rating_sum"),
+        )
+        .group_by(UserRating.user_id)
+        .subquery()
+    )
+
+    fixed = (
+        db.session.query(User)
+        .filter(
+            User.user_id == ratings.c.user_id,
+            sqlalchemy.or_(
+                User.rating_count != ratings.c.rating_count,
+                User.rating_sum != ratings.c.rating_sum,
+            ),
+        )
+        .update(
+            {
+                User.rating_count: ratings.c.rating_count,
+                User.rating_sum: ratings.c.rating_sum,
+            },
+            synchronize_session=False,
+        )
+    )
+
+    # users whose every rating is gone
+    fixed += (
+        db.session.query(User)
+        .filter(
+            User.rating_count != 0,
+            ~sqlalchemy.exists().where(UserRating.user_id == User.user_id),
+        )
+        .update({User.rating_count: 0, User.rating_sum: 0}, synchronize_session=False)
+    )
+
+    db.session.commit()
+    click.echo(f"{fixed} users fixed")
+
+
+@applications_cli.command("recount")
+def recount_applications():
+    """Recompute the pending application counters of posts and their owners."""
+    post_pending = sqlalchemy.func.coalesce(
+        sqlalchemy.select(sqlalchemy.func.count())
+        .where(
+            PetCareApplication.post_id == Post.post_id,
+            # NULL counts as False, as in is_pending()
+            PetCareApplication.declined.isnot(True),
+            PetCareApplication.cancelled.isnot(True),
+            PetCareApplication.accepted.isnot(True),
+        )
+        .scalar_subquery(),
+        0,
+    )
+    fixed_posts = (
+        db.session.query(Post)
+        .filter(Post.pending_applications != post_pending)
+        .update({Post.pending_applications: post_pending}, synchronize_session=False)
+    )
+
+    user_pending = sqlalchemy.func.coalesce(
+        sqlalchemy.select(sqlalchemy.func.sum(Post.pending_applications))
+        .where(Post.user_id == User.user_id, Post.is_active == True)
+        .scalar_subquery(),
+        0,
+    )
+    fixed_users = (
+        db.session.query(User)
+        .filter(User.pending_applications != user_pending)
+        .update({User.pending_applications: user_pending}, synchronize_session=False)
+    )
+
+    db.session.commit()
+    click.echo(f"{fixed_posts} posts and {fixed_users} users fixed")
+
+
+@outbox_cli.command("run")
+@click.option("--once", is_flag=True, help="Send what is due and exit.")
+def run_outbox(once):
+    """Send the mails queued in the Outbox table, in batches."""
+    while True:
+        try:
+            sent = send_batch()
+        except sqlalchemy.exc.SQLAlchemyError:
+            db.session.rollback()
+            current_app.logger.exception("Outbox batch failed")
+            sent = 0
+
+        # a full batch means there may be more waiting
+        if sent < current_app.config["OUTBOX_BATCH_SIZE"]:
+            if once:
+                break
+            time.sleep(current_app.config["OUTBOX_POLL_INTERVAL"])
+
+
+@reference_cli.command("build-snapshot")
+def build_reference_snapshot():
+    """Rebuild the reference snapshot, running workers pick it up on restart."""
+    path = current_app.config["REFERENCE_SNAPSHOT_PATH"]
+    build_snapshot(path)
+    click.echo(f"Reference snapshot written to {path}")
+
+
+def _sample_rows(count):
+    """Unsaved rows with every kind of value the DTOs see, None included."""
+    return {
+        "users": [
+            User(
+                user_id=i,
+                name=f"Imię {i}",
+                surname="Żółć" if i % 2 else None,
+                city="Kraków",
+                postal_code="30-001",
+                description=None if i % 3 else "Lubię psy.",
+                is_banned=i % 11 == 0,
+                is_admin=i % 50 == 0,
+                rating_count=i % 7,
+                rating_sum=(i % 7) * 4,
+            )
+            for i in range(count)
+        ],
+        "posts": [
+            Post(
+                post_id=i,
+                user_id=i % 100,
+                start_date=date(2025, 1, 1 + i % 28),
+                end_date=date(2025, 2, 1 + i % 28),
+                start_time=day_time(8, i % 60),
+                end_time=day_time(18, 30, i % 60),
+                description=None if i % 4 else "Opieka nad kotem",
+                cost=Decimal(f"{i % 500}.50") if i % 5 else None,
+                is_active=bool(i % 2),
+            )
+            for i in range(count)
+        ],
+        "pets": [
+            Pet(
+                pet_id=i,
+                pet_name=f"Burek {i}",
+                type="pies",
+                race="kundel",
+                size=None if i % 3 else "duży",
+                birth_date=date(2020, 1 + i % 12, 1) if i % 2 else None,
+                description="Łagodny",
+            )
+            for i in range(count)
+        ],
+        "ratings": [
+            UserRating(
+                user_rating_id=i,
+                petcareapplication_id=i,
+                user_id=i % 100,
+                description=f"Opinia {i}",
+                star_number=1 + i % 5,
+            )
+            for i in range(count)
+        ],
+    }
+
+
+def _best_time(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@dto_cli.command("benchmark")
+@click.option("--rows", default=10000, show_default=True)
+def benchmark_dto(rows):
+    """Compare the compiled dumps with marshmallow, output and speed."""
+    samples = _sample_rows(rows)
+    schemas = [
+        ("users", get_users_dto),
+        ("posts", create_post_dto),
+        ("pets", get_pets_dto),
+        ("ratings", user_ratings_dto),
+    ]
+
+    for name, schema in schemas:
+        objs = samples[name]
+        # skips the mixin, i.e. the plain marshmallow dump
+        marshmallow_dump = lambda: super(CompiledDumpMixin, schema).dump(
+            objs, many=True
+        )
+        compiled_dump = lambda: schema.dump(objs, many=True)
+
+        same = current_app.json.dumps(marshmallow_dump()) == current_app.json.dumps(
+            compiled_dump()
+        )
+        marshmallow_time = _best_time(marshmallow_dump)
+        compiled_time = _best_time(compiled_dump)
+        click.echo(
+            f"{name}: marshmallow {marshmallow_time * 1000:.1f} ms, "
+            f"compiled {compiled_time * 1000:.1f} ms "
+            f"({marshmallow_time / compiled_time:.1f}x), "
+            f"{'identical' if same else 'DIFFERENT'} output"
+        )
+
+
+@schema_cli.command("upgrade")
+def upgrade_schema():
+    """Apply the migrations in server/migrations an existing database lacks."""
+    applied = apply_migrations(db.engine)
+    for version in applied:
+        click.echo(f"Applied {version}")
+    if not applied:
+        click.echo("Schema is up to date")
@@ -0,0 +1,134 @@
+import datetime
+import decimal
+import keyword
+
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+
+# field class -> (type whose values need no conversion, conversion of such a value)
+# any other value goes through the field's own _serialize, like in marshmallow
+_FAST_PATHS = {
+    fields.Integer: (int, "{v}"),
+    fields.Float: (float, "{v}"),
+    fields.String: (str, "{v}"),
+    fields.Boolean: (bool, "{v}"),
+    fields.Date: (datetime.date, "{v}.isoformat()"),
+    fields.Time: (datetime.time, "{v}.isoformat()"),
+    fields.DateTime: (datetime.datetime, "{v}.isoformat()"),
+    # Decimal(str(v)) of a Decimal is an equal Decimal that prints the same
+    fields.Decimal: (decimal.Decimal, "{v}"),
+}
+_ISO_FORMATS = (None, "iso", "iso8601")
+
+
+def _fast_path(field):
+    fast_path = _FAST_PATHS.get(type(field))
+    if fast_path is None or getattr(field, "as_string", False):
+        return None
+    if isinstance(field, fields.DateTime) and field.format not in _ISO_FORMATS:
+        return None
+    if isinstance(field, fields.Decimal) and field.places is not None:
+        return None
+    return fast_path
+
+
+def compile_dump(schema):
+    """Generate a function dumping one object the way `schema.dump` does.
+
+    Attributes the model class defines are read directly, which is only
+    done for instances of exactly that class; anything else goes through
+    marshmallow. Returns None for schemas it cannot reproduce exactly (dump
+    hooks, custom attribute access, nested attributes, fields reading the
+    whole object).
+    """
+    model = schema.opts.model
+    if (
+        schema._has_processors(PRE_DUMP)
+        or schema._has_processors(POST_DUMP)
+        or type(schema).get_attribute is not Schema.get_attribute
+        or schema.dict_class is not dict
+        or model is None
+    ):
+        return None
+
+    namespace = {"missing": missing, "fallback": schema._serialize, "model": model}
+    lines = [
+        "def dump(obj):",
+        "    if obj.__class__ is not model:",
+        "        return fallback(obj)",
+        "    ret = {}",
+    ]
+
+    for index, (attr_name, field) in enumerate(schema.dump_fields.items()):
+        attribute = field.attribute if field.attribute is not None else attr_name
+        key = field.data_key if field.data_key is not None else attr_name
+        if "." in attribute or not field._CHECK_ATTRIBUTE:
+            return None
+
+        serialize = f"serialize_{index}"
+        namespace[serialize] = field._serialize
+        namespace[f"default_{index}"] = field.dump_default
+        value = f"v{index}"
+
+        fast_path = _fast_path(field)
+        if fast_path is None:
+            expression = f"{serialize}({value}, {attr_name!r}, obj)"
+        else:
+            fast_type, conversion = fast_path
+            namespace[f"type_{index}"] = fast_type
+            expression = (
+                f"{conversion.format(v=value)} if {value}.__class__ is type_{index} "
+                f"else None if {value} is None "
+                f"else {serialize}({value}, {attr_name!r}, obj)"
+            )
+
+        if (
+            hasattr(model, attribute)
+            and attribute.isidentifier()
+            and not keyword.iskeyword(attribute)
+        ):
+            lines.append(f"    {value} = obj.{attribute}")
+            lines.append(f"    ret[{key!r}] = {expression}")
+            continue
+
+        lines.append(f"    {value} = getattr(obj, {attribute!r}, missing)")
+        if field.dump_default is not missing:
+            lines.append(f"    if {value} is missing:")
+            lines.append(
+                f"        {value} = default_{index}() "
+                f"if callable(default_{index}) else default_{index}"
+            )
+        lines.append(f"    if {value} is not missing:")
+        lines.append(f"        ret[{key!r}] = {expression}")
+
+    lines.append("    return ret")
+    # marshmallow takes an attribute raising AttributeError for a missing one
+    lines[1:] = ["    try:"] + ["    " + line for line in lines[1:]]
+    lines += ["    except AttributeError:", "        return fallback(obj)"]
+    source = "\n".join(lines)
+    exec(compile(source, f"<dump {type(schema).__name__}>", "exec"), namespace)
+    namespace["dump"].source = source
+    return namespace["dump"]
+
+
+class CompiledDumpMixin:
+    """Schema mixin replacing the generic `dump` with a generated one.
+
+    The function is generated on the first dump of every schema instance and
+    falls back to marshmallow where it cannot give the same output. Loading
+    is untouched. `flask dto benchmark` compares both paths.
+    """
+
+    _compiled_dump = None
+
+    def dump(self, obj, *, many=None):
+        dump_one = self._compiled_dump
+        if dump_one is None:
+            dump_one = self._compiled_dump = compile_dump(self) or False
+        if dump_one is False:
+            return super().dump(obj, many=many)
+
+        many = self.many if many is None else bool(many)
+        if many and obj is not None:
+            return [dump_one(item) for item in obj]
+        return dump_one(obj)
@@ -0,0 +1,24 @@
+from app import ma
+from db_dto.compiled import CompiledDumpMixin
+from db_models.database_tables import MedDocs
+
+
+class MedDocDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = MedDocs
+        load_instance = True
+        exclude = ("storage_key",)
+
+    meddoc_id = ma.auto_field(dump_only=True)
+    pet_id = ma.auto_field(dump_only=True)
+    doc_type_id = ma.auto_field(required=True)
+    start_date = ma.auto_field(required=True)
+    end_date = ma.auto_field(allow_none=True)
+    validated_date = ma.auto_field(dump_only=True)
+    file_name = ma.auto_field(dump_only=True)
+    content_type = ma.auto_field(dump_only=True)
+    size = ma.auto_field(dump_only=True)
+
+
+meddoc_dto = MedDocDTO()
+meddocs_dto = MedDocDTO(many=True)
@@ -1,8 +1,9 @@
 from app import ma
+from db_dto.compiled import CompiledDumpMixin
 from db_models.database_tables import Pet
 
 
-class CreatePetDTO(ma.SQLAlchemyAutoSchema):
+class CreatePetDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Pet
         load_instance = True
@@ -1,10 +1,11 @@
 from marshmallow import fields
 
 from app import ma
+from db_dto.compiled import CompiledDumpMixin
 from db_models.database_tables import Post, PetCare, User, Pet
 
 
-class CreatePetCareDTO(ma.SQLAlchemyAutoSchema):
+class CreatePetCareDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = PetCare
         load_instance = True
@@ -14,10 +15,16 @@ class CreatePetCareDTO(ma.SQLAlchemyAutoSchema):
     pet_id = ma.auto_field(required=True)
 
 
-class CreatePostDTO(ma.SQLAlchemyAutoSchema):
+class CreatePostDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Post
         load_instance = True
+        exclude = (
+            "latitude",
+            "longitude",
+            "pending_applications",
+            "version",
+        )
 
     post_id = ma.auto_field(dump_only=True)
     user_id = ma.auto_field()
@@ -33,7 +40,7 @@ class CreatePostDTO(ma.SQLAlchemyAutoSchema):
     pet_list = fields.List(fields.Dict, allow_none=True, load_only=True)
 
 
-class PostPageUserDTO(ma.SQLAlchemyAutoSchema):
+class PostPageUserDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
         load_instance = True
@@ -46,6 +53,12 @@ class PostPageUserDTO(ma.SQLAlchemyAutoSchema):
             "login",
             "password_hash",
             "email",
+            "latitude",
+            "longitude",
+            "rating_count",
+            "rating_sum",
+            "pending_applications",
+            "version",
         )
 
     user_id = ma.auto_field(dump_only=True)
@@ -60,7 +73,7 @@ class PostPageUserDTO(ma.SQLAlchemyAutoSchema):
     rating = fields.Float(allow_none=True)
 
 
-class PostPetDTO(ma.SQLAlchemyAutoSchema):
+class PostPetDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Pet
         load_instance = True
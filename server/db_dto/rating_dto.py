@@ -1,8 +1,9 @@
 from app import ma
+from db_dto.compiled import CompiledDumpMixin
 from db_models.database_tables import UserRating
 
 
-class UserRatingDTO(ma.SQLAlchemyAutoSchema):
+class UserRatingDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = UserRating
         load_instance = True
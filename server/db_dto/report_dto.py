@@ -1,9 +1,10 @@
 from app import ma
+from db_dto.compiled import CompiledDumpMixin
 from db_models.database_tables import Report, ReportType
 from marshmallow import fields
 
 
-class CreateReportDTO(ma.SQLAlchemyAutoSchema):
+class CreateReportDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Report
         load_instance = True
@@ -15,7 +16,7 @@ class CreateReportDTO(ma.SQLAlchemyAutoSchema):
     description = ma.auto_field(allow_none=True)
 
 
-class AdminReportDto(ma.SQLAlchemyAutoSchema):
+class AdminReportDto(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Report
         load_instance = True
@@ -1,10 +1,11 @@
 from marshmallow import fields
 
 from app import ma
+from db_dto.compiled import CompiledDumpMixin
 from db_models.database_tables import User
 
 
-class CreateUserDTO(ma.SQLAlchemyAutoSchema):
+class CreateUserDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
         load_instance = True
@@ -18,6 +19,12 @@ class CreateUserDTO(ma.SQLAlchemyAutoSchema):
             "join_date",
             "is_banned",
             "description",
+            "latitude",
+            "longitude",
+            "rating_count",
+            "rating_sum",
+            "pending_applications",
+            "version",
         )
 
     user_id = ma.auto_field(dump_only=True, load_only=True)
@@ -29,7 +36,7 @@ class CreateUserDTO(ma.SQLAlchemyAutoSchema):
     is_admin = ma.auto_field(default=False, dump_only=True)
 
 
-class EditUserDTO(ma.SQLAlchemyAutoSchema):
+class EditUserDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
         load_instance = True
@@ -42,6 +49,12 @@ class EditUserDTO(ma.SQLAlchemyAutoSchema):
             "join_date",
             "is_banned",
             "is_admin",
+            "latitude",
+            "longitude",
+            "rating_count",
+            "rating_sum",
+            "pending_applications",
+            "version",
         )
 
     user_id = ma.auto_field(dump_only=True)
@@ -57,10 +70,18 @@ class EditUserDTO(ma.SQLAlchemyAutoSchema):
     photo_deleted = fields.Boolean(allow_none=True, load_only=True)
 
 
-class LoginUserDTO(ma.SQLAlchemyAutoSchema):
+class LoginUserDTO(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
         load_instance = True
+        exclude = (
+            "latitude",
+            "longitude",
+            "rating_count",
+            "rating_sum",
+            "pending_applications",
+            "version",
+        )
 
     user_id = ma.auto_field(dump_only=True)
     name = ma.auto_field()
@@ -1,6 +1,17 @@
 from datetime import date, datetime
+
+import sqlalchemy
+from sqlalchemy.ext.hybrid import hybrid_property
+
 from app import db
 
+PHOTO_PENDING = "pending"
+PHOTO_READY = "ready"
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
 
 class User(db.Model):
     __tablename__ = "User"
@@ -22,6 +33,30 @@ class User(db.Model):
     description = db.Column(db.Text, nullable=True)
     is_banned = db.Column(db.Boolean, nullable=False, default=False)
     is_admin = db.Column(db.Boolean, nullable=False, default=False)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+
+    # kept up to date by review_owner, `flask ratings recount` repairs them
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    # pending applications on the user's active posts, see utils/application_counters.py
+    pending_applications = db.Column(db.Integer, nullable=False, default=0)
+    # bumped with every change shown on /user/<id>, see utils/http_cache.py
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    @hybrid_property
+    def rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @rating.expression
+    def rating(cls):
+        return sqlalchemy.case(
+            (
+                cls.rating_count > 0,
+                sqlalchemy.cast(cls.rating_sum, db.Float) / cls.rating_count,
+            ),
+            else_=None,
+        )
 
 
 class Pet(db.Model):
@@ -50,7 +85,8 @@ class UserPhoto(db.Model):
     user_photo_id = db.Column(
         db.Integer, primary_key=True, autoincrement=True, unique=True
     )
-    photo_name = db.Column(db.String(255), nullable=False)
+    photo_name = db.Column(db.String(255), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default=PHOTO_READY)
 
     user_id = db.Column(
         db.Integer, db.ForeignKey("petbuddies_schema.User.user_id", ondelete="CASCADE")
@@ -64,7 +100,8 @@ class PetPhoto(db.Model):
     pet_photo_id = db.Column(
         db.Integer, primary_key=True, autoincrement=True, unique=True
     )
-    photo_name = db.Column(db.String(255), nullable=False)
+    photo_name = db.Column(db.String(255), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default=PHOTO_READY)
 
     pet_id = db.Column(
         db.Integer, db.ForeignKey("petbuddies_schema.Pet.pet_id", ondelete="CASCADE")
@@ -86,6 +123,11 @@ class Post(db.Model):
     description = db.Column(db.Text, nullable=True)
     cost = db.Column(db.Numeric, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    pending_applications = db.Column(db.Integer, nullable=False, default=0)
+    # bumped with every change shown on /getPost/<id>, see utils/http_cache.py
+    version = db.Column(db.Integer, nullable=False, default=1)
 
 
 class PetCare(db.Model):
@@ -121,6 +163,14 @@ class PetCareApplication(db.Model):
     accepted = db.Column(db.Boolean, default=False)
 
 
+class MedDocDict(db.Model):
+    __tablename__ = "MedDocDict"
+    __table_args__ = {"schema": "petbuddies_schema"}
+
+    doc_type_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    doc_name = db.Column(db.String(255), nullable=False)
+
+
 class MedDocs(db.Model):
     __tablename__ = "MedDocs"
     __table_args__ = {"schema": "petbuddies_schema"}
@@ -136,7 +186,11 @@ class MedDocs(db.Model):
         db.Integer,
         db.ForeignKey("petbuddies_schema.MedDocDict.doc_type_id", ondelete="CASCADE"),
     )
-    doc = db.Column(db.LargeBinary, nullable=False)
+    # the file itself lives in object storage under storage_key
+    storage_key = db.Column(db.String(255), nullable=False, unique=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
 
 
 # class CareAgreement(db.Model):
@@ -212,6 +266,22 @@ class ReportType(db.Model):
     report_type_name = db.Column(db.String(255), nullable=False)
 
 
+class Outbox(db.Model):
+    __tablename__ = "Outbox"
+    __table_args__ = {"schema": "petbuddies_schema"}
+
+    outbox_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=OUTBOX_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+
 class DPostalCode(db.Model):
     __tablename__ = "DPostalCode"
     __table_args__ = {"schema": "petbuddies_schema"}
@@ -29,3 +29,27 @@ preload_app = True
 
 # Sync worker class (you can change to 'gevent' or 'eventlet' for async processing)
 worker_class = "sync"
+
+
+def on_starting(server):
+    # the master compiles the reference snapshot once, the forked workers
+    # share its mmapped pages instead of each loading the tables
+    import sqlalchemy
+    from app import db
+    from utils.reference_snapshot import build_snapshot, get_reference_snapshot
+
+    app = server.app.wsgi()
+    with app.app_context():
+        try:
+            build_snapshot(app.config["REFERENCE_SNAPSHOT_PATH"])
+        except sqlalchemy.exc.SQLAlchemyError:
+            # e.g. the database is not up yet; the workers map the previous
+            # snapshot, or build one on first use
+            server.log.exception("Building the reference snapshot failed")
+            db.session.rollback()
+        else:
+            get_reference_snapshot()
+        finally:
+            # no pooled connection may be shared with the workers
+            db.session.remove()
+            db.engine.dispose()
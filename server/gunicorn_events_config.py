@@ -0,0 +1,36 @@
+# Server-Sent Events (/events) only: every open stream is an idle greenlet
+# instead of a blocked sync worker. The rest of the API stays on
+# gunicorn_config.py.
+
+workers = 2
+
+worker_class = "gevent"
+
+# open streams per worker
+worker_connections = 1000
+
+bind = "0.0.0.0:5001"
+
+# streams stay open, only a worker that stops heartbeating is killed
+timeout = 30
+
+# open streams are cut after this on restart, EventSource reconnects
+graceful_timeout = 30
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
+
+daemon = False
+
+# no preload, the app has to be imported after the monkey patching
+preload_app = False
+
+
+def post_worker_init(worker):
+    # imported here, after the worker has monkey patched the stdlib;
+    # psycopg2 is a C extension gevent cannot patch
+    from utils.notifications import make_psycopg2_green
+
+    make_psycopg2_green()
+    worker.wsgi.config["EVENTS_STREAMING"] = True
@@ -0,0 +1,44 @@
+-- Coordinates of users and posts, indexed for the dashboard radius search
+SET LOCAL search_path TO petbuddies_schema, public;
+
+CREATE EXTENSION IF NOT EXISTS cube SCHEMA public;
+CREATE EXTENSION IF NOT EXISTS earthdistance SCHEMA public;
+
+ALTER TABLE petbuddies_schema."User"
+    ADD COLUMN "latitude" FLOAT,
+    ADD COLUMN "longitude" FLOAT;
+
+ALTER TABLE petbuddies_schema."Post"
+    ADD COLUMN "latitude" FLOAT,
+    ADD COLUMN "longitude" FLOAT;
+
+-- Users take the coordinates of their postal code, or of their city when the
+-- code is unknown, as postal_index.locate() does on /edit_user
+UPDATE petbuddies_schema."User" u
+SET "latitude" = pc."latitude", "longitude" = pc."longitude"
+FROM (
+    SELECT DISTINCT ON ("postal_code") "postal_code", "latitude", "longitude"
+    FROM petbuddies_schema."DPostalCode"
+    ORDER BY "postal_code", "postal_code_id"
+) pc
+WHERE pc."postal_code" = u."postal_code";
+
+UPDATE petbuddies_schema."User" u
+SET "latitude" = pc."latitude", "longitude" = pc."longitude"
+FROM (
+    SELECT DISTINCT ON ("place") "place", "latitude", "longitude"
+    FROM petbuddies_schema."DPostalCode"
+    ORDER BY "place", "postal_code_id"
+) pc
+WHERE u."latitude" IS NULL AND pc."place" = u."city";
+
+-- Posts take their owner's, as /createPost does
+UPDATE petbuddies_schema."Post" p
+SET "latitude" = u."latitude", "longitude" = u."longitude"
+FROM petbuddies_schema."User" u
+WHERE u."user_id" = p."user_id";
+
+-- Radius search over active posts (earth_box @> ll_to_earth(...))
+CREATE INDEX ix_post_active_location ON petbuddies_schema."Post"
+    USING gist (ll_to_earth("latitude", "longitude"))
+    WHERE "is_active";
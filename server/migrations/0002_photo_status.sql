@@ -0,0 +1,6 @@
+-- Photos are processed in the background, rows wait as 'pending' until then
+ALTER TABLE petbuddies_schema."UserPhoto"
+    ADD COLUMN "status" VARCHAR(16) NOT NULL DEFAULT 'ready';
+
+ALTER TABLE petbuddies_schema."PetPhoto"
+    ADD COLUMN "status" VARCHAR(16) NOT NULL DEFAULT 'ready';
@@ -0,0 +1,3 @@
+-- Photo names are content hashes shared by identical uploads
+CREATE INDEX ix_user_photo_name ON petbuddies_schema."UserPhoto" ("photo_name");
+CREATE INDEX ix_pet_photo_name ON petbuddies_schema."PetPhoto" ("photo_name");
@@ -0,0 +1,78 @@
+"""Move medical documents from the BYTEA column into object storage."""
+
+import sqlalchemy
+
+from utils.file_storage import get_storage
+
+# documents were stored without a name or type, recognize the common scans
+SIGNATURES = [
+    (b"%PDF", "application/pdf", ".pdf"),
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+]
+
+
+def guess_type(doc):
+    for signature, content_type, extension in SIGNATURES:
+        if doc.startswith(signature):
+            return content_type, extension
+    return "application/octet-stream", ""
+
+
+def upgrade(connection):
+    connection.exec_driver_sql("""
+        ALTER TABLE petbuddies_schema."MedDocs"
+            ADD COLUMN "storage_key" VARCHAR(255) UNIQUE,
+            ADD COLUMN "file_name" VARCHAR(255),
+            ADD COLUMN "content_type" VARCHAR(255),
+            ADD COLUMN "size" BIGINT
+        """)
+
+    storage = get_storage()
+    meddocs = connection.execute(
+        sqlalchemy.text(
+            'SELECT "meddoc_id", "pet_id" FROM petbuddies_schema."MedDocs" '
+            'ORDER BY "meddoc_id"'
+        )
+    ).all()
+
+    # one document in memory at a time; a rerun after a failure overwrites
+    # the same keys
+    for meddoc_id, pet_id in meddocs:
+        doc = bytes(
+            connection.execute(
+                sqlalchemy.text(
+                    'SELECT "doc" FROM petbuddies_schema."MedDocs" '
+                    'WHERE "meddoc_id" = :meddoc_id'
+                ),
+                {"meddoc_id": meddoc_id},
+            ).scalar_one()
+        )
+        content_type, extension = guess_type(doc)
+        storage_key = f"med_docs/{pet_id}/migrated-{meddoc_id}"
+        storage.put(storage_key, doc, content_type)
+
+        connection.execute(
+            sqlalchemy.text(
+                'UPDATE petbuddies_schema."MedDocs" '
+                'SET "storage_key" = :storage_key, "file_name" = :file_name, '
+                '"content_type" = :content_type, "size" = :size '
+                'WHERE "meddoc_id" = :meddoc_id'
+            ),
+            {
+                "storage_key": storage_key,
+                "file_name": f"dokument-{meddoc_id}{extension}",
+                "content_type": content_type,
+                "size": len(doc),
+                "meddoc_id": meddoc_id,
+            },
+        )
+
+    connection.exec_driver_sql("""
+        ALTER TABLE petbuddies_schema."MedDocs"
+            ALTER COLUMN "storage_key" SET NOT NULL,
+            ALTER COLUMN "file_name" SET NOT NULL,
+            ALTER COLUMN "content_type" SET NOT NULL,
+            ALTER COLUMN "size" SET NOT NULL,
+            DROP COLUMN "doc"
+        """)
@@ -0,0 +1,13 @@
+-- Per-user rating aggregates, kept up to date by /rate (see `flask ratings recount`)
+ALTER TABLE petbuddies_schema."User"
+    ADD COLUMN "rating_count" INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN "rating_sum" INTEGER NOT NULL DEFAULT 0;
+
+UPDATE petbuddies_schema."User" u
+SET "rating_count" = r."rating_count", "rating_sum" = r."rating_sum"
+FROM (
+    SELECT "user_id", count(*) AS "rating_count", sum("star_number") AS "rating_sum"
+    FROM petbuddies_schema."UserRating"
+    GROUP BY "user_id"
+) r
+WHERE r."user_id" = u."user_id";
@@ -0,0 +1,26 @@
+-- Pending application counters of posts and of their owners (utils/application_counters.py)
+ALTER TABLE petbuddies_schema."Post"
+    ADD COLUMN "pending_applications" INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE petbuddies_schema."User"
+    ADD COLUMN "pending_applications" INTEGER NOT NULL DEFAULT 0;
+
+UPDATE petbuddies_schema."Post" p
+SET "pending_applications" = a."pending"
+FROM (
+    SELECT "post_id", count(*) AS "pending"
+    FROM petbuddies_schema."PetCareApplication"
+    WHERE "declined" IS NOT TRUE AND "cancelled" IS NOT TRUE AND "accepted" IS NOT TRUE
+    GROUP BY "post_id"
+) a
+WHERE a."post_id" = p."post_id";
+
+UPDATE petbuddies_schema."User" u
+SET "pending_applications" = p."pending"
+FROM (
+    SELECT "user_id", sum("pending_applications") AS "pending"
+    FROM petbuddies_schema."Post"
+    WHERE "is_active"
+    GROUP BY "user_id"
+) p
+WHERE p."user_id" = u."user_id";
@@ -0,0 +1,17 @@
+-- Mails written with the change that causes them, sent by `flask outbox run`
+CREATE TABLE petbuddies_schema."Outbox" (
+    "outbox_id" INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    "recipient" VARCHAR(255) NOT NULL,
+    "subject" VARCHAR(255) NOT NULL,
+    "body" TEXT NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'pending',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "next_attempt_at" TIMESTAMP NOT NULL DEFAULT now(),
+    "created_at" TIMESTAMP NOT NULL DEFAULT now(),
+    "sent_at" TIMESTAMP,
+    "last_error" TEXT
+);
+
+-- The worker only ever scans what is still to be sent
+CREATE INDEX ix_outbox_pending ON petbuddies_schema."Outbox" ("next_attempt_at")
+    WHERE "status" = 'pending';
@@ -0,0 +1,48 @@
+-- Secondary indexes for the queries of routes/*.py (tests/test_query_plans.py)
+
+-- Owner's pets (profile pages, /getMyPets) in pet_id order
+CREATE INDEX ix_pet_user ON petbuddies_schema."Pet" ("user_id", "pet_id");
+
+-- Per-user and per-pet photo lists and cover photos in upload order (utils/photo_queries.py)
+CREATE INDEX ix_user_photo_user ON petbuddies_schema."UserPhoto" ("user_id", "user_photo_id");
+CREATE INDEX ix_pet_photo_pet ON petbuddies_schema."PetPhoto" ("pet_id", "pet_photo_id");
+
+-- Owner's posts (/getMyPosts)
+CREATE INDEX ix_post_user ON petbuddies_schema."Post" ("user_id");
+
+-- Documents of a pet, newest first
+CREATE INDEX ix_meddocs_pet ON petbuddies_schema."MedDocs" ("pet_id", "start_date" DESC);
+
+-- Pets of a post, and posts of a pet (caregiver access to medical documents)
+CREATE INDEX ix_petcare_post ON petbuddies_schema."PetCare" ("post_id", "pet_id");
+CREATE INDEX ix_petcare_pet ON petbuddies_schema."PetCare" ("pet_id");
+
+-- An applicant on a post (apply, cancel, decline, accept, viewer's application)
+CREATE INDEX ix_application_post_user ON petbuddies_schema."PetCareApplication" ("post_id", "user_id");
+
+-- Applicant's own applications (/getMyApplications)
+CREATE INDEX ix_application_user ON petbuddies_schema."PetCareApplication" ("user_id");
+
+-- Applications the owner still sees (/getPost/<id>/applications)
+CREATE INDEX ix_application_post_open ON petbuddies_schema."PetCareApplication" ("post_id")
+    WHERE NOT "cancelled";
+
+-- The accepted caregiver of a post (post detail, /getMyPosts status)
+CREATE INDEX ix_application_post_accepted ON petbuddies_schema."PetCareApplication" ("post_id")
+    WHERE "accepted";
+
+-- Last report of one user on another (the 3 day limit in /user/<id>/report)
+CREATE INDEX ix_report_who_whom_date ON petbuddies_schema."Report" ("who_user_id", "whom_user_id", "report_date", "report_time");
+
+-- Reports on a user (closed when the user is banned)
+CREATE INDEX ix_report_whom ON petbuddies_schema."Report" ("whom_user_id");
+
+-- Admin queue of reports not looked at yet
+CREATE INDEX ix_report_open ON petbuddies_schema."Report" ("report_id")
+    WHERE NOT "was_considered";
+
+-- Ratings of a user, newest first (paginated on the profile)
+CREATE INDEX ix_user_rating_user ON petbuddies_schema."UserRating" ("user_id", "user_rating_id" DESC);
+
+-- "Already rated" checks per accepted application
+CREATE INDEX ix_user_rating_application ON petbuddies_schema."UserRating" ("petcareapplication_id");
@@ -0,0 +1,6 @@
+-- Row versions behind the ETags of posts and profiles (utils/http_cache.py)
+ALTER TABLE petbuddies_schema."User"
+    ADD COLUMN "version" INTEGER NOT NULL DEFAULT 1;
+
+ALTER TABLE petbuddies_schema."Post"
+    ADD COLUMN "version" INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,4 @@
+-- Active posts without coordinates, matched by the owner's postal code on the
+-- dashboard (routes/posts.py get_dashboard_post)
+CREATE INDEX ix_post_active_unlocated ON petbuddies_schema."Post" ("post_id")
+    WHERE "is_active" AND "latitude" IS NULL;
@@ -8,13 +8,15 @@ from db_models.database_tables import (
     Post,
     UserRating,
     Pet,
-    UserPhoto,
-    PetPhoto,
 )
 from db_dto.post_dto import get_user_dto, get_users_dto
 from db_dto.rating_dto import user_rating_dto, user_ratings_dto
 from db_dto.report_dto import admin_report_dto
-from utils.file_storage import generate_presigned_url
+from utils.file_storage import generate_presigned_urls, pick_variant
+from utils.photo_queries import pet_photo_names, user_photo_names
+from utils.events import post_changed, user_changed
+from utils.application_counters import post_deactivated
+from utils.http_cache import bump_version
 
 import sqlalchemy
 from sqlalchemy.orm import aliased
@@ -68,40 +70,16 @@ def get_reports_admin():
     Reporter = aliased(User, name="reporter")
     Reported = aliased(User, name="reported")
 
-    user_rating = (
-        db.session.query(
-            UserRating.user_id,
-            sqlalchemy.func.avg(UserRating.star_number).label("rating"),
-        )
-        .group_by(UserRating.user_id)
-        .subquery()
-    )
-
-    alias_reported_user_rating = sqlalchemy.alias(user_rating)
-    alias_reporter_user_rating = sqlalchemy.alias(user_rating)
-
     report_lst = (
         db.session.query(
             Report,
             Reported,
             Reporter,
             ReportType.report_type_name,
-            alias_reported_user_rating.c.rating,
-            alias_reporter_user_rating.c.rating,
         )
         .join(Reported, Report.whom_user_id == Reported.user_id)
         .join(Reporter, Report.who_user_id == Reporter.user_id)
         .join(ReportType, Report.report_type_id == ReportType.report_type_id)
-        .join(
-            alias_reported_user_rating,
-            alias_reported_user_rating.c.user_id == Report.who_user_id,
-            isouter=True,
-        )
-        .join(
-            alias_reporter_user_rating,
-            alias_reporter_user_rating.c.user_id == Report.whom_user_id,
-            isouter=True,
-        )
         .filter(Report.was_considered == False)
         .all()
     )
@@ -116,16 +94,10 @@ def get_reports_admin():
                     **admin_report_dto.dump(report),
                     "report_type_name": report_type_name,
                 },
-                "reporter_user": {
-                    **get_user_dto.dump(reporter),
-                    "rating": rating_reporter,
-                },
-                "reported_user": {
-                    **get_user_dto.dump(reported),
-                    "rating": rating_reported,
-                },
+                "reporter_user": get_user_dto.dump(reporter),
+                "reported_user": get_user_dto.dump(reported),
             }
-            for report, reported, reporter, report_type_name, rating_reported, rating_reporter in report_lst
+            for report, reported, reporter, report_type_name in report_lst
         ]
     )
 
@@ -140,21 +112,28 @@ def ban_user(user_id):
 
     user = db.session.query(User).filter(User.user_id == user_id).first()
 
-    user_posts = db.session.query(Post).filter(Post.user_id == user_id).all()
+    user_posts = (
+        db.session.query(Post).filter(Post.user_id == user_id).with_for_update().all()
+    )
 
     user_reports = db.session.query(Report).filter(Report.whom_user_id == user_id).all()
 
     try:
         user.is_banned = True
+        # none of the user's posts stays active
+        user.pending_applications = 0
 
         if user_posts:
             for post in user_posts:
                 post.is_active = False
+            bump_version(Post, [post.post_id for post in user_posts])
+        bump_version(User, [user_id])
 
         if user_reports:
             for report in user_reports:
                 report.was_considered = True
         db.session.commit()
+        user_changed.send(user_id)
         return jsonify({"msg": "Użytkownik zbanowany!"}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -176,8 +155,10 @@ def unban_user(user_id):
 
     try:
         user.is_banned = False
+        bump_version(User, [user_id])
 
         db.session.commit()
+        user_changed.send(user_id)
         return jsonify({"msg": "Użytkownik odbanowany!"}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -217,12 +198,17 @@ def remove_post(post_id):
     if not claims.get("is_admin"):
         return jsonify({"msg": "Nie masz dostępu do tej funkcji!"}), 404
 
-    post = db.session.query(Post).filter(Post.post_id == post_id).first()
+    post = (
+        db.session.query(Post).filter(Post.post_id == post_id).with_for_update().first()
+    )
 
     try:
+        post_deactivated(post)
         post.is_active = False
+        bump_version(Post, [post_id])
 
         db.session.commit()
+        post_changed.send(post_id)
         return jsonify({"msg": "Post usunięty!"}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -243,7 +229,6 @@ def get_users_admin():
     subquery_rating = (
         db.session.query(
             UserRating.user_id,
-            sqlalchemy.func.avg(UserRating.star_number).label("rating_overall"),
             sqlalchemy.func.json_agg(
                 sqlalchemy.func.json_build_object(
                     "usr_rating_id",
@@ -279,12 +264,11 @@ def get_users_admin():
                     Pet.birth_date,
                     "description",
                     Pet.description,
-                    "photo",
-                    PetPhoto.photo_name,
+                    "photos",
+                    pet_photo_names(Pet.pet_id),
                 )
             ).label("pet_lst"),
         )
-        .outerjoin(PetPhoto, PetPhoto.pet_id == Pet.pet_id)
         .group_by(Pet.user_id)
         .subquery()
     )
@@ -293,12 +277,10 @@ def get_users_admin():
     users_info_lst = (
         db.session.query(
             User,
-            UserPhoto,
-            alias_subquery_rating.c.rating_overall,
+            user_photo_names(User.user_id),
             alias_subquery_rating.c.rating_lst,
             alias_subquery_pet.c.pet_lst,
         )
-        .outerjoin(UserPhoto, User.user_id == UserPhoto.user_id)
         .outerjoin(
             alias_subquery_rating, User.user_id == alias_subquery_rating.c.user_id
         )
@@ -306,26 +288,40 @@ def get_users_admin():
         .all()
     )
 
+    photo_size = pick_variant(request.args.get("photo_size", None, type=int))
+    user_photo_urls = generate_presigned_urls(
+        "user_photo",
+        {
+            photo
+            for _, user_photo_lst, *_ in users_info_lst
+            for photo in user_photo_lst or []
+        },
+        photo_size,
+    )
+    pet_photo_urls = generate_presigned_urls(
+        "pet_photo",
+        {
+            photo
+            for *_, pet_lst in users_info_lst
+            for pet in pet_lst or []
+            for photo in pet["photos"] or []
+        },
+        photo_size,
+    )
+
     users_resp_lst = []
-    for user, user_photo, rating_overall, rating_lst, pet_lst in users_info_lst:
+    for user, user_photo_lst, rating_lst, pet_lst in users_info_lst:
         user_dict = get_user_dto.dump(user)
         user_dict["photo"] = (
-            generate_presigned_url("user_photo", user_photo.photo_name)
-            if user_photo
-            else ""
-        )
-        user_dict["rating"] = (
-            float(rating_overall) if rating_overall else rating_overall
+            user_photo_urls[user_photo_lst[0]] if user_photo_lst else ""
         )
+        user_dict["photos"] = [user_photo_urls[photo] for photo in user_photo_lst or []]
         user_dict["can_report"] = True
 
         if pet_lst:
             for pet in pet_lst:
-                pet["photo"] = (
-                    generate_presigned_url("pet_photo", pet["photo"])
-                    if pet["photo"]
-                    else ""
-                )
+                pet["photo"] = pet_photo_urls[pet["photos"][0]] if pet["photos"] else ""
+                pet["photos"] = [pet_photo_urls[photo] for photo in pet["photos"] or []]
 
         users_resp_lst.append(
             {
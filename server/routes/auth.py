@@ -1,12 +1,10 @@
-import random
-import string
 import sqlalchemy
 import marshmallow
 import json
 
 from flask import request, jsonify, make_response, Blueprint, redirect, url_for
 from app import db, bcrypt, limiter, ma
-from db_models.database_tables import User, UserPhoto
+from db_models.database_tables import User, UserPhoto, PHOTO_PENDING, PHOTO_READY
 from flask_jwt_extended import (
     jwt_required,
     create_access_token,
@@ -16,7 +14,16 @@ from flask_jwt_extended import (
     unset_jwt_cookies,
 )
 from db_dto.user_dto import create_user_dto, edit_user_dto
-from utils.file_storage import generate_presigned_url, upload_object, delete_object
+from utils.file_storage import generate_presigned_url, generate_presigned_urls
+from utils.photo_pipeline import (
+    discard_staged,
+    release_photo,
+    stage_photos,
+    submit_photos,
+)
+from utils.postal_index import postal_index
+from utils.events import user_changed
+from utils.http_cache import bump_version
 from datetime import timedelta
 
 
@@ -108,7 +115,12 @@ def protected():
     if usr.is_banned:
         return redirect(url_for("routes.logout"))
 
-    photo = UserPhoto.query.filter_by(user_id=get_jwt_identity()).first() or None
+    photo = (
+        UserPhoto.query.filter_by(user_id=get_jwt_identity(), status=PHOTO_READY)
+        .order_by(UserPhoto.user_photo_id)
+        .first()
+        or None
+    )
 
     resp_dict = {
         "name": claims.get("name"),
@@ -138,14 +150,21 @@ def edit_user():
     if not user:
         return jsonify({"msg": "User not found"}), 404
 
-    photo = UserPhoto.query.filter_by(user_id=user_id).first()
+    photos = (
+        UserPhoto.query.filter_by(user_id=user_id)
+        .order_by(UserPhoto.user_photo_id)
+        .all()
+    )
 
     if request.method == "GET":
         user_dict = {**edit_user_dto.dump(user)}
-        if photo:
-            user_dict["file_link"] = generate_presigned_url(
-                "user_photo", photo.photo_name
-            )
+        ready_photos = [
+            photo.photo_name for photo in photos if photo.status == PHOTO_READY
+        ]
+        if ready_photos:
+            photo_urls = generate_presigned_urls("user_photo", ready_photos)
+            user_dict["file_link"] = photo_urls[ready_photos[0]]
+            user_dict["photos"] = [photo_urls[photo] for photo in ready_photos]
         return jsonify(user_dict)
 
     try:
@@ -154,32 +173,59 @@ def edit_user():
             json_data = json.loads(request.form["json"])
 
         if json_data:
+            previous_postal_code = user.postal_code
             edit_user_dto.load(json_data, instance=user, partial=True)
 
-        if json_data.get("photo_deleted", None) and photo:
-            delete_object("user_photo", photo.photo_name)
-            db.session.delete(photo)
-
-        if "photo" in request.files:
-            file = request.files["photo"]
-            if not photo:
-                characters = string.ascii_letters + string.digits
-                while True:
-                    filename = "".join(random.choices(characters, k=20))
-                    resp = UserPhoto.query.filter(
-                        UserPhoto.photo_name.like(f"%filename%")
-                    ).first()
-                    if not resp:
-                        break
-
-                photo_db = UserPhoto(photo_name=filename, user_id=user_id)
-                db.session.add(photo_db)
-            else:
-                filename = photo.photo_name
-
-            upload_object(file, "user_photo", filename)
-
-        db.session.commit()
+            if user.postal_code != previous_postal_code or user.latitude is None:
+                user.latitude, user.longitude = postal_index.locate(
+                    city=user.city, postal_code=user.postal_code
+                ) or (None, None)
+
+        staged_lst = stage_photos(request.files.getlist("photo"))
+
+        try:
+            released_photos = set()
+            added_photos = []
+            if json_data.get("photo_deleted", None) or staged_lst:
+                # an uploaded batch replaces the current photos
+                kept_photos = {staged.name for staged in staged_lst}
+                for photo in photos:
+                    if photo.photo_name not in kept_photos:
+                        released_photos.add(photo.photo_name)
+                        db.session.delete(photo)
+
+                current_photos = {photo.photo_name for photo in photos}
+                for staged in staged_lst:
+                    if staged.name not in current_photos:
+                        photo_db = UserPhoto(
+                            photo_name=staged.name,
+                            user_id=user_id,
+                            status=PHOTO_PENDING,
+                        )
+                        db.session.add(photo_db)
+                        added_photos.append(photo_db)
+
+            bump_version(User, [int(user_id)])
+            db.session.flush()
+            # a re-upload of a photo still pending, e.g. after its processing
+            # was lost, resolves that row if this attempt fails as well
+            staged_names = {staged.name for staged in staged_lst}
+            pending_ids = {
+                photo.photo_name: photo.user_photo_id
+                for photo in photos + added_photos
+                if photo.status == PHOTO_PENDING and photo.photo_name in staged_names
+            }
+            db.session.commit()
+        except Exception:
+            # no row refers to them, nobody else would remove them
+            discard_staged(staged_lst)
+            raise
+        user_changed.send(int(user_id))
+
+        for photo_name in released_photos:
+            release_photo(UserPhoto, "user_photo", photo_name)
+        if staged_lst:
+            submit_photos(staged_lst, UserPhoto, "user_photo", pending_ids)
         return jsonify({"msg": "Zapisano zmiany!"}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -1,32 +1,55 @@
 from flask import jsonify, Blueprint
-from db_models.database_tables import DPostalCode, ReportType
+from db_models.database_tables import MedDocDict
+from utils.place_autocomplete import place_autocomplete
+from utils.http_cache import conditional
+from utils.reference_snapshot import get_reference_snapshot
 
 dicts = Blueprint("dicts", __name__)
 
+# the reference data changes only with a new snapshot, i.e. a restart
+DICT_CACHE_CONTROL = "public, max-age=3600"
+
+
+def snapshot_validator(**view_args):
+    return get_reference_snapshot().meta["checksum"]
+
 
 @dicts.route("/city/<string:place>", methods=["GET"])
+@conditional(snapshot_validator, DICT_CACHE_CONTROL)
 def city(place):
-    places = DPostalCode.query.filter(
-        DPostalCode.postal_code.like(f"%{place}%")
-        if place[0].isnumeric()
-        else DPostalCode.place.like(f"%{place.title()}%")
-    ).all()
     response = [
-        {"place": place.place, "postal_code": place.postal_code} for place in places
+        {"place": place_name, "postal_code": postal_code}
+        for place_name, postal_code in place_autocomplete.suggest(place)
     ]
     return jsonify(response), 200
 
 
 @dicts.route("/getReportTypes", methods=["GET"])
+@conditional(snapshot_validator, DICT_CACHE_CONTROL)
 def get_report_type():
-    report_type_lst = ReportType.query.all()
+    snapshot = get_reference_snapshot()
+
+    response = [
+        {
+            "report_type_id": int(report_type_id),
+            "report_type_name": snapshot.report_type_names.get(index),
+        }
+        for index, report_type_id in enumerate(snapshot["report_type_ids"])
+    ]
+
+    return jsonify(response), 200
+
+
+@dicts.route("/getMedDocTypes", methods=["GET"])
+def get_meddoc_type():
+    doc_type_lst = MedDocDict.query.all()
 
     response = [
         {
-            "report_type_id": report_type.report_type_id,
-            "report_type_name": report_type.report_type_name,
+            "doc_type_id": doc_type.doc_type_id,
+            "doc_name": doc_type.doc_name,
         }
-        for report_type in report_type_lst
+        for doc_type in doc_type_lst
     ]
 
     return jsonify(response), 200
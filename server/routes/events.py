@@ -0,0 +1,44 @@
+import json
+import queue
+
+from flask import jsonify, Blueprint, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from utils.notifications import get_event_listener
+
+events_bprt = Blueprint("events", __name__)
+
+
+@events_bprt.route("/events", methods=["GET"])
+@jwt_required()
+def stream_events():
+    if not current_app.config["EVENTS_STREAMING"]:
+        return jsonify({"msg": "Powiadomienia nie są dostępne na tym serwerze!"}), 404
+
+    user_id = int(get_jwt_identity())
+    heartbeat = current_app.config["EVENTS_HEARTBEAT"]
+    retry = current_app.config["EVENTS_RETRY_MS"]
+    listener = get_event_listener()
+    subscriber = listener.subscribe(user_id)
+
+    # runs after the request context is gone and holds no db connection
+    def generate():
+        yield f"retry: {retry}\n\n"
+        while True:
+            try:
+                event, data = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                # keeps proxies from closing an idle connection
+                yield ": ping\n\n"
+                continue
+
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # also when the client leaves before the first chunk was sent
+    response.call_on_close(lambda: listener.unsubscribe(user_id, subscriber))
+    return response
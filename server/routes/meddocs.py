@@ -0,0 +1,192 @@
+import json
+import os
+import secrets
+from urllib.parse import quote
+
+import marshmallow
+import sqlalchemy
+from flask import request, jsonify, Blueprint, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+
+from app import db
+from db_models.database_tables import Pet, MedDocs, PetCare, PetCareApplication
+from db_dto.meddoc_dto import meddoc_dto, meddocs_dto
+from utils.file_storage import upload_stream, stream_object, delete_file
+
+meddoc_bprt = Blueprint("meddoc", __name__)
+
+
+def can_read_docs(pet, user_id):
+    """Documents are visible to the owner, admins and accepted caregivers."""
+    if pet.user_id == user_id or get_jwt().get("is_admin"):
+        return True
+
+    return (
+        db.session.query(PetCareApplication.petcareapplication_id)
+        .join(PetCare, PetCare.post_id == PetCareApplication.post_id)
+        .filter(
+            PetCare.pet_id == pet.pet_id,
+            PetCareApplication.user_id == user_id,
+            PetCareApplication.accepted == True,
+        )
+        .first()
+        is not None
+    )
+
+
+@meddoc_bprt.route("/pet/<int:pet_id>/medDocs", methods=["POST"])
+@jwt_required()
+def add_meddoc(pet_id):
+    # replaces MAX_CONTENT_LENGTH, the form is not parsed yet
+    request.max_content_length = current_app.config["MEDDOC_MAX_SIZE"]
+    pet = Pet.query.filter(Pet.pet_id == pet_id, Pet.is_deleted == False).first()
+
+    if not pet:
+        return jsonify({"msg": "Zwierzak nie został znaleziony!"}), 404
+
+    if pet.user_id != int(get_jwt_identity()):
+        return jsonify({"msg": "Nie masz dostępu do tej funkcji!"}), 403
+
+    file = request.files.get("doc", None)
+    if "json" not in request.form or not file:
+        return jsonify({"msg": "Wymagane dane nie zostały podane!"}), 400
+
+    try:
+        meddoc = meddoc_dto.load(json.loads(request.form["json"]))
+    except marshmallow.exceptions.ValidationError as ve:
+        return jsonify({"error": ve.messages}), 400
+
+    # werkzeug has already spooled the part to a temp file, it goes on to
+    # storage in multipart chunks without ever being read into memory
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+
+    meddoc.pet_id = pet_id
+    meddoc.storage_key = f"med_docs/{pet_id}/{secrets.token_hex(16)}"
+    meddoc.file_name = (file.filename or "dokument")[:255]
+    meddoc.content_type = file.mimetype or "application/octet-stream"
+    meddoc.size = size
+
+    upload_stream(meddoc.storage_key, stream, meddoc.content_type)
+
+    try:
+        db.session.add(meddoc)
+        db.session.commit()
+        return jsonify(meddoc_dto.dump(meddoc)), 201
+    except sqlalchemy.exc.IntegrityError:
+        db.session.rollback()
+        delete_file(meddoc.storage_key)
+        return jsonify({"msg": "Nie można w tej chwili dodać dokumentu."}), 406
+
+
+@meddoc_bprt.route("/pet/<int:pet_id>/medDocs", methods=["GET"])
+@jwt_required()
+def get_meddocs(pet_id):
+    pet = Pet.query.filter(Pet.pet_id == pet_id).first()
+
+    if not pet:
+        return jsonify({"msg": "Zwierzak nie został znaleziony!"}), 404
+
+    if not can_read_docs(pet, int(get_jwt_identity())):
+        return jsonify({"msg": "Nie masz dostępu do tej funkcji!"}), 403
+
+    meddoc_lst = (
+        MedDocs.query.filter(MedDocs.pet_id == pet_id)
+        .order_by(MedDocs.start_date.desc(), MedDocs.meddoc_id)
+        .all()
+    )
+
+    return jsonify(meddocs_dto.dump(meddoc_lst)), 200
+
+
+@meddoc_bprt.route("/medDocs/<int:meddoc_id>", methods=["GET"])
+@jwt_required()
+def download_meddoc(meddoc_id):
+    result = (
+        db.session.query(MedDocs, Pet)
+        .join(Pet, Pet.pet_id == MedDocs.pet_id)
+        .filter(MedDocs.meddoc_id == meddoc_id)
+        .first()
+    )
+
+    if not result:
+        return jsonify({"msg": "Dokument nie został znaleziony!"}), 404
+
+    meddoc, pet = result
+    if not can_read_docs(pet, int(get_jwt_identity())):
+        return jsonify({"msg": "Nie masz dostępu do tej funkcji!"}), 403
+
+    # storage keys are never reused, so the key is a strong validator
+    etag = meddoc.storage_key.rsplit("/", 1)[-1]
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": (
+            f"attachment; filename*=UTF-8''{quote(meddoc.file_name, safe='')}"
+        ),
+    }
+
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    start, stop = 0, meddoc.size
+    status = 200
+    if_range = request.if_range
+    range_applies = if_range.etag == etag or (
+        if_range.etag is None and if_range.date is None
+    )
+
+    # several ranges would need a multipart/byteranges body, the whole file
+    # is a valid answer to them
+    if request.range and range_applies and len(request.range.ranges) == 1:
+        byte_range = request.range.range_for_length(meddoc.size)
+        if byte_range is None:
+            return Response(
+                status=416, headers={"Content-Range": f"bytes */{meddoc.size}"}
+            )
+
+        start, stop = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{meddoc.size}"
+
+    headers["Content-Length"] = str(stop - start)
+
+    # the generator pulls one chunk from storage per write to the client
+    return Response(
+        stream_object(meddoc.storage_key, start, stop),
+        status=status,
+        headers=headers,
+        mimetype=meddoc.content_type,
+        direct_passthrough=True,
+    )
+
+
+@meddoc_bprt.route("/medDocs/<int:meddoc_id>", methods=["DELETE"])
+@jwt_required()
+def delete_meddoc(meddoc_id):
+    result = (
+        db.session.query(MedDocs, Pet.user_id)
+        .join(Pet, Pet.pet_id == MedDocs.pet_id)
+        .filter(MedDocs.meddoc_id == meddoc_id)
+        .first()
+    )
+
+    if not result:
+        return jsonify({"msg": "Dokument nie został znaleziony!"}), 404
+
+    meddoc, owner_id = result
+    if owner_id != int(get_jwt_identity()):
+        return jsonify({"msg": "Nie masz dostępu do tej funkcji!"}), 403
+
+    try:
+        db.session.delete(meddoc)
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        db.session.rollback()
+        return jsonify({"msg": "Nie można w tej chwili usunąć dokumentu."}), 406
+
+    delete_file(meddoc.storage_key)
+    return jsonify({"msg": "Dokument usunięty!"}), 200
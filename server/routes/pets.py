@@ -1,18 +1,25 @@
 import sqlalchemy
 import marshmallow
-import string
-import random
 import json
 
 from flask import request, jsonify, Blueprint
-from db_models.database_tables import Pet, User, PetPhoto
+from db_models.database_tables import Pet, User, PetPhoto, PHOTO_PENDING
 from db_dto.pet_dto import create_pet_dto, get_pet_dto, get_pets_dto
 from app import db
 from flask_jwt_extended import (
     jwt_required,
     get_jwt_identity,
 )
-from utils.file_storage import upload_object, generate_presigned_url, delete_object
+from utils.file_storage import generate_presigned_urls, pick_variant
+from utils.photo_pipeline import (
+    discard_staged,
+    release_photo,
+    stage_photos,
+    submit_photos,
+)
+from utils.photo_queries import pet_photo_names
+from utils.events import pet_changed
+from utils.http_cache import bump_version
 
 pet = Blueprint("pet", __name__)
 
@@ -27,24 +34,31 @@ def add_pet():
         new_pet = create_pet_dto.load(json.loads(request.form["json"]))
         new_pet.user_id = get_jwt_identity()
         db.session.add(new_pet)
-
-        file = request.files.get("photo", None)
-
-        if file:
-            characters = string.ascii_letters + string.digits
-            while True:
-                filename = "".join(random.choices(characters, k=20))
-                resp = PetPhoto.query.filter(
-                    PetPhoto.photo_name.like(f"%filename%")
-                ).first()
-                if not resp:
-                    break
-
-            photo_db = PetPhoto(photo_name=filename, pet_id=new_pet.pet_id)
-            db.session.add(photo_db)
-            upload_object(file, "pet_photo", filename)
-
-        db.session.commit()
+        db.session.flush()
+
+        staged_lst = stage_photos(request.files.getlist("photo"))
+
+        try:
+            photos = [
+                PetPhoto(
+                    photo_name=staged.name, pet_id=new_pet.pet_id, status=PHOTO_PENDING
+                )
+                for staged in staged_lst
+            ]
+            db.session.add_all(photos)
+
+            # the owner's profile lists the pets
+            bump_version(User, [int(new_pet.user_id)])
+            db.session.flush()
+            pending_ids = {photo.photo_name: photo.pet_photo_id for photo in photos}
+            db.session.commit()
+        except Exception:
+            # no row refers to them, nobody else would remove them
+            discard_staged(staged_lst)
+            raise
+
+        if staged_lst:
+            submit_photos(staged_lst, PetPhoto, "pet_photo", pending_ids)
 
         return jsonify({"msg": "Profil zwierzaka dodany!"}), 201
     except sqlalchemy.exc.IntegrityError:
@@ -82,23 +96,29 @@ def get_pet_data(pet_id):
 @jwt_required()
 def get_pets():
     user_id = get_jwt_identity()
+    photo_size = pick_variant(request.args.get("photo_size", None, type=int))
     pet_list = (
-        db.session.query(Pet, PetPhoto.photo_name.label("photo"))
-        .outerjoin(PetPhoto)
+        db.session.query(Pet, pet_photo_names(Pet.pet_id))
         .filter(Pet.user_id == user_id)
         .filter(Pet.is_deleted == False)
         .all()
     )
+    photo_urls = generate_presigned_urls(
+        "pet_photo",
+        {photo for _, photo_lst in pet_list for photo in photo_lst or []},
+        photo_size,
+    )
     resp = [
         (
             {
                 **get_pet_dto.dump(pet_obj),
-                "photo": generate_presigned_url("pet_photo", photo),
+                "photo": photo_urls[photo_lst[0]],
+                "photos": [photo_urls[photo] for photo in photo_lst],
             }
-            if photo
+            if photo_lst
             else get_pet_dto.dump(pet_obj)
         )
-        for pet_obj, photo in pet_list
+        for pet_obj, photo_lst in pet_list
     ]
     return jsonify(resp), 200
 
@@ -113,11 +133,15 @@ def delete_pet(pet_id):
     try:
         pet_to_update.is_deleted = True
 
-        pet_photo = PetPhoto.query.filter(PetPhoto.pet_id == pet_id).first()
-        if pet_photo:
-            delete_object("pet_photo", pet_photo.photo_name)
-        db.session.delete(pet_photo)
+        pet_photos = PetPhoto.query.filter(PetPhoto.pet_id == pet_id).all()
+        for pet_photo in pet_photos:
+            db.session.delete(pet_photo)
+        bump_version(User, [pet_to_update.user_id])
         db.session.commit()
+        pet_changed.send(pet_id)
+
+        for photo_name in {pet_photo.photo_name for pet_photo in pet_photos}:
+            release_photo(PetPhoto, "pet_photo", photo_name)
         return jsonify({"msg": "Zwierzak usunięty, przykro nam :("}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -1,4 +1,4 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app, g
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from db_models.database_tables import (
@@ -6,11 +6,8 @@ from db_models.database_tables import (
     Post,
     PetCare,
     Pet,
-    UserPhoto,
-    PetPhoto,
     PetCareApplication,
     UserRating,
-    DPostalCode,
 )
 from db_dto.post_dto import (
     create_post_dto,
@@ -21,13 +18,29 @@ from db_dto.post_dto import (
     get_users_dto,
 )
 import sqlalchemy
-from utils.file_storage import generate_presigned_url
+from sqlalchemy.orm import aliased
+from utils.file_storage import generate_presigned_urls, pick_variant
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+from utils.photo_queries import pet_cover_photo, pet_photo_names, user_photo_names
+from utils.postal_index import postal_index
+from utils.post_cache import post_detail_cache
+from utils.events import post_changed
+from utils.application_counters import is_pending, pending_changed, post_deactivated
+from utils.notifications import notify_user
+from utils.outbox import enqueue_email
+from utils.http_cache import bump_version, conditional, url_bucket
+from collections import namedtuple
 from datetime import datetime
-from math import radians
 
 
 post_bprt = Blueprint("post", __name__)
 
+DASHBOARD_SORT_MODES = ("post_id", "distance")
+
+_ApplicationState = namedtuple(
+    "_ApplicationState", ["accepted", "cancelled", "declined"]
+)
+
 
 @post_bprt.route("/createPost", methods=["POST"])
 @jwt_required()
@@ -37,8 +50,8 @@ def create_post():
     post_dto = create_post_dto.load(request.json)
     post_dto.user_id = user_id
 
-    city, postal_code = (
-        db.session.query(User.city, User.postal_code)
+    city, postal_code, latitude, longitude = (
+        db.session.query(User.city, User.postal_code, User.latitude, User.longitude)
         .filter(User.user_id == user_id)
         .first()
     )
@@ -53,6 +66,12 @@ def create_post():
             400,
         )
 
+    if latitude is None or longitude is None:
+        latitude, longitude = postal_index.locate(
+            city=city, postal_code=postal_code
+        ) or (None, None)
+    post_dto.latitude, post_dto.longitude = latitude, longitude
+
     try:
         db.session.add(post_dto)
         db.session.flush()
@@ -75,56 +94,126 @@ def create_post():
 def get_dashboard_post():
     city = request.args.get("city", None)
     postal_code = request.args.get("postal_code", None)
-    kms = request.args.get("kms", 0)
+    kms = request.args.get("kms", 0, type=float)
+    sort = request.args.get("sort", "post_id")
+    limit = request.args.get(
+        "limit", current_app.config["DASHBOARD_PAGE_SIZE"], type=int
+    )
+    cursor = request.args.get("cursor", None)
+    photo_size = pick_variant(request.args.get("photo_size", None, type=int))
+    is_admin = get_jwt().get("is_admin", False)
 
-    target_city = DPostalCode.query.filter(
-        sqlalchemy.or_(
-            DPostalCode.place == city, DPostalCode.postal_code == postal_code
-        )
-    ).first()
+    if sort not in DASHBOARD_SORT_MODES:
+        return jsonify({"error": "Unknown sort mode"}), 400
 
-    if not target_city:
-        return jsonify({"error": "City not found"}), 404
+    limit = min(max(limit, 1), current_app.config["DASHBOARD_MAX_PAGE_SIZE"])
 
-    lat1, lon1 = map(radians, [target_city.latitude, target_city.longitude])
+    target_city = postal_index.locate(city=city, postal_code=postal_code)
 
-    distance_expr = 6371 * db.func.acos(
-        db.func.cos(lat1)
-        * db.func.cos(db.func.radians(DPostalCode.latitude))
-        * db.func.cos(db.func.radians(DPostalCode.longitude) - lon1)
-        + db.func.sin(lat1) * db.func.sin(db.func.radians(DPostalCode.latitude))
-    )
+    if not target_city and not is_admin:
+        return jsonify({"error": "City not found"}), 404
 
-    distance_subquery = (
-        db.session.query(
-            DPostalCode.postal_code,
-        )
-        .where(distance_expr <= kms)
-        .subquery()
-    )
-    alias_distance_subquery = sqlalchemy.alias(distance_subquery)
+    location = db.func.ll_to_earth(Post.latitude, Post.longitude)
+    if target_city:
+        center = db.func.ll_to_earth(*target_city)
+        distance = db.func.earth_distance(center, location)
+    else:
+        # admins may list every post without picking a city
+        distance = sqlalchemy.literal(None, type_=sqlalchemy.Float)
+
+    if sort == "distance":
+        # posts without coordinates go last instead of breaking the keyset
+        sort_key = sqlalchemy.func.coalesce(distance, float("inf"))
+    else:
+        sort_key = Post.post_id
 
     post_query = (
         db.session.query(
             Post,
             User,
             sqlalchemy.func.count(PetCare.pet_id).label("pet_count"),
-            sqlalchemy.func.array_agg(PetPhoto.photo_name).label("photo_lst"),
+            # one cover photo per pet, so pets with galleries are not counted twice
+            sqlalchemy.func.array_agg(pet_cover_photo(PetCare.pet_id)).label(
+                "photo_lst"
+            ),
+            (distance / 1000).label("distance"),
+            sort_key.label("sort_key"),
         )
         .join(User, Post.user_id == User.user_id, isouter=True)
         .join(PetCare, Post.post_id == PetCare.post_id, isouter=True)
-        .outerjoin(PetPhoto, PetCare.pet_id == PetPhoto.pet_id)
         .group_by(Post.post_id, User.user_id)
     )
 
-    if not get_jwt().get("is_admin", False):
-        post_query = post_query.filter(Post.user_id != int(get_jwt_identity())).filter(
-            Post.is_active == True
-        ).filter(
-            User.postal_code.in_(alias_distance_subquery)
+    if not is_admin:
+        # earth_box is answered by the GiST index, earth_distance trims its corners
+        in_radius = sqlalchemy.and_(
+            db.func.earth_box(center, kms * 1000).op("@>")(location),
+            distance <= kms * 1000,
+        )
+        postal_codes = postal_index.postal_codes_within(*target_city, kms)
+        if postal_codes:
+            # posts written while the owner's address had no coordinates are
+            # matched by the owner's postal code; ARRAY(...) is computed once,
+            # so Postgres can still OR two index scans
+            unlocated_post, owner = aliased(Post), aliased(User)
+            unlocated = (
+                sqlalchemy.select(unlocated_post.post_id)
+                .join(owner, unlocated_post.user_id == owner.user_id)
+                .where(
+                    unlocated_post.is_active == True,
+                    unlocated_post.latitude.is_(None),
+                    owner.postal_code.in_(postal_codes),
+                )
+            )
+            in_radius = sqlalchemy.or_(
+                in_radius,
+                Post.post_id
+                == sqlalchemy.any_(sqlalchemy.func.array(unlocated.scalar_subquery())),
+            )
+
+        post_query = (
+            post_query.filter(Post.user_id != int(get_jwt_identity()))
+            .filter(Post.is_active == True)
+            .filter(in_radius)
         )
 
-    post_lst = post_query.all()
+    if cursor:
+        try:
+            cursor_sort, last_key, last_post_id = decode_cursor(cursor, str, float, int)
+        except InvalidCursor:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        if cursor_sort != sort:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        if sort == "distance":
+            post_query = post_query.filter(
+                sqlalchemy.tuple_(sort_key, Post.post_id)
+                > sqlalchemy.tuple_(last_key, last_post_id)
+            )
+        else:
+            post_query = post_query.filter(Post.post_id > last_post_id)
+
+    # ORDER BY ... LIMIT k lets Postgres keep only the k best rows (top-N heapsort),
+    # one extra row tells us whether there is a next page
+    post_lst = post_query.order_by(sort_key, Post.post_id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(post_lst) > limit:
+        post_lst = post_lst[:limit]
+        last_post, *_, last_sort_key = post_lst[-1]
+        next_cursor = encode_cursor(sort, last_sort_key, last_post.post_id)
+
+    photo_urls = generate_presigned_urls(
+        "pet_photo",
+        {
+            photo
+            for _, _, _, photos_lst, *_ in post_lst
+            for photo in photos_lst
+            if photo
+        },
+        photo_size,
+    )
 
     resp_lst = [
         {
@@ -141,34 +230,23 @@ def get_dashboard_post():
             "end_time": str(post_dashboard.end_time),
             "cost": post_dashboard.cost,
             "pet_count": pet_cnt,
-            "pet_photos": [
-                generate_presigned_url("pet_photo", photo)
-                for photo in photos_lst
-                if photo
-            ],
+            "pet_photos": [photo_urls[photo] for photo in photos_lst if photo],
+            "distance": round(post_distance, 2) if post_distance is not None else None,
         }
-        for post_dashboard, user, pet_cnt, photos_lst in post_lst
+        for post_dashboard, user, pet_cnt, photos_lst, post_distance, _ in post_lst
     ]
 
-    return jsonify(resp_lst), 200
+    return jsonify({"post_lst": resp_lst, "next_cursor": next_cursor}), 200
 
 
-@post_bprt.route("/getPost/<int:post_id>", methods=["GET"])
-@jwt_required()
-def get_post(post_id):
-    subquery_rating = (
-        db.session.query(
-            UserRating.user_id,
-            sqlalchemy.func.avg(UserRating.star_number).label("rating_overall"),
-        )
-        .join(Post, Post.user_id == UserRating.user_id)
-        .filter(Post.post_id == post_id)
-        .group_by(UserRating.user_id)
-        .subquery()
-    )
-    alias_subquery_rating = sqlalchemy.alias(subquery_rating)
+def post_detail_query(post_id, viewer_id):
+    """Everything /getPost needs, including the viewer's application, in one statement.
 
-    subquery_pet = (
+    The pets, the owner rating and the photos are CTEs/derived tables joined to
+    the post row, and the rating flags are EXISTS subqueries, so a cache miss
+    costs a single round trip to the database.
+    """
+    post_pets = (
         db.session.query(
             PetCare.post_id,
             sqlalchemy.func.json_agg(
@@ -187,112 +265,230 @@ def get_post(post_id):
                     Pet.birth_date,
                     "description",
                     Pet.description,
-                    "photo",
-                    PetPhoto.photo_name,
+                    "photos",
+                    pet_photo_names(Pet.pet_id),
                 )
             ).label("pet_lst"),
         )
         .join(PetCare, PetCare.pet_id == Pet.pet_id)
-        .outerjoin(PetPhoto, PetPhoto.pet_id == Pet.pet_id)
         .filter(PetCare.post_id == post_id)
         .group_by(PetCare.post_id)
-        .subquery()
+        .cte("post_pets")
     )
-    alias_subquery_pet = sqlalchemy.alias(subquery_pet)
 
-    post, user, pet_lst, user_photo, user_rating = (
+    Caregiver = aliased(User, name="caregiver")
+    AcceptedApplication = aliased(PetCareApplication, name="accepted_application")
+    ViewerApplication = aliased(PetCareApplication, name="viewer_application")
+
+    def rated(user_id):
+        return sqlalchemy.exists().where(
+            UserRating.petcareapplication_id
+            == AcceptedApplication.petcareapplication_id,
+            UserRating.user_id == user_id,
+        )
+
+    return (
         db.session.query(
             Post,
             User,
-            alias_subquery_pet.c.pet_lst,
-            UserPhoto.photo_name.label("user_photo"),
-            alias_subquery_rating.c.rating_overall,
+            post_pets.c.pet_lst,
+            user_photo_names(User.user_id).label("user_photo_lst"),
+            Caregiver,
+            rated(Post.user_id).label("owner_rated"),
+            rated(Caregiver.user_id).label("caregiver_rated"),
+            ViewerApplication,
         )
         .join(User, Post.user_id == User.user_id)
-        .join(alias_subquery_pet, alias_subquery_pet.c.post_id == Post.post_id)
-        .outerjoin(UserPhoto, UserPhoto.user_id == User.user_id)
+        .join(post_pets, post_pets.c.post_id == Post.post_id)
         .outerjoin(
-            alias_subquery_rating, alias_subquery_rating.c.user_id == Post.user_id
+            AcceptedApplication,
+            sqlalchemy.and_(
+                AcceptedApplication.post_id == Post.post_id,
+                AcceptedApplication.accepted == True,
+                AcceptedApplication.user_id != Post.user_id,
+            ),
+        )
+        .outerjoin(Caregiver, Caregiver.user_id == AcceptedApplication.user_id)
+        .outerjoin(
+            ViewerApplication,
+            sqlalchemy.and_(
+                ViewerApplication.post_id == Post.post_id,
+                ViewerApplication.user_id == viewer_id,
+            ),
         )
         .filter(Post.post_id == post_id)
-        .first()
     )
 
-    if pet_lst:
-        for pet in pet_lst or []:
-            pet["photo"] = (
-                generate_presigned_url("pet_photo", pet["photo"])
-                if pet["photo"]
-                else ""
-            )
 
-    # in future set user rating!!
+def build_post_versions(row):
+    return [
+        row.Post.version,
+        row.User.version,
+        row.caregiver.version if row.caregiver else None,
+    ]
+
+
+def build_post_detail(row):
+    """Viewer-independent part of /getPost, cached in `post_detail_cache`.
+
+    Photos are kept as names and presigned per request, so a cached document
+    never hands out an expired url.
+    """
+    post, user = row.Post, row.User
 
     user_dto = get_user_dto.dump(user)
-    user_dto["photo"] = (
-        generate_presigned_url("user_photo", user_photo) if user_photo else ""
-    )
 
-    user_dto["rating"] = float(user_rating) if user_rating else user_rating
+    caregiver_dto = None
+    if row.caregiver:
+        caregiver_dto = get_user_dto.dump(row.caregiver)
+        caregiver_dto["phone_number"] = row.caregiver.phone_number
+        caregiver_dto["email"] = row.caregiver.email
+
+    return {
+        "versions": build_post_versions(row),
+        "post": create_post_dto.dump(post),
+        "owner_id": post.user_id,
+        "end": datetime.combine(post.end_date, post.end_time),
+        "user": user_dto,
+        "user_photos": row.user_photo_lst or [],
+        "owner_contact": {"phone_number": user.phone_number, "email": user.email},
+        "pets": row.pet_lst or [],
+        "caregiver": caregiver_dto,
+        # who has already been rated for the accepted care
+        "owner_rated": row.owner_rated,
+        "caregiver_rated": row.caregiver_rated,
+    }
+
+
+def _post_state(versions, viewer_id, application, end_date, end_time):
+    return {
+        "versions": versions,
+        "viewer_id": viewer_id,
+        # petcareapplication_id, accepted, cancelled, declined
+        "application": application,
+        "ended": datetime.combine(end_date, end_time) < datetime.now(),
+        "urls": url_bucket(),
+    }
+
+
+def post_validator(post_id):
+    """What /getPost shows, as versions and the viewer's application state.
+
+    Reads the same rows as `post_detail_query` but only their version columns.
+    When the document is not cached the view needs the whole detail row
+    anyway, so that query is run here instead and its row is left in
+    `g.post_detail_row`; a request costs one round trip either way.
+    """
+    viewer_id = int(get_jwt_identity())
+
+    if post_detail_cache.get(post_id) is None:
+        g.post_detail_generation = post_detail_cache.generation()
+        row = g.post_detail_row = post_detail_query(post_id, viewer_id).first()
+        if not row:
+            return None
+
+        application = row.viewer_application
+        return _post_state(
+            build_post_versions(row),
+            viewer_id,
+            (
+                [
+                    application.petcareapplication_id,
+                    application.accepted,
+                    application.cancelled,
+                    application.declined,
+                ]
+                if application
+                else [None] * 4
+            ),
+            row.Post.end_date,
+            row.Post.end_time,
+        )
 
-    post_application = (
-        db.session.query(PetCareApplication)
-        .filter(PetCareApplication.post_id == post_id)
-        .filter(PetCareApplication.user_id == int(get_jwt_identity()))
-        .first()
-    )
+    Caregiver = aliased(User, name="caregiver")
+    AcceptedApplication = aliased(PetCareApplication, name="accepted_application")
+    ViewerApplication = aliased(PetCareApplication, name="viewer_application")
 
-    caregiver = None
-    db_rating = None
-    if post.user_id == int(get_jwt_identity()):
-        db_rating = (
-            db.session.query(UserRating)
-            .join(
-                PetCareApplication,
-                PetCareApplication.petcareapplication_id
-                == UserRating.petcareapplication_id,
-            )
-            .filter(
-                sqlalchemy.and_(
-                    PetCareApplication.post_id == post_id,
-                    PetCareApplication.accepted == True,
-                    UserRating.user_id != int(get_jwt_identity()),
-                )
-            )
-            .first()
+    row = (
+        db.session.query(
+            Post.version,
+            User.version,
+            Caregiver.version,
+            Post.end_date,
+            Post.end_time,
+            ViewerApplication.petcareapplication_id,
+            ViewerApplication.accepted,
+            ViewerApplication.cancelled,
+            ViewerApplication.declined,
         )
-        caregiver = (
-            db.session.query(User)
-            .join(
-                PetCareApplication,
-                PetCareApplication.user_id == User.user_id,
-            )
-            .filter(
-                sqlalchemy.and_(
-                    PetCareApplication.post_id == post_id,
-                    PetCareApplication.accepted == True,
-                    User.user_id != int(get_jwt_identity()),
-                )
-            )
-            .first()
-        )
-    elif getattr(post_application, "accepted", False):
-        db_rating = (
-            db.session.query(UserRating)
-            .filter(
-                sqlalchemy.and_(
-                    UserRating.user_id != int(get_jwt_identity()),
-                    UserRating.petcareapplication_id
-                    == post_application.petcareapplication_id,
-                )
-            )
-            .first()
+        .join(User, Post.user_id == User.user_id)
+        .outerjoin(
+            AcceptedApplication,
+            sqlalchemy.and_(
+                AcceptedApplication.post_id == Post.post_id,
+                AcceptedApplication.accepted == True,
+                AcceptedApplication.user_id != Post.user_id,
+            ),
         )
+        .outerjoin(Caregiver, Caregiver.user_id == AcceptedApplication.user_id)
+        .outerjoin(
+            ViewerApplication,
+            sqlalchemy.and_(
+                ViewerApplication.post_id == Post.post_id,
+                ViewerApplication.user_id == viewer_id,
+            ),
+        )
+        .filter(Post.post_id == post_id)
+        .first()
+    )
+    if not row:
+        return None
+
+    return _post_state(list(row[:3]), viewer_id, list(row[5:]), row[3], row[4])
+
 
-    status = (
-        "own"
-        if post.user_id == int(get_jwt_identity())
-        else (
+@post_bprt.route("/getPost/<int:post_id>", methods=["GET"])
+@jwt_required()
+@conditional(post_validator)
+def get_post(post_id):
+    viewer_id = int(get_jwt_identity())
+    doc = post_detail_cache.get(post_id)
+    # built before another worker changed the post, its event never got here
+    if doc is not None and g.validator and doc["versions"] != g.validator["versions"]:
+        doc = None
+    if doc is None:
+        if "post_detail_row" in g:
+            generation, row = g.post_detail_generation, g.post_detail_row
+        else:
+            generation = post_detail_cache.generation()
+            row = post_detail_query(post_id, viewer_id).first()
+        if not row:
+            return jsonify({"msg": "Podane ogłoszenie nie istnieje!"}), 404
+
+        doc = build_post_detail(row)
+        post_detail_cache.set(
+            post_id,
+            doc,
+            generation,
+            pet_ids=[pet["pet_id"] for pet in doc["pets"]],
+            user_ids=[doc["owner_id"]]
+            + ([doc["caregiver"]["user_id"]] if doc["caregiver"] else []),
+        )
+        post_application = row.viewer_application
+    else:
+        # the validator has already read it
+        post_application = (
+            _ApplicationState(*g.validator["application"][1:])
+            if g.validator and g.validator["application"][0] is not None
+            else None
+        )
+
+    # the viewer-specific overlay, never cached
+    if doc["owner_id"] == viewer_id:
+        status = "own"
+        already_rated = doc["caregiver_rated"]
+    else:
+        status = (
             ""
             if not post_application
             else (
@@ -305,31 +501,46 @@ def get_post(post_id):
                 )
             )
         )
-    )
+        already_rated = doc["owner_rated"]
 
-    user_dto["phone_number"] = user.phone_number if status == "accepted" else None
-    user_dto["email"] = user.email if status == "accepted" else None
+    pet_photo_urls = generate_presigned_urls(
+        "pet_photo", {photo for pet in doc["pets"] for photo in pet["photos"] or []}
+    )
+    pet_lst = [
+        {
+            **pet,
+            "photo": pet_photo_urls[pet["photos"][0]] if pet["photos"] else "",
+            "photos": [pet_photo_urls[photo] for photo in pet["photos"] or []],
+        }
+        for pet in doc["pets"]
+    ]
 
-    caregiver_dto = get_user_dto.dump(caregiver) if caregiver else None
-    if caregiver_dto:
-        caregiver_dto["phone_number"] = caregiver.phone_number
-        caregiver_dto["email"] = caregiver.email
+    user_photo_urls = generate_presigned_urls("user_photo", doc["user_photos"])
+    user_dto = {
+        **doc["user"],
+        "photo": (user_photo_urls[doc["user_photos"][0]] if doc["user_photos"] else ""),
+        "photos": [user_photo_urls[photo] for photo in doc["user_photos"]],
+        "phone_number": None,
+        "email": None,
+    }
+    if status == "accepted":
+        user_dto.update(doc["owner_contact"])
 
     return (
         jsonify(
             {
                 "user": user_dto,
-                "post": create_post_dto.dump(post),
+                "post": doc["post"],
                 "pets": pet_lst,
                 "can_rate": (
                     True
-                    if db_rating is None
-                    and datetime.combine(post.end_date, post.end_time) < datetime.now()
+                    if not already_rated
+                    and doc["end"] < datetime.now()
                     and status in ["own", "accepted"]
                     else False
                 ),
                 "status": status,
-                "caregiver": caregiver_dto,
+                "caregiver": doc["caregiver"] if status == "own" else None,
             }
         ),
         200,
@@ -343,6 +554,7 @@ def delete_post(post_id):
         db.session.query(Post)
         .filter(Post.post_id == post_id)
         .filter(Post.user_id == int(get_jwt_identity()))
+        .with_for_update()
         .first()
     )
 
@@ -358,8 +570,11 @@ def delete_post(post_id):
         return jsonify({"msg": "Post jest nieaktywny!"}), 404
 
     try:
+        post_deactivated(post)
         post.is_active = False
+        bump_version(Post, [post_id])
         db.session.commit()
+        post_changed.send(post_id)
         return jsonify({"msg": "Post usunięty prawidłowo!"}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -369,43 +584,27 @@ def delete_post(post_id):
 @post_bprt.route("/getMyPosts", methods=["GET"])
 @jwt_required()
 def get_my_posts():
-    subquery = (
-        sqlalchemy.select(
-            PetCareApplication.post_id,
-            sqlalchemy.func.sum(
-                sqlalchemy.case(
-                    (PetCareApplication.petcareapplication_id.is_(None), 0),
-                    (PetCareApplication.declined == True, 0),
-                    (PetCareApplication.cancelled == True, 0),
-                    (PetCareApplication.accepted == True, 0),
-                    else_=1,
-                )
-            ).label("app_cnt"),
-        )
-        .group_by(PetCareApplication.post_id)
-        .subquery()
-    )
-    subq_alias = sqlalchemy.alias(subquery)
-
     post_details = (
         db.session.query(
             Post,
             sqlalchemy.func.array_agg(Pet.pet_name).label("pet_list"),
-            sqlalchemy.func.bool_or(PetCareApplication.accepted),
-            subq_alias.c.app_cnt,
+            sqlalchemy.exists()
+            .where(
+                PetCareApplication.post_id == Post.post_id,
+                PetCareApplication.accepted == True,
+            )
+            .label("accepted_pet_care"),
         )
         .join(PetCare, Post.post_id == PetCare.post_id)
         .join(Pet, PetCare.pet_id == Pet.pet_id)
-        .outerjoin(PetCareApplication, PetCareApplication.post_id == Post.post_id)
-        .outerjoin(subq_alias, Post.post_id == subq_alias.c.post_id)
         .filter(Post.user_id == int(get_jwt_identity()))
-        .group_by(Post.post_id, PetCare.post_id, subq_alias.c.app_cnt)
+        .group_by(Post.post_id)
         .all()
     )
 
     post_lst = []
 
-    for post, pet_lst, accepted_pet_care, pending_applications in post_details:
+    for post, pet_lst, accepted_pet_care in post_details:
         post_dict = create_post_dto.dump(post)
         post_dict["pet_lst"] = pet_lst
         post_dict["status"] = (
@@ -414,7 +613,7 @@ def get_my_posts():
             else ("active" if post.is_active else "cancelled")
         )
         post_dict["pending_applications"] = (
-            pending_applications if post_dict["status"] == "active" else 0
+            post.pending_applications if post_dict["status"] == "active" else 0
         )
         post_lst.append(post_dict)
 
@@ -467,10 +666,12 @@ def edit_post(post_id):
 @post_bprt.route("/applyToPost/<int:post_id>", methods=["POST"])
 @jwt_required()
 def apply_to_post(post_id):
-    post = db.session.query(Post).filter(Post.post_id == post_id).first()
+    post = (
+        db.session.query(Post).filter(Post.post_id == post_id).with_for_update().first()
+    )
 
     if not post:
-        (
+        return (
             jsonify({"msg": "Post nie istnieje!"}),
             404,
         )
@@ -493,11 +694,16 @@ def apply_to_post(post_id):
         if pet_care_application:
             if pet_care_application.cancelled:
                 pet_care_application.cancelled = False
+                if is_pending(pet_care_application):
+                    pending_changed(post, 1)
+                    notify_user(post.user_id, "application_created", post_id=post_id)
         else:
             pet_care_application = PetCareApplication(
                 user_id=int(get_jwt_identity()), post_id=post_id
             )
             db.session.add(pet_care_application)
+            pending_changed(post, 1)
+            notify_user(post.user_id, "application_created", post_id=post_id)
 
         db.session.commit()
 
@@ -511,21 +717,8 @@ def apply_to_post(post_id):
 @jwt_required()
 def get_applications_count():
     active_application_cnt = (
-        db.session.query(sqlalchemy.func.count("*"))
-        .select_from(PetCareApplication)
-        .join(Post, Post.post_id == PetCareApplication.post_id)
-        .filter(
-            sqlalchemy.and_(
-                Post.user_id == int(get_jwt_identity()), Post.is_active == True
-            )
-        )
-        .filter(
-            sqlalchemy.and_(
-                PetCareApplication.declined == False,
-                PetCareApplication.cancelled == False,
-                PetCareApplication.accepted == False,
-            )
-        )
+        db.session.query(User.pending_applications)
+        .filter(User.user_id == int(get_jwt_identity()))
         .scalar()
     )
 
@@ -554,30 +747,25 @@ def get_post_applications(post_id):
         )
 
     users_application = (
-        db.session.query(
-            User, PetCareApplication, sqlalchemy.func.avg(UserRating.star_number)
-        )
+        db.session.query(User, PetCareApplication)
         .join(PetCareApplication, PetCareApplication.user_id == User.user_id)
-        .outerjoin(UserRating, UserRating.user_id == User.user_id)
         .filter(
             sqlalchemy.and_(
                 PetCareApplication.post_id == post_id,
                 PetCareApplication.cancelled == False,
             )
         )
-        .group_by(User.user_id, PetCareApplication.petcareapplication_id)
         .all()
     )
 
     user_lst = []
-    for user, pet_care_application, user_rating in users_application:
+    for user, pet_care_application in users_application:
         user_dto = get_user_dto.dump(user)
         user_dto["status"] = (
             "Accepted"
             if pet_care_application.accepted
             else ("Declined" if pet_care_application.declined else "Pending")
         )
-        user_dto["rating"] = float(user_rating) if user_rating else user_rating
         user_lst.append(user_dto)
 
     return jsonify({"users": user_lst}), 200
@@ -595,6 +783,7 @@ def decline_application(post_id, user_id):
                 Post.post_id == post_id, Post.user_id == int(get_jwt_identity())
             )
         )
+        .with_for_update()
         .first()
     )
 
@@ -627,8 +816,12 @@ def decline_application(post_id, user_id):
         return jsonify({"msg": "Chętny odwołał swoją kandydaturę!"}), 404
 
     try:
+        if is_pending(pet_care_application):
+            pending_changed(post, -1)
         pet_care_application.declined = True
+        notify_user(user_id, "application_declined", post_id=post_id)
         db.session.commit()
+        post_changed.send(post_id)
         return jsonify({"msg": "Kandydatura odrzucona prawidłowo :("}), 200
     except sqlalchemy.exc.IntegrityError:
         db.session.rollback()
@@ -647,6 +840,7 @@ def accept_application(post_id, user_id):
                 Post.post_id == post_id, Post.user_id == int(get_jwt_identity())
             )
         )
+        .with_for_update()
         .first()
     )
 
@@ -663,8 +857,8 @@ def accept_application(post_id, user_id):
     if not post.is_active:
         return jsonify({"msg": "Post jest nieaktywny!"}), 404
 
-    pet_care_application, post, user_email = (
-        db.session.query(PetCareApplication, Post, User.email)
+    application_row = (
+        db.session.query(PetCareApplication, User.email)
         .join(User, User.user_id == PetCareApplication.user_id)
         .filter(
             sqlalchemy.and_(
@@ -676,16 +870,30 @@ def accept_application(post_id, user_id):
         .first()
     )
 
-    if not pet_care_application:
+    if not application_row:
         return jsonify({"msg": "Chętny odwołał swoją kandydaturę!"}), 404
 
+    pet_care_application, user_email = application_row
+
     try:
+        if is_pending(pet_care_application):
+            pending_changed(post, -1)
+        post_deactivated(post)
         pet_care_application.accepted = True
         post.is_active = False
+        bump_version(Post, [post_id])
+        notify_user(user_id, "application_accepted", post_id=post_id)
+        # sent by `flask outbox run` after the commit, mailhog catches it locally
+        enqueue_email(
+            user_email,
+            "Twoja kandydatura została zaakceptowana!",
+            f"Właściciel ogłoszenia nr {post.post_id} zaakceptował Twoją kandydaturę.\n"
+            f"Opieka trwa od {post.start_date.strftime('%d-%m-%Y')} {post.start_time}"
+            f" do {post.end_date.strftime('%d-%m-%Y')} {post.end_time}.\n\n"
+            "Dane kontaktowe właściciela znajdziesz w szczegółach ogłoszenia.",
+        )
         db.session.commit()
-
-        # tutaj dodac wyslanie maila do uzytkownika z powiadomieniem o akceptacji jego kandydatury
-        # lepiej nie na dummy data, bo ludzie zaczną dostawać powiadomienia xddd
+        post_changed.send(post_id)
 
         return jsonify({"msg": "Kandydatura zaakceptowana! :)"}), 200
     except sqlalchemy.exc.IntegrityError:
@@ -739,10 +947,12 @@ def get_my_application():
 @post_bprt.route("/getMyApplications/<post_id>/cancel", methods=["PUT"])
 @jwt_required()
 def cancel_my_application(post_id):
-    post = db.session.query(Post).filter(Post.post_id == post_id).first()
+    post = (
+        db.session.query(Post).filter(Post.post_id == post_id).with_for_update().first()
+    )
 
     if not post:
-        (
+        return (
             jsonify({"msg": "Post nie istnieje!"}),
             404,
         )
@@ -765,7 +975,10 @@ def cancel_my_application(post_id):
         return jsonify({"msg": "Nie aplikowałeś na ten post!"}), 406
 
     try:
+        if is_pending(pet_care_application):
+            pending_changed(post, -1)
         pet_care_application.cancelled = True
+        notify_user(post.user_id, "application_cancelled", post_id=post.post_id)
         db.session.commit()
         return jsonify({"msg": "Aplikacja wycofana z sukcesem!"}), 200
     except sqlalchemy.exc.IntegrityError:
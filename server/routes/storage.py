@@ -0,0 +1,37 @@
+import mimetypes
+from urllib.parse import quote
+
+from flask import current_app, jsonify, Blueprint, send_from_directory
+from werkzeug.security import safe_join
+from utils.file_storage import get_storage, LocalStorage, IMMUTABLE_CACHE_CONTROL
+
+storage_bprt = Blueprint("storage", __name__)
+
+# everything else (e.g. med_docs) is only handed out by its own routes
+PUBLIC_FOLDERS = ("user_photo", "pet_photo")
+
+
+@storage_bprt.route("/storage/<path:key>", methods=["GET"])
+def get_stored_object(key):
+    storage = get_storage()
+
+    if (
+        not isinstance(storage, LocalStorage)
+        or key.split("/", 1)[0] not in PUBLIC_FOLDERS
+        or not safe_join(storage.root, key)
+    ):
+        return jsonify({"msg": "Plik nie został znaleziony!"}), 404
+
+    accel_prefix = current_app.config["STORAGE_LOCAL_ACCEL_PREFIX"]
+    if accel_prefix:
+        # nginx streams the file itself and answers Range/If-None-Match
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(key)[0] or "application/octet-stream"
+        )
+        response.headers["X-Accel-Redirect"] = f"{accel_prefix}/{quote(key)}"
+    else:
+        # werkzeug handles ETag/Range, gunicorn's file_wrapper uses sendfile
+        response = send_from_directory(storage.root, key, conditional=True)
+
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -1,4 +1,4 @@
-from flask import request, jsonify, Blueprint
+from flask import current_app, request, jsonify, Blueprint
 from app import db
 from flask_jwt_extended import (
     jwt_required,
@@ -7,128 +7,186 @@ from flask_jwt_extended import (
 from db_models.database_tables import (
     User,
     Pet,
-    UserPhoto,
-    PetPhoto,
     Post,
     PetCareApplication,
     UserRating,
     Report,
 )
 from db_dto.post_dto import get_user_dto
-from db_dto.rating_dto import user_rating_dto, user_ratings_dto
+from db_dto.pet_dto import get_pet_dto
+from db_dto.rating_dto import user_rating_dto
 from db_dto.report_dto import report_dto
 
 import sqlalchemy
-from utils.file_storage import generate_presigned_url
+from utils.file_storage import generate_presigned_urls, pick_variant
+from utils.photo_queries import pet_photo_names, user_photo_names
+from utils.events import post_changed, user_changed
+from utils.http_cache import bump_version, conditional, url_bucket
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
 from datetime import datetime, timedelta
 
+
 user_bprt = Blueprint("user", __name__)
 
 
-@user_bprt.route("/user/<int:user_id>", methods=["GET"])
-@jwt_required()
-def get_user(user_id):
-    subquery_rating = (
-        db.session.query(
-            UserRating.user_id,
-            sqlalchemy.func.avg(UserRating.star_number).label("rating_overall"),
-            sqlalchemy.func.json_agg(
-                sqlalchemy.func.json_build_object(
-                    "usr_rating_id",
-                    UserRating.user_rating_id,
-                    "star_number",
-                    UserRating.star_number,
-                    "description",
-                    UserRating.description,
-                )
-            ).label("rating_lst"),
-        )
-        .filter(UserRating.user_id == user_id)
-        .group_by(UserRating.user_id)
-        .subquery()
+def page_limit():
+    limit = request.args.get("limit", current_app.config["PROFILE_PAGE_SIZE"], type=int)
+    return min(max(limit, 1), current_app.config["PROFILE_MAX_PAGE_SIZE"])
+
+
+def user_ratings_page(user_id, limit, cursor=None):
+    """Newest ratings of `user_id` after `cursor`, and the cursor of the next page."""
+    rating_query = db.session.query(
+        UserRating.user_rating_id,
+        UserRating.star_number,
+        UserRating.description,
+    ).filter(UserRating.user_id == user_id)
+
+    if cursor:
+        (last_rating_id,) = decode_cursor(cursor, int)
+        rating_query = rating_query.filter(UserRating.user_rating_id < last_rating_id)
+
+    rating_lst = (
+        rating_query.order_by(UserRating.user_rating_id.desc()).limit(limit + 1).all()
     )
-    alias_subquery_rating = sqlalchemy.alias(subquery_rating)
 
-    subquery_pet = (
-        db.session.query(
-            Pet.user_id,
-            sqlalchemy.func.json_agg(
-                sqlalchemy.func.json_build_object(
-                    "pet_id",
-                    Pet.pet_id,
-                    "pet_name",
-                    Pet.pet_name,
-                    "type",
-                    Pet.type,
-                    "race",
-                    Pet.race,
-                    "size",
-                    Pet.size,
-                    "birth_date",
-                    Pet.birth_date,
-                    "description",
-                    Pet.description,
-                    "photo",
-                    PetPhoto.photo_name,
-                )
-            ).label("pet_lst"),
-        )
-        .filter(Pet.user_id == user_id)
-        .outerjoin(PetPhoto, PetPhoto.pet_id == Pet.pet_id)
-        .group_by(Pet.user_id)
-        .subquery()
+    next_cursor = None
+    if len(rating_lst) > limit:
+        rating_lst = rating_lst[:limit]
+        next_cursor = encode_cursor(rating_lst[-1].user_rating_id)
+
+    return [
+        {
+            "usr_rating_id": rating.user_rating_id,
+            "star_number": rating.star_number,
+            "description": rating.description,
+        }
+        for rating in rating_lst
+    ], next_cursor
+
+
+def user_pets_page(user_id, limit, cursor=None, photo_size=None):
+    """Pets of `user_id` after `cursor`, only their photos are presigned."""
+    pet_query = db.session.query(Pet, pet_photo_names(Pet.pet_id)).filter(
+        Pet.user_id == user_id
+    )
+
+    if cursor:
+        (last_pet_id,) = decode_cursor(cursor, int)
+        pet_query = pet_query.filter(Pet.pet_id > last_pet_id)
+
+    pet_lst = pet_query.order_by(Pet.pet_id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(pet_lst) > limit:
+        pet_lst = pet_lst[:limit]
+        next_cursor = encode_cursor(pet_lst[-1][0].pet_id)
+
+    pet_photo_urls = generate_presigned_urls(
+        "pet_photo",
+        {photo for _, photo_lst in pet_lst for photo in photo_lst or []},
+        photo_size,
     )
-    alias_subquery_pet = sqlalchemy.alias(subquery_pet)
 
-    user, user_photo, rating_overall, rating_lst, pet_lst = (
+    return [
+        {
+            **get_pet_dto.dump(pet),
+            "photo": pet_photo_urls[photo_lst[0]] if photo_lst else "",
+            "photos": [pet_photo_urls[photo] for photo in photo_lst or []],
+        }
+        for pet, photo_lst in pet_lst
+    ], next_cursor
+
+
+def profile_validator(user_id):
+    version = db.session.query(User.version).filter(User.user_id == user_id).scalar()
+    if version is None:
+        return None
+
+    return {
+        "version": version,
+        "viewer_id": int(get_jwt_identity()),
+        "urls": url_bucket(),
+    }
+
+
+@user_bprt.route("/user/<int:user_id>", methods=["GET"])
+@jwt_required()
+@conditional(profile_validator)
+def get_user(user_id):
+    result = (
         db.session.query(
             User,
-            UserPhoto,
-            alias_subquery_rating.c.rating_overall,
-            alias_subquery_rating.c.rating_lst,
-            alias_subquery_pet.c.pet_lst,
-        )
-        .outerjoin(UserPhoto, User.user_id == UserPhoto.user_id)
-        .outerjoin(
-            alias_subquery_rating, User.user_id == alias_subquery_rating.c.user_id
+            user_photo_names(User.user_id),
+            sqlalchemy.select(sqlalchemy.func.count(Pet.pet_id))
+            .where(Pet.user_id == User.user_id)
+            .scalar_subquery(),
         )
-        .outerjoin(alias_subquery_pet, User.user_id == alias_subquery_pet.c.user_id)
         .filter(User.user_id == user_id)
         .first()
     )
 
-    if not user:
+    if not result:
         return jsonify({"msg": "Podany użytkownik nie istnieje!"}), 404
 
+    user, user_photo_lst, pet_count = result
+    photo_size = pick_variant(request.args.get("photo_size", None, type=int))
+    limit = page_limit()
+
     user_dict = get_user_dto.dump(user)
-    user_dict["photo"] = (
-        generate_presigned_url("user_photo", user_photo.photo_name)
-        if user_photo
-        else ""
-    )
-    user_dict["rating"] = float(rating_overall) if rating_overall else rating_overall
+    user_photo_urls = generate_presigned_urls("user_photo", user_photo_lst or [])
+    user_dict["photo"] = user_photo_urls[user_photo_lst[0]] if user_photo_lst else ""
+    user_dict["photos"] = [user_photo_urls[photo] for photo in user_photo_lst or []]
+    user_dict["rating_count"] = user.rating_count
+    user_dict["pet_count"] = pet_count
     user_dict["can_report"] = user_dict["user_id"] != int(get_jwt_identity())
 
-    if pet_lst:
-        for pet in pet_lst:
-            pet["photo"] = (
-                generate_presigned_url("pet_photo", pet["photo"])
-                if pet["photo"]
-                else ""
-            )
+    # only the first pages, the rest comes from /user/<id>/pets and /ratings
+    pet_lst, pets_next_cursor = user_pets_page(user_id, limit, photo_size=photo_size)
+    rating_lst, ratings_next_cursor = user_ratings_page(user_id, limit)
 
     return (
         jsonify(
             {
                 "user": user_dict,
                 "pets": pet_lst,
-                "ratings": user_ratings_dto.dump(rating_lst),
+                "pets_next_cursor": pets_next_cursor,
+                "ratings": rating_lst,
+                "ratings_next_cursor": ratings_next_cursor,
             }
         ),
         200,
     )
 
 
+@user_bprt.route("/user/<int:user_id>/pets", methods=["GET"])
+@jwt_required()
+def get_user_pets(user_id):
+    photo_size = pick_variant(request.args.get("photo_size", None, type=int))
+
+    try:
+        pet_lst, next_cursor = user_pets_page(
+            user_id, page_limit(), request.args.get("cursor", None), photo_size
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    return jsonify({"pets": pet_lst, "next_cursor": next_cursor}), 200
+
+
+@user_bprt.route("/user/<int:user_id>/ratings", methods=["GET"])
+@jwt_required()
+def get_user_ratings(user_id):
+    try:
+        rating_lst, next_cursor = user_ratings_page(
+            user_id, page_limit(), request.args.get("cursor", None)
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    return jsonify({"ratings": rating_lst, "next_cursor": next_cursor}), 200
+
+
 @user_bprt.route("/post/<int:post_id>/reviewUser/<int:user_id>", methods=["POST"])
 @jwt_required()
 def review_owner(post_id, user_id):
@@ -209,7 +267,21 @@ def review_owner(post_id, user_id):
 
     try:
         db.session.add(rating_dto)
+        # one atomic UPDATE, concurrent reviews of the same user cannot lose
+        # each other's increment
+        db.session.query(User).filter(User.user_id == user_id).update(
+            {
+                User.rating_count: User.rating_count + 1,
+                User.rating_sum: User.rating_sum + rating_dto.star_number,
+                User.version: User.version + 1,
+            },
+            synchronize_session=False,
+        )
+        # the post shows who has been rated already
+        bump_version(Post, [post_id])
         db.session.commit()
+        user_changed.send(user_id)
+        post_changed.send(post_id)
 
         return jsonify({"msg": "Dziękujemy za Twoją opinię i czas! :)"}), 200
     except sqlalchemy.exc.IntegrityError:
@@ -231,6 +303,8 @@ def report_user(user_id):
                 Report.whom_user_id == user_id,
             )
         )
+        # the newest one, read backwards from ix_report_who_whom_date
+        .order_by(Report.report_date.desc(), Report.report_time.desc())
         .first()
     )
 
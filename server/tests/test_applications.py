@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+import sqlalchemy
+
+from app import db
+from db_models.database_tables import PetCareApplication, Post, User
+
+
+@pytest.mark.parametrize(
+    "method, url",
+    [
+        ("post", "/applyToPost/{}"),
+        ("put", "/getMyApplications/{}/cancel"),
+        ("put", "/getPost/{}/acceptApplication/1"),
+        ("put", "/getPost/{}/declineApplication/1"),
+    ],
+)
+def test_unknown_post_is_404(make_user, client_for, method, url):
+    client = client_for(make_user())
+
+    response = getattr(client, method)(url.format(2**31 - 1))
+
+    assert response.status_code == 404
+
+
+def pending(post, user):
+    db.session.expire_all()
+    return (
+        db.session.get(Post, post.post_id).pending_applications,
+        db.session.get(User, user.user_id).pending_applications,
+    )
+
+
+def test_counters_follow_the_application(make_user, make_post, client_for):
+    owner = make_user()
+    post = make_post(owner)
+    first, second = make_user(), make_user()
+
+    for applicant in (first, second):
+        response = client_for(applicant).post(f"/applyToPost/{post.post_id}")
+        assert response.status_code == 200
+    assert pending(post, owner) == (2, 2)
+
+    client_for(first).put(f"/getMyApplications/{post.post_id}/cancel")
+    assert pending(post, owner) == (1, 1)
+
+    # cancelling twice changes nothing
+    client_for(first).put(f"/getMyApplications/{post.post_id}/cancel")
+    assert pending(post, owner) == (1, 1)
+
+    client_for(first).post(f"/applyToPost/{post.post_id}")
+    assert pending(post, owner) == (2, 2)
+
+    owner_client = client_for(owner)
+    owner_client.put(f"/getPost/{post.post_id}/declineApplication/{first.user_id}")
+    assert pending(post, owner) == (1, 1)
+
+    owner_client.put(f"/getPost/{post.post_id}/acceptApplication/{second.user_id}")
+    assert pending(post, owner) == (0, 0)
+    assert owner_client.get("/getApplicationsCount").get_json() == {
+        "active_applications_cnt": 0
+    }
+
+
+def test_concurrent_cancel_and_decline_count_once(
+    app, make_user, make_post, client_for
+):
+    owner = make_user()
+    applicant = make_user()
+    post = make_post(owner)
+    client_for(applicant).post(f"/applyToPost/{post.post_id}")
+    assert pending(post, owner) == (1, 1)
+
+    owner_client = client_for(owner)
+    decline_url = f"/getPost/{post.post_id}/declineApplication/{applicant.user_id}"
+    responses = []
+    decline = threading.Thread(
+        target=lambda: responses.append(owner_client.put(decline_url))
+    )
+
+    with db.engine.connect() as cancel:
+        # what /getMyApplications/<id>/cancel does, held open mid-transaction
+        cancel.execute(
+            sqlalchemy.select(Post.post_id)
+            .where(Post.post_id == post.post_id)
+            .with_for_update()
+        )
+        cancel.execute(
+            sqlalchemy.update(PetCareApplication)
+            .where(PetCareApplication.post_id == post.post_id)
+            .values(cancelled=True)
+        )
+        for table, key in (
+            (Post, Post.post_id == post.post_id),
+            (User, User.user_id == owner.user_id),
+        ):
+            cancel.execute(
+                sqlalchemy.update(table)
+                .where(key)
+                .values(pending_applications=table.pending_applications - 1)
+            )
+
+        decline.start()
+        wait_for_lock_wait(cancel)
+        cancel.commit()
+
+    decline.join(10)
+    assert responses[0].status_code == 404
+    assert pending(post, owner) == (0, 0)
+
+
+def wait_for_lock_wait(connection, timeout=5):
+    """Wait until another backend is blocked on a lock held by `connection`."""
+    deadline = time.monotonic() + timeout
+    blocked = sqlalchemy.text(
+        "SELECT count(*) FROM pg_locks "
+        "WHERE NOT granted AND pg_backend_pid() = ANY(pg_blocking_pids(pid))"
+    )
+    while time.monotonic() < deadline:
+        if connection.execute(blocked).scalar():
+            return
+        time.sleep(0.05)
+    raise AssertionError("the other request never waited for the lock")
+
+
+def test_recount_repairs_drifted_counters(app, make_user, make_post):
+    owner = make_user()
+    post = make_post(owner)
+    db.session.add_all(
+        [
+            PetCareApplication(post_id=post.post_id, user_id=make_user().user_id),
+            PetCareApplication(
+                post_id=post.post_id, user_id=make_user().user_id, declined=True
+            ),
+            PetCareApplication(
+                post_id=post.post_id, user_id=make_user().user_id, cancelled=True
+            ),
+        ]
+    )
+    post.pending_applications = 5
+    owner.pending_applications = 7
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["applications", "recount"])
+    assert result.exit_code == 0, result.output
+
+    assert pending(post, owner) == (1, 1)
@@ -0,0 +1,100 @@
+import types
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import TTLCache
+from utils.file_storage import PRESIGNED_URL_EXPIRES, PRESIGNED_URL_MARGIN, S3Storage
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock for utils/cache.py that only moves when told to."""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        cache_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    return clock
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=10)
+
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.keys() == ["a"]
+
+    clock.now += 50
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_goes_first(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_stats_count_hits_and_misses(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    clock.now += 60
+    # expired counts as a miss and is dropped
+    cache.get("a")
+
+    assert cache.stats() == {"size": 0, "hits": 2, "misses": 2}
+    cache.set("b", 2)
+    assert cache.pop("b") == 2
+    assert cache.pop("b") is None
+    assert cache.stats()["size"] == 0
+
+
+@pytest.fixture
+def storage():
+    """S3Storage whose presigner counts the keys it signs."""
+    storage = S3Storage("http://storage:9000", "upload", "access", "secret", "/storage")
+    signed = []
+    presign = storage.presigner.presign
+
+    def counting_presign(keys, expires_in, now=None):
+        signed.extend(keys)
+        return presign(keys, expires_in, now)
+
+    storage.presigner.presign = counting_presign
+    storage.signed = signed
+    return storage
+
+
+def test_presigned_urls_are_cached_until_the_margin(clock, storage):
+    first = storage.urls(["a", "b"])
+    assert first["a"].startswith("/storage/upload/a?")
+    assert storage.signed == ["a", "b"]
+
+    again = storage.urls(["a", "b", "c"])
+    assert (again["a"], again["b"]) == (first["a"], first["b"])
+    assert storage.signed == ["a", "b", "c"]
+
+    # handed out only while still valid for PRESIGNED_URL_MARGIN seconds
+    clock.now += PRESIGNED_URL_EXPIRES - PRESIGNED_URL_MARGIN
+    storage.urls(["a"])
+    assert storage.signed == ["a", "b", "c", "a"]
+
+
+def test_presigned_url_cache_is_bounded(clock, storage):
+    storage.url_cache.maxsize = 2
+    storage.urls(["a", "b"])
+    storage.urls(["a"])
+    storage.urls(["c"])
+
+    storage.urls(["a", "b"])
+    assert storage.signed == ["a", "b", "c", "b"]
@@ -0,0 +1,129 @@
+from collections import namedtuple
+from datetime import date
+
+import pytest
+from marshmallow import post_dump
+
+from commands import _sample_rows
+from db_dto.compiled import CompiledDumpMixin, compile_dump
+from db_dto.meddoc_dto import MedDocDTO
+from db_dto.pet_dto import CreatePetDTO
+from db_dto.post_dto import CreatePetCareDTO, CreatePostDTO, PostPageUserDTO, PostPetDTO
+from db_dto.rating_dto import UserRatingDTO
+from db_dto.report_dto import AdminReportDto, CreateReportDTO
+from db_dto.user_dto import CreateUserDTO, EditUserDTO, LoginUserDTO
+from db_models.database_tables import MedDocs, PetCare, Report
+
+DTOS = [
+    CreatePetCareDTO,
+    CreatePostDTO,
+    PostPageUserDTO,
+    PostPetDTO,
+    CreatePetDTO,
+    UserRatingDTO,
+    CreateReportDTO,
+    AdminReportDto,
+    CreateUserDTO,
+    EditUserDTO,
+    LoginUserDTO,
+    MedDocDTO,
+]
+
+
+def plain_dump(schema, obj, many=False):
+    # skips the mixin, i.e. the marshmallow dump
+    return super(CompiledDumpMixin, schema).dump(obj, many=many)
+
+
+@pytest.fixture(scope="module")
+def samples():
+    samples = _sample_rows(200)
+    for index, pet in enumerate(samples["pets"]):
+        pet.photo = f"https://example.com/{index}.jpg" if index % 3 else None
+    samples["petcares"] = [
+        PetCare(petcare_id=i, post_id=i, pet_id=i) for i in range(10)
+    ]
+    samples["reports"] = [
+        Report(
+            report_id=i,
+            who_user_id=i,
+            whom_user_id=i + 1,
+            report_type_id=1,
+            description="Nie przyszedł",
+            report_date=date(2025, 1, 1 + i),
+            was_considered=bool(i % 2),
+        )
+        for i in range(10)
+    ]
+    samples["meddocs"] = [
+        MedDocs(
+            meddoc_id=i,
+            pet_id=i,
+            start_date=date(2025, 1, 1),
+            end_date=None if i % 2 else date(2026, 1, 1),
+            doc_type_id=1,
+            file_name=f"dokument-{i}.pdf",
+            content_type="application/pdf",
+            size=1024 * i,
+        )
+        for i in range(10)
+    ]
+    return {row.__class__: rows for rows in samples.values() for row in rows[:1]}
+
+
+@pytest.mark.parametrize("dto", DTOS, ids=lambda dto: dto.__name__)
+def test_compiled_dump_matches_marshmallow(dto, samples):
+    schema = dto()
+    rows = samples[schema.opts.model]
+    assert compile_dump(schema) is not None
+
+    assert schema.dump(rows, many=True) == plain_dump(schema, rows, many=True)
+    assert schema.dump(rows[1]) == plain_dump(schema, rows[1])
+    assert dto(many=True).dump(rows) == plain_dump(schema, rows, many=True)
+
+
+def test_objects_of_other_classes_go_through_marshmallow(samples):
+    schema = PostPageUserDTO()
+    user = samples[schema.opts.model][3]
+    fields = ("user_id", "name", "surname", "city", "postal_code", "description")
+    Row = namedtuple("Row", fields + ("is_banned", "rating"))
+    row = Row(*(getattr(user, field) for field in fields), False, 4.5)
+
+    for obj in (row, row._asdict(), {"user_id": 1}):
+        assert schema.dump(obj) == plain_dump(schema, obj)
+    assert schema.dump(row)["rating"] == 4.5
+
+
+def test_attribute_error_goes_through_marshmallow(monkeypatch, samples):
+    def photo(pet):
+        raise AttributeError("photo")
+
+    model = PostPetDTO.opts.model
+    monkeypatch.setattr(model, "photo", property(photo), raising=False)
+    schema = PostPetDTO()
+    pets = samples[model][:5]
+
+    # marshmallow takes it for a missing attribute and leaves the key out
+    assert schema.dump(pets, many=True) == plain_dump(schema, pets, many=True)
+    assert "photo" not in schema.dump(pets[0])
+    assert schema.dump(pets[0])["pet_name"] == pets[0].pet_name
+
+
+def test_schemas_with_hooks_are_not_compiled(samples):
+    class WithHook(PostPageUserDTO):
+        @post_dump
+        def add_full_name(self, data, **kwargs):
+            data["full_name"] = f"{data['name']} {data['surname']}"
+            return data
+
+    class CustomAttributes(PostPageUserDTO):
+        def get_attribute(self, obj, attr, default):
+            return "?" if attr == "city" else super().get_attribute(obj, attr, default)
+
+    users = samples[PostPageUserDTO.opts.model][:20]
+    for dto in (WithHook, CustomAttributes):
+        schema = dto()
+        assert compile_dump(schema) is None
+        assert schema.dump(users, many=True) == plain_dump(schema, users, many=True)
+    assert WithHook().dump(users[1])["full_name"] == "Imię 1 Żółć"
+    assert CustomAttributes().dump(users[1])["city"] == "?"
@@ -0,0 +1,79 @@
+import numpy as np
+
+from app import db
+from db_models.database_tables import DPostalCode
+from utils.postal_index import EARTH_RADIUS_KM, postal_index
+
+
+def located(postal):
+    return {
+        "city": postal.place,
+        "postal_code": postal.postal_code,
+        "latitude": postal.latitude,
+        "longitude": postal.longitude,
+    }
+
+
+def distances(rows, center):
+    lat1, lon1 = np.radians(center)
+    lat2 = np.radians([row.latitude for row in rows])
+    lon2 = np.radians([row.longitude for row in rows])
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def postal_code_at(center, kms):
+    """A DPostalCode row about `kms` away from `center`."""
+    rows = db.session.query(DPostalCode).all()
+    return rows[int(np.argmin(np.abs(distances(rows, center) - kms)))]
+
+
+def test_postal_codes_within_matches_a_full_scan(app):
+    with app.app_context():
+        center = postal_index.locate(city="Warszawa")
+        rows = db.session.query(DPostalCode).all()
+        distance = distances(rows, center)
+
+        for kms in (0.5, 10, 40):
+            expected = sorted(
+                {row.postal_code for row, d in zip(rows, distance) if d <= kms}
+            )
+            assert postal_index.postal_codes_within(*center, kms) == expected
+        assert postal_index.postal_codes_within(*center, -1) == []
+
+
+def test_posts_without_coordinates_match_by_postal_code(
+    make_user, make_post, client_for
+):
+    center = postal_index.locate(city="Warszawa")
+    near, far = postal_code_at(center, 5), postal_code_at(center, 200)
+    viewer = make_user(**located(near))
+
+    on_the_map = make_post(make_user(**located(near)))
+    on_the_map.latitude, on_the_map.longitude = near.latitude, near.longitude
+    # owners whose postal code had no coordinates when they posted
+    unlocated_near = make_post(make_user(city=near.place, postal_code=near.postal_code))
+    unlocated_far = make_post(make_user(city=far.place, postal_code=far.postal_code))
+    db.session.commit()
+    post_ids = {
+        on_the_map.post_id: "on the map",
+        unlocated_near.post_id: "near",
+        unlocated_far.post_id: "far",
+    }
+
+    response = client_for(viewer).get(
+        "/getDashboardPost?city=Warszawa&kms=20&sort=distance&limit=50"
+    )
+    assert response.status_code == 200
+
+    found = [
+        (post_ids[post["post_id"]], post["distance"])
+        for post in response.get_json()["post_lst"]
+        if post["post_id"] in post_ids
+    ]
+    # no distance to sort by, listed after the posts on the map
+    assert [name for name, _ in found] == ["on the map", "near"]
+    assert found[1][1] is None
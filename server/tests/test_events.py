@@ -0,0 +1,103 @@
+import queue
+import time
+
+import pytest
+
+from app import db
+from utils.notifications import EventListener, get_event_listener, notify_user
+
+
+@pytest.fixture
+def listener(app):
+    """The app's listener, once its LISTEN connection is up."""
+    with app.app_context():
+        listener = get_event_listener()
+        probe = listener.subscribe(0)
+        deadline = time.monotonic() + 10
+        try:
+            # notifications sent before the LISTEN are lost, probe until one arrives
+            while True:
+                notify_user(0, "probe")
+                db.session.commit()
+                try:
+                    probe.get(timeout=0.2)
+                    break
+                except queue.Empty:
+                    assert time.monotonic() < deadline, "listener did not start"
+        finally:
+            listener.unsubscribe(0, probe)
+        yield listener
+
+
+def test_stream_is_off_unless_enabled(make_user, client_for):
+    response = client_for(make_user()).get("/events")
+    assert response.status_code == 404
+
+
+def test_events_are_delivered_on_commit_only(listener, make_user):
+    user, other = make_user(), make_user()
+    subscriber = listener.subscribe(user.user_id)
+    try:
+        notify_user(user.user_id, "application_created", post_id=1)
+        db.session.rollback()
+        notify_user(other.user_id, "application_created", post_id=2)
+        notify_user(user.user_id, "application_declined", post_id=3)
+        db.session.commit()
+
+        assert subscriber.get(timeout=5) == ("application_declined", {"post_id": 3})
+        with pytest.raises(queue.Empty):
+            subscriber.get(timeout=0.5)
+    finally:
+        listener.unsubscribe(user.user_id, subscriber)
+
+
+def test_applying_notifies_the_owner(listener, make_user, make_post, client_for):
+    owner = make_user()
+    post_id = make_post(owner).post_id
+    subscriber = listener.subscribe(owner.user_id)
+    try:
+        assert (
+            client_for(make_user()).post(f"/applyToPost/{post_id}").status_code == 200
+        )
+        assert subscriber.get(timeout=5) == (
+            "application_created",
+            {"post_id": post_id},
+        )
+    finally:
+        listener.unsubscribe(owner.user_id, subscriber)
+
+
+def test_stream(app, monkeypatch, listener, make_user, client_for):
+    monkeypatch.setitem(app.config, "EVENTS_STREAMING", True)
+    monkeypatch.setitem(app.config, "EVENTS_HEARTBEAT", 0.1)
+    user = make_user()
+
+    response = client_for(user).get("/events", buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    chunks = response.response
+    assert next(chunks) == b"retry: 5000\n\n"
+    assert next(chunks) == b": ping\n\n"
+
+    notify_user(user.user_id, "application_accepted", post_id=7)
+    db.session.commit()
+    chunk = next(chunks)
+    while chunk == b": ping\n\n":
+        chunk = next(chunks)
+    assert chunk == b'event: application_accepted\ndata: {"post_id": 7}\n\n'
+
+    response.close()
+    assert user.user_id not in listener._subscribers
+
+
+def test_full_or_malformed_messages_are_dropped():
+    listener = EventListener(engine=None)
+    subscriber = queue.Queue(maxsize=1)
+    listener._subscribers[1] = {subscriber}
+
+    listener._dispatch("not json")
+    listener._dispatch('{"user_id": 1, "event": "first", "data": {}}')
+    listener._dispatch('{"user_id": 1, "event": "second", "data": {}}')
+
+    assert subscriber.get_nowait() == ("first", {})
+    assert subscriber.empty()
@@ -0,0 +1,92 @@
+import datetime as datetime_module
+import io
+import os
+import stat
+import types
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import boto3
+import botocore.auth
+import pytest
+from botocore.config import Config
+
+from utils.file_storage import (
+    LOCAL_FILE_MODE,
+    PRESIGNED_URL_EXPIRES,
+    LocalStorage,
+    SigV4Presigner,
+)
+
+
+def test_local_storage_files_are_readable(tmp_path):
+    storage = LocalStorage(str(tmp_path), "/storage")
+    storage.put("user_photo/a", b"data", "image/webp")
+    storage.put_stream("meddoc/b", io.BytesIO(b"data"), "application/pdf")
+
+    for key in ("user_photo/a", "meddoc/b"):
+        mode = stat.S_IMODE(os.stat(storage.path(key)).st_mode)
+        assert mode == LOCAL_FILE_MODE
+        assert storage.get(key) == b"data"
+    assert not [name for name in os.listdir(tmp_path / "meddoc") if ".part" in name]
+
+
+FROZEN_NOW = datetime(2026, 3, 1, 23, 59, 58, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def frozen_botocore(monkeypatch):
+    """Make botocore sign requests at FROZEN_NOW."""
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return FROZEN_NOW.replace(tzinfo=None)
+
+    frozen_module = types.SimpleNamespace(**vars(datetime_module))
+    frozen_module.datetime = FrozenDatetime
+    monkeypatch.setattr(botocore.auth, "datetime", frozen_module)
+
+
+KEYS = [
+    "pet_photo/3f2a9c",
+    "pet_photo/3f2a9c_1200",
+    "meddoc/zażółć gęślą jaźń.pdf",
+    "meddoc/a b+c~d(1)&e=f?.pdf",
+]
+
+
+@pytest.mark.parametrize(
+    "region, expires_in",
+    [
+        ("us-east-1", PRESIGNED_URL_EXPIRES),
+        ("us-east-1", 60),
+        ("eu-central-1", 7 * 24 * 3600),
+    ],
+)
+def test_presign_matches_boto3(frozen_botocore, region, expires_in):
+    endpoint, bucket = "http://storage:9000", "upload"
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id="access",
+        aws_secret_access_key="secret",
+        region_name=region,
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+    )
+    expected = {}
+    for key in KEYS:
+        url = urlsplit(
+            client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": bucket, "Key": key},
+                ExpiresIn=expires_in,
+            )
+        )
+        expected[key] = f"{url.path}?{url.query}"
+
+    presigner = SigV4Presigner(endpoint, bucket, "access", "secret", region)
+    # a signing key cached on the previous day must not be reused
+    presigner.presign(KEYS, expires_in, FROZEN_NOW - timedelta(days=1))
+
+    assert presigner.presign(KEYS, expires_in, FROZEN_NOW) == expected
@@ -0,0 +1,105 @@
+import time
+
+import flask
+
+from app import db
+from db_models.database_tables import User
+from utils.file_storage import PRESIGNED_URL_MARGIN
+from utils.http_cache import bump_version, conditional, url_bucket
+
+
+def revalidate(client, url, response):
+    return client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+
+
+def test_only_200_responses_get_an_etag():
+    app = flask.Flask(__name__)
+    status = {"/found": 200, "/gone": 410}
+
+    @app.route("/found", endpoint="found")
+    @app.route("/gone", endpoint="gone")
+    @conditional(lambda: {"version": 1})
+    def view():
+        return "treść", status[flask.request.path]
+
+    @app.route("/missing")
+    @conditional(lambda: None)
+    def missing():
+        return "brak", 404
+
+    client = app.test_client()
+    found = client.get("/found")
+    assert found.headers["ETag"]
+    assert found.headers["Cache-Control"] == "private, no-cache"
+    assert "ETag" not in client.get("/gone").headers
+    assert "ETag" not in client.get("/missing").headers
+    # the URL is part of the ETag
+    assert client.get("/found?photo_size=320").headers["ETag"] != found.headers["ETag"]
+
+
+def test_matching_etag_is_answered_with_304(make_user, client_for):
+    user = make_user()
+    client, url = client_for(make_user()), f"/user/{user.user_id}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+
+    not_modified = revalidate(client, url, response)
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+    # another viewer sees the profile through other eyes
+    assert client_for(user).get(url).headers["ETag"] != response.headers["ETag"]
+
+
+def test_version_bump_changes_the_etag(make_user, client_for):
+    user = make_user()
+    client, url = client_for(make_user()), f"/user/{user.user_id}"
+    response = client.get(url)
+
+    bump_version(User, [user.user_id])
+    db.session.commit()
+
+    changed = revalidate(client, url, response)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != response.headers["ETag"]
+
+
+def test_applying_changes_the_post_etag(make_user, make_post, client_for):
+    post = make_post(make_user())
+    viewer = make_user()
+    client, url = client_for(viewer), f"/getPost/{post.post_id}"
+    response = client.get(url)
+    assert response.get_json()["status"] == ""
+
+    assert client.post(f"/applyToPost/{post.post_id}").status_code == 200
+
+    changed = revalidate(client, url, response)
+    assert changed.status_code == 200
+    assert changed.get_json()["status"] == "applied"
+
+
+def test_etag_expires_with_the_url_bucket(monkeypatch, make_user, client_for):
+    user = make_user()
+    client, url = client_for(make_user()), f"/user/{user.user_id}"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    response = client.get(url)
+    bucket = url_bucket()
+
+    # presigned URLs in the body would expire soon, the response is not reused
+    monkeypatch.setattr(time, "time", lambda: now + PRESIGNED_URL_MARGIN)
+    assert url_bucket() == bucket + 1
+    changed = revalidate(client, url, response)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != response.headers["ETag"]
+
+
+def test_unknown_rows_get_no_etag(make_user, client_for):
+    client = client_for(make_user())
+
+    for url in ("/user/0", "/getPost/0"):
+        response = client.get(url)
+        assert response.status_code == 404
+        assert "ETag" not in response.headers
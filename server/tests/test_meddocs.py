@@ -0,0 +1,135 @@
+import io
+import json
+
+import pytest
+
+from app import db
+from db_models.database_tables import MedDocDict, Pet
+from utils.file_storage import STREAM_CHUNK_SIZE
+
+
+@pytest.fixture
+def doc_type(app):
+    doc_type = MedDocDict(doc_name="Szczepienia")
+    db.session.add(doc_type)
+    db.session.commit()
+    yield doc_type.doc_type_id
+    db.session.delete(doc_type)
+    db.session.commit()
+
+
+def upload(client, pet_id, doc_type_id, content):
+    return client.post(
+        f"/pet/{pet_id}/medDocs",
+        data={
+            "json": json.dumps(
+                {"doc_type_id": doc_type_id, "start_date": "2025-01-01"}
+            ),
+            "doc": (io.BytesIO(content), "skan.pdf", "application/pdf"),
+        },
+        content_type="multipart/form-data",
+    )
+
+
+def test_upload_limit_is_meddoc_max_size(
+    app, monkeypatch, make_user, client_for, doc_type
+):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1000)
+    monkeypatch.setitem(app.config, "MEDDOC_MAX_SIZE", 10000)
+    owner = make_user()
+    pet = Pet(pet_name="Burek", type="Pies", race="Kundel", user_id=owner.user_id)
+    db.session.add(pet)
+    db.session.commit()
+    client = client_for(owner)
+
+    assert upload(client, pet.pet_id, doc_type, b"x" * 5000).status_code == 201
+    assert upload(client, pet.pet_id, doc_type, b"x" * 20000).status_code == 413
+
+
+@pytest.fixture
+def meddoc(make_user, client_for, doc_type):
+    """(client of the owner, meddoc_id, content) of an uploaded document."""
+    owner = make_user()
+    pet = Pet(pet_name="Burek", type="Pies", race="Kundel", user_id=owner.user_id)
+    db.session.add(pet)
+    db.session.commit()
+    client = client_for(owner)
+    # spans several storage chunks
+    content = bytes(range(256)) * (STREAM_CHUNK_SIZE // 128 + 1)
+    meddoc_id = upload(client, pet.pet_id, doc_type, content).get_json()["meddoc_id"]
+    return client, meddoc_id, content
+
+
+def test_download_ranges(meddoc):
+    client, meddoc_id, content = meddoc
+
+    def download(range_header):
+        return client.get(f"/medDocs/{meddoc_id}", headers={"Range": range_header})
+
+    single = download("bytes=10-19")
+    assert single.status_code == 206
+    assert single.data == content[10:20]
+    assert single.headers["Content-Range"] == f"bytes 10-19/{len(content)}"
+    assert single.headers["Content-Length"] == "10"
+
+    across_chunks = download(f"bytes={STREAM_CHUNK_SIZE - 5}-{STREAM_CHUNK_SIZE + 4}")
+    assert across_chunks.status_code == 206
+    assert across_chunks.data == content[STREAM_CHUNK_SIZE - 5 : STREAM_CHUNK_SIZE + 5]
+
+    suffix = download("bytes=-100")
+    assert suffix.status_code == 206
+    assert suffix.data == content[-100:]
+
+    open_ended = download(f"bytes={len(content) - 30}-")
+    assert open_ended.data == content[-30:]
+
+    # no multipart/byteranges, the whole document instead
+    multiple = download("bytes=0-9,20-29")
+    assert multiple.status_code == 200
+    assert multiple.data == content
+    assert "Content-Range" not in multiple.headers
+
+    unsatisfiable = download(f"bytes={len(content)}-")
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == f"bytes */{len(content)}"
+
+
+def test_if_range(meddoc):
+    client, meddoc_id, content = meddoc
+    etag = client.get(f"/medDocs/{meddoc_id}").headers["ETag"]
+
+    def download(if_range):
+        return client.get(
+            f"/medDocs/{meddoc_id}",
+            headers={"Range": "bytes=0-99", "If-Range": if_range},
+        )
+
+    resumed = download(etag)
+    assert resumed.status_code == 206
+    assert resumed.data == content[:100]
+
+    # the document changed since the first part, start over
+    changed = download('"another-version"')
+    assert changed.status_code == 200
+    assert changed.data == content
+
+    # there is no Last-Modified to compare a date with
+    dated = download("Wed, 21 Oct 2015 07:28:00 GMT")
+    assert dated.status_code == 200
+    assert dated.data == content
+
+
+def test_download_revalidation(meddoc):
+    client, meddoc_id, content = meddoc
+    first = client.get(f"/medDocs/{meddoc_id}")
+    assert first.data == content
+    assert first.headers["Accept-Ranges"] == "bytes"
+    assert first.headers["Content-Disposition"] == (
+        "attachment; filename*=UTF-8''skan.pdf"
+    )
+
+    not_modified = client.get(
+        f"/medDocs/{meddoc_id}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
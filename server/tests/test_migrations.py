@@ -0,0 +1,142 @@
+import os
+import uuid
+
+import pytest
+import sqlalchemy
+from sqlalchemy.pool import NullPool
+
+from app import db
+from utils.file_storage import get_storage
+from utils.migrations import applied_versions, apply_migrations, list_migrations
+
+ORIGINAL_SCHEMA = os.path.join(os.path.dirname(__file__), "data", "original_schema.sql")
+
+SEED = """
+INSERT INTO petbuddies_schema."DPostalCode" (postal_code, place, latitude, longitude)
+VALUES ('00-001', 'Warszawa', 52.23, 21.01), ('30-001', 'Kraków', 50.06, 19.94);
+
+INSERT INTO petbuddies_schema."User" (login, password_hash, join_date, city, postal_code, email)
+VALUES ('owner', 'x', '2024-01-01', 'Warszawa', '00-001', 'owner@example.com'),
+       ('carer', 'x', '2024-01-01', 'Kraków', '30-001', 'carer@example.com'),
+       ('nowhere', 'x', '2024-01-01', NULL, NULL, 'nowhere@example.com'),
+       ('newcode', 'x', '2024-01-01', 'Kraków', '30-999', 'newcode@example.com');
+
+INSERT INTO petbuddies_schema."Pet" (user_id, pet_name, creation_date, type, race)
+VALUES (1, 'Burek', '2024-01-01', 'Pies', 'Kundel');
+
+INSERT INTO petbuddies_schema."Post"
+    (user_id, start_date, end_date, start_time, end_time, is_active)
+VALUES (1, '2024-02-01', '2024-02-02', '08:00', '18:00', true),
+       (1, '2024-03-01', '2024-03-02', '08:00', '18:00', false);
+
+INSERT INTO petbuddies_schema."PetCareApplication" (post_id, user_id, cancelled, declined, accepted)
+VALUES (1, 2, false, false, false),
+       (1, 3, false, true, false),
+       (2, 2, false, false, true);
+
+INSERT INTO petbuddies_schema."UserRating" (user_id, petcareapplication_id, star_number)
+VALUES (2, 3, 5), (2, 3, 3);
+
+INSERT INTO petbuddies_schema."MedDocDict" (doc_name) VALUES ('Szczepienia');
+
+INSERT INTO petbuddies_schema."MedDocs" (pet_id, start_date, doc_type_id, doc)
+VALUES (1, '2024-01-01', 1, '\\x255044462d312e340a');
+"""
+
+COLUMNS = """
+SELECT table_name, column_name, data_type, is_nullable, column_default
+FROM information_schema.columns WHERE table_schema = 'petbuddies_schema'
+"""
+
+INDEXES = "SELECT indexdef FROM pg_indexes WHERE schemaname = 'petbuddies_schema'"
+
+
+def test_init_sql_is_at_the_last_migration(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert applied_versions(connection) == {
+                version for version, _ in list_migrations()
+            }
+
+        result = app.test_cli_runner().invoke(args=["schema", "upgrade"])
+        assert result.exit_code == 0, result.output
+        assert "Schema is up to date" in result.output
+
+
+@pytest.fixture
+def original_database(app):
+    """A scratch database with the schema from before the migrations."""
+    url = sqlalchemy.engine.make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    admin = sqlalchemy.create_engine(
+        url, isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+    name = f"petbuddies_migrations_{uuid.uuid4().hex[:8]}"
+
+    with admin.connect() as connection:
+        available = connection.execute(
+            sqlalchemy.text(
+                "SELECT count(*) FROM pg_available_extensions "
+                "WHERE name IN ('cube', 'earthdistance')"
+            )
+        ).scalar()
+        if available < 2:
+            pytest.skip("cube/earthdistance are not installed")
+        connection.exec_driver_sql(f"CREATE DATABASE {name}")
+
+    engine = sqlalchemy.create_engine(url.set(database=name), poolclass=NullPool)
+    try:
+        with engine.begin() as connection, open(ORIGINAL_SCHEMA) as f:
+            connection.exec_driver_sql(f.read())
+            connection.exec_driver_sql(SEED)
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.connect() as connection:
+            connection.exec_driver_sql(f"DROP DATABASE {name}")
+
+
+def test_upgrade_from_the_original_schema(app, original_database):
+    with app.app_context():
+        applied = apply_migrations(original_database)
+        assert applied == [version for version, _ in list_migrations()]
+        # nothing left the second time
+        assert apply_migrations(original_database) == []
+
+        with db.engine.connect() as connection:
+            columns = set(connection.execute(sqlalchemy.text(COLUMNS)))
+            indexes = set(connection.execute(sqlalchemy.text(INDEXES)).scalars())
+
+        with original_database.connect() as connection:
+            assert set(connection.execute(sqlalchemy.text(COLUMNS))) == columns
+            assert (
+                set(connection.execute(sqlalchemy.text(INDEXES)).scalars()) == indexes
+            )
+
+            def query(sql):
+                return connection.execute(sqlalchemy.text(sql)).all()
+
+            assert query(
+                "SELECT latitude, longitude, rating_count, rating_sum, "
+                'pending_applications FROM petbuddies_schema."User" ORDER BY user_id'
+            ) == [
+                (52.23, 21.01, 0, 0, 1),
+                (50.06, 19.94, 2, 8, 0),
+                (None, None, 0, 0, 0),
+                # unknown postal code, coordinates of the city
+                (50.06, 19.94, 0, 0, 0),
+            ]
+            assert query(
+                "SELECT latitude, longitude, pending_applications, version "
+                'FROM petbuddies_schema."Post" ORDER BY post_id'
+            ) == [(52.23, 21.01, 1, 1), (52.23, 21.01, 0, 1)]
+
+            ((storage_key, file_name, content_type, size),) = query(
+                "SELECT storage_key, file_name, content_type, size "
+                'FROM petbuddies_schema."MedDocs"'
+            )
+            assert (file_name, content_type, size) == (
+                "dokument-1.pdf",
+                "application/pdf",
+                9,
+            )
+            assert get_storage().get(storage_key) == b"%PDF-1.4\n"
@@ -0,0 +1,222 @@
+import smtplib
+from datetime import datetime
+
+import pytest
+
+from app import db
+from db_models.database_tables import (
+    OUTBOX_FAILED,
+    OUTBOX_PENDING,
+    OUTBOX_SENT,
+    Outbox,
+    PetCareApplication,
+    Post,
+)
+from utils.outbox import enqueue_email, send_batch
+
+
+class FakeSMTPServer:
+    """Stands in for the mail server behind `smtplib.SMTP`."""
+
+    def __init__(self):
+        self.delivered = []
+        self.connections = 0
+        self.refused = set()
+        self.drops = 0  # how many sends in a row lose the connection
+        self.down = False
+
+    def connect(self, host, port, timeout=None):
+        if self.down:
+            raise ConnectionRefusedError(111, "Connection refused")
+        self.connections += 1
+        return FakeSMTP(self)
+
+
+class FakeSMTP:
+    def __init__(self, server):
+        self.server = server
+        self.connected = True
+
+    def send_message(self, email):
+        if not self.connected:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+        if self.server.drops:
+            self.server.drops -= 1
+            self.connected = False
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if email["To"] in self.server.refused:
+            raise smtplib.SMTPRecipientsRefused({email["To"]: (550, b"No such user")})
+        self.server.delivered.append(email["To"])
+
+    def quit(self):
+        self.connected = False
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = FakeSMTPServer()
+    monkeypatch.setattr(smtplib, "SMTP", server.connect)
+    return server
+
+
+@pytest.fixture
+def outbox(app):
+    """Queue mails in a clean outbox, returning their ids."""
+    with app.app_context():
+        db.session.query(Outbox).delete()
+        db.session.commit()
+
+        def outbox(*recipients):
+            for recipient in recipients:
+                enqueue_email(recipient, "Temat", "Treść")
+            db.session.commit()
+            return {
+                message.recipient: message.outbox_id
+                for message in db.session.query(Outbox)
+            }
+
+        yield outbox
+        db.session.rollback()
+        db.session.query(Outbox).delete()
+        db.session.commit()
+
+
+def stored(outbox_id):
+    db.session.expire_all()
+    return db.session.get(Outbox, outbox_id)
+
+
+def test_sends_a_batch_over_one_connection(smtp_server, outbox):
+    ids = outbox("a@example.com", "b@example.com")
+
+    assert send_batch() == 2
+
+    assert sorted(smtp_server.delivered) == ["a@example.com", "b@example.com"]
+    assert smtp_server.connections == 1
+    for outbox_id in ids.values():
+        message = stored(outbox_id)
+        assert message.status == OUTBOX_SENT
+        assert message.attempts == 0
+        assert message.sent_at is not None
+
+
+def test_refused_mail_is_retried_later(smtp_server, outbox):
+    smtp_server.refused.add("gone@example.com")
+    ids = outbox("gone@example.com", "b@example.com")
+
+    send_batch()
+
+    refused = stored(ids["gone@example.com"])
+    assert refused.status == OUTBOX_PENDING
+    assert refused.attempts == 1
+    assert "No such user" in refused.last_error
+    assert refused.next_attempt_at > datetime.now()
+    assert stored(ids["b@example.com"]).status == OUTBOX_SENT
+
+    # not due yet
+    assert send_batch() == 0
+
+
+def test_gives_up_after_max_attempts(app, monkeypatch, smtp_server, outbox):
+    monkeypatch.setitem(app.config, "OUTBOX_MAX_ATTEMPTS", 2)
+    smtp_server.refused.add("gone@example.com")
+    outbox_id = outbox("gone@example.com")["gone@example.com"]
+
+    for attempt in range(2):
+        send_batch()
+        db.session.query(Outbox).update({Outbox.next_attempt_at: datetime.now()})
+        db.session.commit()
+
+    message = stored(outbox_id)
+    assert message.status == OUTBOX_FAILED
+    assert message.attempts == 2
+
+
+def test_reconnects_once_after_a_dropped_connection(smtp_server, outbox):
+    ids = outbox("a@example.com", "b@example.com")
+    smtp_server.drops = 1
+
+    assert send_batch() == 2
+
+    assert sorted(smtp_server.delivered) == ["a@example.com", "b@example.com"]
+    assert smtp_server.connections == 2
+    for outbox_id in ids.values():
+        message = stored(outbox_id)
+        assert message.status == OUTBOX_SENT
+        assert message.attempts == 0
+
+
+def test_lost_server_only_charges_the_mail_being_sent(smtp_server, outbox):
+    ids = outbox("a@example.com", "b@example.com", "c@example.com")
+    smtp_server.drops = 2
+
+    assert send_batch() == 1
+
+    messages = [stored(outbox_id) for outbox_id in ids.values()]
+    assert sorted(message.attempts for message in messages) == [0, 0, 1]
+    assert all(message.status == OUTBOX_PENDING for message in messages)
+
+    # the untouched mails go out on the next poll
+    assert send_batch() == 2
+    assert len(smtp_server.delivered) == 2
+
+
+def test_unreachable_server_stops_the_batch(smtp_server, outbox):
+    ids = outbox("a@example.com", "b@example.com")
+    smtp_server.down = True
+
+    assert send_batch() == 1
+
+    messages = [stored(outbox_id) for outbox_id in ids.values()]
+    assert sorted(message.attempts for message in messages) == [0, 1]
+    assert "Connection refused" in max(messages, key=lambda m: m.attempts).last_error
+
+
+def test_poison_row_does_not_stop_the_worker(app, smtp_server, outbox):
+    # a header with a line break cannot be built into a message
+    ids = outbox("a@example.com", "bad@example.com\nBcc: x@example.com")
+
+    result = app.test_cli_runner().invoke(args=["outbox", "run", "--once"])
+    assert result.exit_code == 0, result.output
+
+    assert smtp_server.delivered == ["a@example.com"]
+    assert stored(ids["a@example.com"]).status == OUTBOX_SENT
+    poison = stored(ids["bad@example.com\nBcc: x@example.com"])
+    assert poison.status == OUTBOX_FAILED
+    assert poison.attempts == 1
+    assert poison.last_error.startswith("ValueError")
+
+
+def test_rolled_back_mail_is_never_queued(outbox):
+    enqueue_email("a@example.com", "Temat", "Treść")
+    db.session.rollback()
+
+    assert db.session.query(Outbox).count() == 0
+
+
+def test_accepting_an_application_queues_a_mail(
+    outbox, make_user, make_post, client_for
+):
+    owner = make_user()
+    caregiver = make_user()
+    other_post = make_post(make_user())
+    post = make_post(owner)
+    db.session.add(PetCareApplication(post_id=post.post_id, user_id=caregiver.user_id))
+    db.session.commit()
+    client = client_for(owner)
+
+    missing = client.put(f"/getPost/{post.post_id}/acceptApplication/{owner.user_id}")
+    assert missing.status_code == 404
+
+    response = client.put(
+        f"/getPost/{post.post_id}/acceptApplication/{caregiver.user_id}"
+    )
+    assert response.status_code == 200
+
+    (message,) = db.session.query(Outbox).all()
+    assert message.recipient == caregiver.email
+    assert message.status == OUTBOX_PENDING
+    assert f"ogłoszenia nr {post.post_id} " in message.body
+    db.session.expire_all()
+    assert not db.session.get(Post, post.post_id).is_active
+    assert db.session.get(Post, other_post.post_id).is_active
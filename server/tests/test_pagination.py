@@ -0,0 +1,37 @@
+import pytest
+
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    cursor = encode_cursor("distance", 1.5, 7)
+    assert decode_cursor(cursor, str, float, int) == ["distance", 1.5, 7]
+
+
+def test_infinite_sort_key():
+    cursor = encode_cursor("distance", float("inf"), 7)
+    assert decode_cursor(cursor, str, float, int)[1] == float("inf")
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        (1, 2.0, 3),
+        ("distance", "1.0", 3),
+        ("distance", float("nan"), 3),
+        ("distance", float("-inf"), 3),
+        ("distance", 1.0, 3.5),
+        ("distance", 1.0, True),
+        ("distance", 1.0, [3]),
+        ("distance", 1.0),
+    ],
+)
+def test_rejects_malformed_values(values):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(*values), str, float, int)
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90IGpzb24", "eyJhIjoxfQ"])
+def test_rejects_garbage(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, int)
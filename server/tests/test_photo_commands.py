@@ -0,0 +1,46 @@
+import io
+
+from PIL import Image
+
+from app import db
+from db_models.database_tables import PHOTO_READY, UserPhoto
+from utils.file_storage import object_exists, read_object, upload_object
+
+
+def webp(size, color):
+    img_io = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(img_io, "WEBP")
+    return img_io.getvalue()
+
+
+def test_rebuild_variants(app, make_user):
+    config = app.config
+    default_size = config["PHOTO_DEFAULT_SIZE"]
+    user = make_user()
+    db.session.add_all(
+        [
+            UserPhoto(photo_name=name, user_id=user.user_id, status=PHOTO_READY)
+            for name in ("legacy", "current")
+        ]
+    )
+    db.session.commit()
+
+    legacy = webp(default_size, "red")
+    upload_object(legacy, "user_photo", "legacy")
+    current = {size: webp(size, "blue") for size in config["PHOTO_VARIANTS"]}
+    for size, data in current.items():
+        upload_object(data, "user_photo", "current", size)
+
+    result = app.test_cli_runner().invoke(args=["photos", "rebuild-variants"])
+    assert result.exit_code == 0, result.output
+    assert "user_photo: 1 of 2 photos rebuilt" in result.output
+
+    for size in config["PHOTO_VARIANTS"]:
+        assert object_exists("user_photo", "legacy", size)
+        data = read_object("user_photo", "legacy", size)
+        if size > default_size:
+            # not upscaled, the default variant as it is
+            assert data == legacy
+        else:
+            assert Image.open(io.BytesIO(data)).size == (size, size)
+        assert read_object("user_photo", "current", size) == current[size]
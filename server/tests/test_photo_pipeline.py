@@ -0,0 +1,162 @@
+import hashlib
+import io
+import json
+import os
+import time
+
+import pytest
+import sqlalchemy
+from PIL import Image
+
+import routes.auth
+import routes.pets
+from app import db
+from db_models.database_tables import (
+    PHOTO_PENDING,
+    PHOTO_READY,
+    Pet,
+    PetPhoto,
+    UserPhoto,
+)
+from utils import photo_pipeline
+from utils.file_storage import object_exists
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.1)
+        db.session.rollback()
+
+
+def jpeg(color="green"):
+    img_io = io.BytesIO()
+    Image.new("RGB", (1600, 1200), color).save(img_io, "JPEG")
+    img_io.seek(0)
+    return img_io
+
+
+def add_pet(client, *photos):
+    return client.post(
+        "/addPet",
+        data={
+            "json": json.dumps(
+                {
+                    "pet_name": "Burek",
+                    "type": "Pies",
+                    "race": "Kundel",
+                    "size": "duży",
+                    "birth_date": "2020-01-01",
+                }
+            ),
+            "photo": [(photo, "photo.jpg") for photo in photos],
+        },
+        content_type="multipart/form-data",
+    )
+
+
+def pet_photos(user):
+    return (
+        db.session.query(PetPhoto)
+        .join(Pet, Pet.pet_id == PetPhoto.pet_id)
+        .filter(Pet.user_id == user.user_id)
+        .all()
+    )
+
+
+def test_upload_is_stored_and_marked_ready(app, make_user, client_for):
+    user = make_user()
+    assert add_pet(client_for(user), jpeg()).status_code == 201
+
+    wait_for(lambda: [p.status for p in pet_photos(user)] == [PHOTO_READY])
+    (photo,) = pet_photos(user)
+    for size in app.config["PHOTO_VARIANTS"]:
+        assert object_exists("pet_photo", photo.photo_name, size)
+
+
+def test_failed_upload_removes_its_row(app, make_user, client_for):
+    user = make_user()
+    assert add_pet(client_for(user), io.BytesIO(b"not an image")).status_code == 201
+
+    wait_for(lambda: not pet_photos(user))
+
+
+def test_broken_process_pool_is_replaced(app, make_user, client_for):
+    user = make_user()
+    client = client_for(user)
+    assert add_pet(client, jpeg()).status_code == 201
+    wait_for(lambda: [p.status for p in pet_photos(user)] == [PHOTO_READY])
+
+    # a worker killed e.g. by the OOM killer breaks the whole pool
+    process_pool, _ = photo_pipeline._get_pools()
+    for process in list(process_pool._processes.values()):
+        process.kill()
+    wait_for(lambda: process_pool._broken)
+
+    assert add_pet(client, jpeg("blue")).status_code == 201
+    wait_for(lambda: [p.status for p in pet_photos(user)] == [PHOTO_READY] * 2)
+    assert photo_pipeline._get_pools()[0] is not process_pool
+
+
+@pytest.fixture
+def staging_dir(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, "PHOTO_STAGING_DIR", str(tmp_path))
+    return tmp_path
+
+
+def failing_commit(*args, **kwargs):
+    raise sqlalchemy.exc.IntegrityError("UPDATE", {}, Exception("conflict"))
+
+
+def test_failed_commit_removes_staged_pet_photos(
+    monkeypatch, staging_dir, make_user, client_for
+):
+    monkeypatch.setattr(routes.pets, "bump_version", failing_commit)
+    user = make_user()
+
+    assert add_pet(client_for(user), jpeg(), jpeg("blue")).status_code == 406
+    assert os.listdir(staging_dir) == []
+    assert not pet_photos(user)
+
+
+def test_failed_commit_removes_staged_user_photos(
+    monkeypatch, staging_dir, make_user, client_for
+):
+    monkeypatch.setattr(routes.auth, "bump_version", failing_commit)
+    user = make_user()
+
+    response = client_for(user).put(
+        "/edit_user",
+        data={"json": "{}", "photo": [(jpeg(), "photo.jpg")]},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+    assert os.listdir(staging_dir) == []
+
+
+def test_failed_reupload_resolves_a_pending_row(make_user, client_for):
+    user = make_user()
+    data = b"not an image either"
+    # processing of the first upload was lost, e.g. with a restarted worker
+    db.session.add(
+        UserPhoto(
+            user_id=user.user_id,
+            photo_name=hashlib.sha256(data).hexdigest(),
+            status=PHOTO_PENDING,
+        )
+    )
+    db.session.commit()
+
+    response = client_for(user).put(
+        "/edit_user",
+        data={"json": "{}", "photo": [(io.BytesIO(data), "photo.jpg")]},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+
+    wait_for(
+        lambda: not db.session.query(UserPhoto)
+        .filter(UserPhoto.user_id == user.user_id)
+        .all()
+    )
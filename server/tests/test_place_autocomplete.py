@@ -0,0 +1,101 @@
+import re
+from collections import Counter
+
+import pytest
+
+from app import db
+from db_models.database_tables import DPostalCode
+from utils.place_autocomplete import place_autocomplete
+from utils.reference_snapshot import AUTOCOMPLETE_LIMIT, normalize
+
+
+@pytest.fixture(scope="module")
+def pairs(app):
+    """Distinct (place, postal_code) pairs of DPostalCode."""
+    with app.app_context():
+        rows = db.session.query(DPostalCode.place, DPostalCode.postal_code).all()
+        db.session.rollback()
+    return sorted(set(rows))
+
+
+def expected_places(pairs, query):
+    """suggest() by brute force: first word matches before the others, then
+    places with more postal codes, then place name and code."""
+    prefix = normalize(query)
+    code_count = Counter(place for place, _ in pairs)
+    ranked = []
+    for place, postal_code in pairs:
+        words = normalize(place).split(" ")
+        positions = [
+            position
+            for position in range(len(words))
+            if " ".join(words[position:]).startswith(prefix)
+        ]
+        if positions:
+            ranked.append(
+                (
+                    (
+                        min(positions) > 0,
+                        -code_count[place],
+                        place.encode("utf-8"),
+                        postal_code,
+                    ),
+                    (place, postal_code),
+                )
+            )
+    return [pair for _, pair in sorted(ranked)[:AUTOCOMPLETE_LIMIT]]
+
+
+def expected_codes(pairs, query):
+    digits = re.sub(r"\D", "", query)
+    matching = [
+        (re.sub(r"\D", "", postal_code), place, postal_code)
+        for place, postal_code in pairs
+        if re.sub(r"\D", "", postal_code).startswith(digits)
+    ]
+    return [(place, code) for _, place, code in sorted(matching)][:AUTOCOMPLETE_LIMIT]
+
+
+# up to 3 characters the top 20 come precomputed from the snapshot
+@pytest.mark.parametrize("query", ["w", "Wa", "kr", "ł", "Ło", "zie", "ą", "z "])
+def test_short_prefixes(app, pairs, query):
+    with app.app_context():
+        assert place_autocomplete.suggest(query) == expected_places(pairs, query)
+
+
+@pytest.mark.parametrize(
+    "query", ["warsz", "Kraków", "ZIELONA G", "biała-pod", "gora", "nowa wies"]
+)
+def test_long_prefixes(app, pairs, query):
+    with app.app_context():
+        suggestions = place_autocomplete.suggest(query)
+    assert suggestions == expected_places(pairs, query)
+    assert suggestions
+
+
+@pytest.mark.parametrize("query", ["0", "30", "30-0", "00-95", "309", "9 9"])
+def test_postal_codes(app, pairs, query):
+    with app.app_context():
+        assert place_autocomplete.suggest(query) == expected_codes(pairs, query)
+
+
+@pytest.mark.parametrize("query", ["", "  ", "-", "٣", "xqzxqz"])
+def test_nothing_to_suggest(app, query):
+    with app.app_context():
+        assert place_autocomplete.suggest(query) == []
+
+
+def test_city_route(app, pairs):
+    client = app.test_client()
+
+    response = client.get("/city/krak")
+    assert response.status_code == 200
+    assert [
+        (item["place"], item["postal_code"]) for item in response.get_json()
+    ] == expected_places(pairs, "krak")
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+
+    revalidated = client.get(
+        "/city/krak", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
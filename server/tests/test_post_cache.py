@@ -0,0 +1,99 @@
+import json
+
+from app import db
+from db_models.database_tables import Pet, Post
+from utils.http_cache import bump_version
+from utils.post_cache import PostDetailCache, post_detail_cache
+
+
+def test_changes_evict_only_the_posts_showing_them():
+    cache = PostDetailCache(maxsize=10, ttl=60)
+    generation = cache.generation()
+    cache.set(1, "post 1", generation, pet_ids=[10, 11], user_ids=[100])
+    cache.set(2, "post 2", generation, pet_ids=[12], user_ids=[100, 101])
+
+    cache.invalidate_pet(11)
+    assert cache.get(1) is None
+    assert cache.get(2) == "post 2"
+
+    cache.invalidate_user(101)
+    assert cache.get(2) is None
+    assert not cache._posts_by_pet and not cache._posts_by_user
+
+
+def test_document_read_before_a_change_is_not_stored():
+    cache = PostDetailCache(maxsize=10, ttl=60)
+    generation = cache.generation()
+
+    # another request changes a pet while this one builds post 1
+    cache.invalidate_pet(10)
+    cache.set(1, "stale", generation, pet_ids=[10], user_ids=[100])
+    assert cache.get(1) is None
+
+    cache.set(1, "fresh", cache.generation(), pet_ids=[10], user_ids=[100])
+    assert cache.get(1) == "fresh"
+
+
+def test_dependencies_of_expired_documents_are_pruned():
+    cache = PostDetailCache(maxsize=2, ttl=0)
+    for post_id in range(5):
+        cache.set(post_id, "doc", cache.generation(), [post_id], [post_id])
+
+    assert len(cache._deps) <= 2 * cache._docs.maxsize
+    assert len(cache._posts_by_pet) == len(cache._deps)
+
+
+def viewed(client, post_id):
+    response = client.get(f"/getPost/{post_id}")
+    assert response.status_code == 200
+    assert post_detail_cache.get(post_id) is not None
+    return response.get_json()
+
+
+def test_owner_edit_refreshes_the_post(make_user, make_post, client_for):
+    owner = make_user(description="Stary opis")
+    post_id = make_post(owner).post_id
+    viewer = client_for(make_user())
+    assert viewed(viewer, post_id)["user"]["description"] == "Stary opis"
+
+    response = client_for(owner).put(
+        "/edit_user", data={"json": json.dumps({"description": "Nowy opis"})}
+    )
+    assert response.status_code == 200
+
+    assert post_detail_cache.get(post_id) is None
+    assert viewed(viewer, post_id)["user"]["description"] == "Nowy opis"
+
+
+def test_deleted_pet_refreshes_the_post(make_user, make_post, client_for):
+    owner = make_user()
+    post_id = make_post(owner, pet_count=2).post_id
+    other_post_id = make_post(make_user()).post_id
+    viewer = client_for(make_user())
+    viewed(viewer, post_id)
+    viewed(viewer, other_post_id)
+    pet_id = (
+        db.session.query(Pet.pet_id).filter(Pet.user_id == owner.user_id).first()[0]
+    )
+
+    assert client_for(owner).post(f"/deletePet/{pet_id}").status_code == 200
+
+    assert post_detail_cache.get(post_id) is None
+    assert post_detail_cache.get(other_post_id) is not None
+
+
+def test_change_in_another_worker_is_seen_through_the_versions(
+    make_user, make_post, client_for
+):
+    post = make_post(make_user())
+    post_id = post.post_id
+    viewer = client_for(make_user())
+    viewed(viewer, post_id)
+
+    # committed elsewhere, no signal reaches this process
+    post.description = "Zmieniony opis"
+    bump_version(Post, [post_id])
+    db.session.commit()
+
+    assert post_detail_cache.get(post_id) is not None
+    assert viewed(viewer, post_id)["post"]["description"] == "Zmieniony opis"
@@ -0,0 +1,44 @@
+from db_models.database_tables import PetCareApplication
+from app import db
+from utils.post_cache import post_detail_cache
+
+
+def test_get_post_is_one_round_trip(make_user, make_post, client_for, statements):
+    owner, viewer = make_user(), make_user()
+    post = make_post(owner, pet_count=3)
+    db.session.add(PetCareApplication(post_id=post.post_id, user_id=viewer.user_id))
+    db.session.commit()
+    post_id = post.post_id
+    client = client_for(viewer)
+    post_detail_cache.invalidate_post(post_id)
+
+    # cache miss: the validator's query is the detail query
+    statements.clear()
+    cold = client.get(f"/getPost/{post_id}")
+    assert cold.status_code == 200
+    assert len(statements) == 1
+
+    # cached document: only the versions and the viewer's application
+    statements.clear()
+    warm = client.get(f"/getPost/{post_id}")
+    assert warm.status_code == 200
+    assert len(statements) == 1
+    assert warm.get_json() == cold.get_json()
+    assert warm.get_json()["status"] == "applied"
+    assert len(warm.get_json()["pets"]) == 3
+
+    statements.clear()
+    not_modified = client.get(
+        f"/getPost/{post_id}", headers={"If-None-Match": warm.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert len(statements) == 1
+
+
+def test_get_post_missing(make_user, client_for, statements):
+    client = client_for(make_user())
+
+    statements.clear()
+    response = client.get("/getPost/0")
+    assert response.status_code == 404
+    assert len(statements) == 1
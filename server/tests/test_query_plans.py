@@ -0,0 +1,131 @@
+import json
+
+import pytest
+import sqlalchemy
+
+from app import db
+from db_models.database_tables import (
+    DPostalCode,
+    Pet,
+    PetCareApplication,
+    ReportType,
+    UserRating,
+)
+
+# small dictionaries read whole, a sequential scan is the right plan for them
+DICTIONARY_TABLES = {
+    "ReportType",
+    "MedDocDict",
+    "AdditionalServicesDict",
+    "DPostalCode",
+}
+
+
+def seq_scans(plan):
+    """Tables read by a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan":
+        tables.add(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        tables |= seq_scans(child)
+    return tables
+
+
+@pytest.fixture
+def recorded_selects(app):
+    """(statement, parameters) of every SELECT sent while the test runs."""
+    sent = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            sent.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    sqlalchemy.event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield sent
+    sqlalchemy.event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_hot_queries_use_indexes(
+    app, make_user, make_post, client_for, recorded_selects
+):
+    postal = db.session.query(DPostalCode).order_by(DPostalCode.postal_code).first()
+    located = {
+        "city": postal.place,
+        "postal_code": postal.postal_code,
+        "latitude": postal.latitude,
+        "longitude": postal.longitude,
+    }
+    owner, viewer = make_user(**located), make_user(**located)
+    post = make_post(owner, pet_count=2)
+    post.latitude, post.longitude = postal.latitude, postal.longitude
+    application = PetCareApplication(post_id=post.post_id, user_id=viewer.user_id)
+    db.session.add(application)
+    db.session.flush()
+    db.session.add(
+        UserRating(
+            petcareapplication_id=application.petcareapplication_id,
+            user_id=owner.user_id,
+            star_number=5,
+        )
+    )
+    db.session.commit()
+    post_id, owner_id = post.post_id, owner.user_id
+    pet_id = db.session.query(Pet.pet_id).filter(Pet.user_id == owner_id).first()[0]
+    report_type_id = db.session.query(ReportType.report_type_id).first()[0]
+
+    as_owner, as_viewer = client_for(owner), client_for(viewer)
+    requests = [
+        (as_viewer, "GET", f"/getPost/{post_id}", None),
+        (as_viewer, "GET", f"/getPost/{post_id}", None),
+        (
+            as_viewer,
+            "GET",
+            f"/getDashboardPost?postal_code={postal.postal_code}&kms=50",
+            None,
+        ),
+        (
+            as_viewer,
+            "GET",
+            f"/getDashboardPost?postal_code={postal.postal_code}&kms=50&sort=distance",
+            None,
+        ),
+        (as_viewer, "GET", f"/user/{owner_id}", None),
+        (as_viewer, "GET", f"/user/{owner_id}/pets", None),
+        (as_viewer, "GET", f"/user/{owner_id}/ratings", None),
+        (as_viewer, "GET", "/getMyApplications", None),
+        (
+            as_viewer,
+            "POST",
+            f"/user/{owner_id}/report",
+            {"report_type_id": report_type_id, "description": "Test"},
+        ),
+        (as_owner, "GET", "/getMyPets", None),
+        (as_owner, "GET", f"/pet/{pet_id}/medDocs", None),
+        (as_owner, "GET", "/getMyPosts", None),
+        (as_owner, "GET", "/getApplicationsCount", None),
+        (as_owner, "GET", f"/getPost/{post_id}/applications", None),
+    ]
+    for client, method, url, body in requests:
+        response = client.open(url, method=method, json=body)
+        assert response.status_code < 400, (url, response.get_json())
+
+    assert recorded_selects
+    recorded = list(recorded_selects)
+    recorded_selects.clear()
+
+    connection = db.session.connection()
+    # with sequential scans priced out, one only shows up where no index applies
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    failures = []
+    for statement, parameters in recorded:
+        (plan,) = connection.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters
+        ).scalar()
+        scanned = seq_scans(plan["Plan"]) - DICTIONARY_TABLES
+        if scanned:
+            failures.append((sorted(scanned), statement))
+    db.session.rollback()
+
+    assert not failures, json.dumps(failures, indent=2)
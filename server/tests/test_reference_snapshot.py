@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from app import db
+from db_models.database_tables import ReportType, User
+from utils import reference_snapshot
+from utils.reference_snapshot import ReferenceSnapshot, build_snapshot
+
+
+@pytest.fixture
+def rename_report_type(app):
+    """Rename a report type, changing the snapshot checksum; restored afterwards."""
+    with app.app_context():
+        report_type = db.session.query(ReportType).first()
+        original = report_type.report_type_name
+
+        def rename_report_type(name):
+            report_type.report_type_name = name
+            db.session.commit()
+
+        yield rename_report_type
+        rename_report_type(original)
+
+
+def versions(path):
+    return sorted(
+        name
+        for name in os.listdir(os.path.dirname(path))
+        if name.startswith(f".{os.path.basename(path)}-")
+    )
+
+
+def test_rebuild_switches_the_link(tmp_path, rename_report_type):
+    path = str(tmp_path / "reference")
+    build_snapshot(path)
+    first = ReferenceSnapshot(path)
+    first_version = os.readlink(path)
+
+    # same data, same version
+    build_snapshot(path)
+    assert os.readlink(path) == first_version
+    assert versions(path) == [first_version]
+
+    rename_report_type("Test 1")
+    build_snapshot(path)
+    second_version = os.readlink(path)
+    assert second_version != first_version
+    # a worker may still be opening the replaced version
+    assert versions(path) == sorted([first_version, second_version])
+    names = ReferenceSnapshot(path).report_type_names
+    assert "Test 1" in [names.get(index) for index in range(len(names))]
+
+    rename_report_type("Test 2")
+    build_snapshot(path)
+    assert versions(path) == sorted([second_version, os.readlink(path)])
+    # mapped before the deletion, still readable
+    assert len(first.report_type_names) == len(first["report_type_ids"])
+
+
+def test_directory_from_before_the_link_is_replaced(tmp_path, app):
+    path = tmp_path / "reference"
+    path.mkdir()
+    (path / "meta.json").write_text('{"format": 1}')
+
+    with app.app_context():
+        build_snapshot(str(path))
+
+    assert os.path.islink(path)
+    assert ReferenceSnapshot(str(path)).meta["format"] == 2
+    assert len(versions(str(path))) == 2
+
+
+def test_open_is_retried_when_the_version_is_deleted(tmp_path, app, monkeypatch):
+    path = str(tmp_path / "reference")
+    with app.app_context():
+        build_snapshot(path)
+    pruned = os.path.join(str(tmp_path), ".reference-pruned")
+    realpath = os.path.realpath
+    resolved = []
+
+    def resolve_to_a_pruned_version(target):
+        resolved.append(target)
+        return pruned if len(resolved) == 1 else realpath(target)
+
+    monkeypatch.setattr(
+        reference_snapshot.os.path, "realpath", resolve_to_a_pruned_version
+    )
+    monkeypatch.setitem(app.config, "REFERENCE_SNAPSHOT_PATH", path)
+    monkeypatch.delitem(app.extensions, "reference_snapshot", raising=False)
+
+    with app.app_context():
+        snapshot = reference_snapshot.get_reference_snapshot()
+
+    assert resolved[:2] == [path, path]
+    assert len(snapshot["report_type_ids"]) > 0
+
+
+def test_build_leaves_the_request_transaction_alone(tmp_path, make_user):
+    user = make_user(description="Stary opis")
+    user.description = "Nowy opis"
+    db.session.flush()
+
+    # e.g. the first postal_index.locate of a worker, in the middle of a request
+    build_snapshot(str(tmp_path / "reference"))
+    db.session.commit()
+
+    db.session.expire_all()
+    assert db.session.get(User, user.user_id).description == "Nowy opis"
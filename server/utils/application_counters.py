@@ -0,0 +1,47 @@
+from app import db
+from db_models.database_tables import User, Post
+
+# Post.pending_applications counts the applications of a post that are not
+# declined, cancelled or accepted; User.pending_applications sums it over the
+# owner's active posts. Both are changed with relative UPDATEs inside the
+# request's transaction, `flask applications recount` repairs any drift.
+# Routes lock the post row (SELECT ... FOR UPDATE) before reading the state
+# of its applications, so two requests on the same post cannot both count
+# one change.
+
+
+def is_pending(application):
+    return not (application.declined or application.cancelled or application.accepted)
+
+
+def pending_changed(post, delta):
+    """Add `delta` to the pending counters of `post` and, while active, its owner."""
+    db.session.query(Post).filter(Post.post_id == post.post_id).update(
+        {Post.pending_applications: Post.pending_applications + delta},
+        synchronize_session=False,
+    )
+
+    if post.is_active:
+        db.session.query(User).filter(User.user_id == post.user_id).update(
+            {User.pending_applications: User.pending_applications + delta},
+            synchronize_session=False,
+        )
+
+
+def post_deactivated(post):
+    """Take the pending applications of `post` off its owner's inbox.
+
+    Called with the post still active, before `is_active` is cleared.
+    """
+    if not post.is_active:
+        return
+
+    pending = (
+        db.session.query(Post.pending_applications)
+        .filter(Post.post_id == post.post_id)
+        .scalar_subquery()
+    )
+    db.session.query(User).filter(User.user_id == post.user_id).update(
+        {User.pending_applications: User.pending_applications - pending},
+        synchronize_session=False,
+    )
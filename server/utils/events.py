@@ -0,0 +1,8 @@
+from blinker import Namespace
+
+# Sent after the change has been committed; the sender is the changed id.
+_signals = Namespace()
+
+post_changed = _signals.signal("post-changed")
+pet_changed = _signals.signal("pet-changed")
+user_changed = _signals.signal("user-changed")
@@ -1,35 +1,367 @@
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
+from botocore.exceptions import ClientError
+from flask import current_app
+
+from utils.cache import TTLCache
+
+STORAGE_ENDPOINT = "http://storage:9000"
+STORAGE_PUBLIC_PREFIX = "/storage"
+STORAGE_BUCKET = "upload"
+STORAGE_ACCESS_KEY = "myappuser"
+STORAGE_SECRET_KEY = "app_user_password"
 
-from utils.utils_photo import resize_image
+PRESIGNED_URL_EXPIRES = 3600
+# hand out cached urls only while they stay valid for at least this long
+PRESIGNED_URL_MARGIN = 300
 
-s3_client = boto3.client(
-    "s3",
-    endpoint_url="http://storage:9000",
-    aws_access_key_id="myappuser",
-    aws_secret_access_key="app_user_password",
-    config=Config(signature_version="s3v4"),
+# keys are content hashes, so an object never changes once written
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# streamed objects never hold more than a few of these in memory
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=2,
 )
 
+# mode of files written by LocalStorage, like a plain open() under umask 022
+LOCAL_FILE_MODE = 0o644
 
-def generate_presigned_url(filepath, filename):
-    return s3_client.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": "upload", "Key": f"{filepath}/{filename}.webp"},
-        ExpiresIn=3600,
-    ).replace("http://storage:9000", "/storage")
 
+class SigV4Presigner:
+    """Builds path-style presigned GET urls the same way boto3 does.
 
-def upload_object(file, filepath, filename):
-    file_to_upload = resize_image(file)
+    The SigV4 signing key only depends on the day, region and service, so it
+    is derived once per day and reused; a batch of keys then costs one
+    HMAC-SHA256 per url instead of a trip through the botocore request
+    pipeline.
+    """
 
-    s3_client.put_object(
-        Bucket="upload",
-        Key=f"{filepath}/{filename}.webp",
-        Body=file_to_upload.getvalue(),
-        ContentType="image/webp",
-    )
+    def __init__(self, endpoint_url, bucket, access_key, secret_key, region):
+        self.host = urlsplit(endpoint_url).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self._signing_key = (None, None)
+        self._lock = threading.Lock()
+
+    def _get_signing_key(self, datestamp):
+        with self._lock:
+            if self._signing_key[0] != datestamp:
+                key = ("AWS4" + self.secret_key).encode("utf-8")
+                for part in (datestamp, self.region, "s3", "aws4_request"):
+                    key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+                self._signing_key = (datestamp, key)
+            return self._signing_key[1]
+
+    def presign(self, keys, expires_in, now=None):
+        """Return `{key: path_and_query}` for every object key in `keys`."""
+        now = now or datetime.now(timezone.utc)
+        timestamp = now.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = timestamp[:8]
+        scope = f"{datestamp}/{self.region}/s3/aws4_request"
+        signing_key = self._get_signing_key(datestamp)
+
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(f'{self.access_key}/{scope}', safe='-_.~')}"
+            f"&X-Amz-Date={timestamp}"
+            f"&X-Amz-Expires={expires_in}"
+            "&X-Amz-SignedHeaders=host"
+        )
+        string_to_sign_prefix = f"AWS4-HMAC-SHA256\n{timestamp}\n{scope}\n"
+
+        urls = {}
+        for key in keys:
+            path = quote(f"/{self.bucket}/{key}", safe="/~")
+            canonical_request = (
+                f"GET\n{path}\n{query}\nhost:{self.host}\n\nhost\nUNSIGNED-PAYLOAD"
+            )
+            string_to_sign = (
+                string_to_sign_prefix
+                + hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+            )
+            signature = hmac.new(
+                signing_key, string_to_sign.encode("utf-8"), hashlib.sha256
+            ).hexdigest()
+            urls[key] = f"{path}?{query}&X-Amz-Signature={signature}"
+
+        return urls
+
+
+class S3Storage:
+    """Objects kept in a MinIO/S3 bucket and handed out as presigned urls."""
+
+    def __init__(
+        self,
+        endpoint_url,
+        bucket,
+        access_key,
+        secret_key,
+        public_prefix,
+        max_pool_connections=10,
+    ):
+        self.bucket = bucket
+        self.public_prefix = public_prefix
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=Config(
+                signature_version="s3v4", max_pool_connections=max_pool_connections
+            ),
+        )
+        self.presigner = SigV4Presigner(
+            endpoint_url,
+            bucket,
+            access_key,
+            secret_key,
+            self.client.meta.region_name or "us-east-1",
+        )
+        self.url_cache = TTLCache(
+            maxsize=20000, ttl=PRESIGNED_URL_EXPIRES - PRESIGNED_URL_MARGIN
+        )
+
+    def urls(self, keys):
+        """Presign a batch of keys, signing only the ones missing from the cache."""
+        urls = {}
+        missing = []
+
+        for key in keys:
+            url = self.url_cache.get(key)
+            if url is None:
+                missing.append(key)
+            else:
+                urls[key] = url
+
+        if missing:
+            signed = self.presigner.presign(missing, PRESIGNED_URL_EXPIRES)
+            for key, path in signed.items():
+                urls[key] = self.public_prefix + path
+                self.url_cache.set(key, urls[key])
+
+        return urls
+
+    def put(self, key, data, content_type):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
+        )
+        self.url_cache.pop(key)
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put_stream(self, key, stream, content_type):
+        """Upload a file object in multipart chunks instead of one buffer."""
+        self.client.upload_fileobj(
+            stream,
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type},
+            Config=STREAM_TRANSFER_CONFIG,
+        )
+
+    def iter_range(self, key, start, stop):
+        """Chunks of bytes [start, stop) of an object, fetched with a Range GET."""
+        if stop <= start:
+            return iter(())
+
+        body = self.client.get_object(
+            Bucket=self.bucket, Key=key, Range=f"bytes={start}-{stop - 1}"
+        )["Body"]
+        return _iter_chunks(body, stop - start)
+
+    def delete(self, keys):
+        self.client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        for key in keys:
+            self.url_cache.pop(key)
+
+
+class LocalStorage:
+    """Objects kept as plain files under `root`, served by `routes.storage`.
+
+    Urls are stable (the keys are unguessable content hashes), so nothing has
+    to be signed or cached. Files are written to a temp file and renamed into
+    place, so readers never see a partially written object.
+    """
+
+    def __init__(self, root, public_prefix):
+        self.root = os.path.abspath(root)
+        self.public_prefix = public_prefix
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def urls(self, keys):
+        return {key: f"{self.public_prefix}/{key}" for key in keys}
+
+    def put(self, key, data, content_type):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix=".part", delete=False
+        ) as part:
+            part.write(data)
+        _publish(part.name, path)
+
+    def get(self, key):
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put_stream(self, key, stream, content_type):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix=".part", delete=False
+        ) as part:
+            shutil.copyfileobj(stream, part, STREAM_CHUNK_SIZE)
+        _publish(part.name, path)
+
+    def iter_range(self, key, start, stop):
+        f = open(self.path(key), "rb")
+        f.seek(start)
+        return _iter_chunks(f, stop - start)
+
+    def delete(self, keys):
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+
+def _publish(part_path, path):
+    # NamedTemporaryFile creates 0600 files, which other readers cannot open
+    os.chmod(part_path, LOCAL_FILE_MODE)
+    os.replace(part_path, path)
+
+
+def _iter_chunks(f, length):
+    """Read `length` bytes of `f` in STREAM_CHUNK_SIZE pieces, closing it after."""
+    try:
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def get_storage():
+    """Storage backend of the current app, picked by `STORAGE_BACKEND`."""
+    storage = current_app.extensions.get("file_storage")
+
+    if storage is None:
+        config = current_app.config
+        if config["STORAGE_BACKEND"] == "local":
+            storage = LocalStorage(
+                config["STORAGE_LOCAL_ROOT"], config["STORAGE_LOCAL_URL_PREFIX"]
+            )
+        else:
+            storage = S3Storage(
+                STORAGE_ENDPOINT,
+                STORAGE_BUCKET,
+                STORAGE_ACCESS_KEY,
+                STORAGE_SECRET_KEY,
+                STORAGE_PUBLIC_PREFIX,
+                config["STORAGE_MAX_POOL_CONNECTIONS"],
+            )
+        current_app.extensions["file_storage"] = storage
+
+    return storage
+
+
+def object_key(filepath, filename, size=None):
+    """Storage key of a photo variant; the default size keeps the original key."""
+    if size is None or size == current_app.config["PHOTO_DEFAULT_SIZE"]:
+        return f"{filepath}/{filename}.webp"
+    return f"{filepath}/{filename}_{size}.webp"
+
+
+def pick_variant(requested_size):
+    """Smallest stored variant covering `requested_size` pixels (None = default)."""
+    if not requested_size:
+        return None
+
+    sizes = sorted(current_app.config["PHOTO_VARIANTS"])
+    return next((size for size in sizes if size >= requested_size), sizes[-1])
+
+
+def generate_presigned_urls(filepath, filenames, size=None):
+    keys = {filename: object_key(filepath, filename, size) for filename in filenames}
+    urls = get_storage().urls(keys.values())
+    return {filename: urls[key] for filename, key in keys.items()}
+
+
+def generate_presigned_url(filepath, filename, size=None):
+    return generate_presigned_urls(filepath, [filename], size)[filename]
+
+
+def upload_object(data, filepath, filename, size=None):
+    get_storage().put(object_key(filepath, filename, size), data, "image/webp")
+
+
+def read_object(filepath, filename, size=None):
+    return get_storage().get(object_key(filepath, filename, size))
+
+
+def object_exists(filepath, filename, size=None):
+    return get_storage().exists(object_key(filepath, filename, size))
 
 
 def delete_object(filepath, filename):
-    s3_client.delete_object(Bucket="upload", Key=f"{filepath}/{filename}.webp")
+    get_storage().delete(
+        {
+            object_key(filepath, filename, size)
+            for size in current_app.config["PHOTO_VARIANTS"]
+        }
+    )
+
+
+def upload_stream(key, stream, content_type):
+    get_storage().put_stream(key, stream, content_type)
+
+
+def stream_object(key, start, stop):
+    return get_storage().iter_range(key, start, stop)
+
+
+def delete_file(key):
+    get_storage().delete([key])
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from app import db
+from utils.file_storage import PRESIGNED_URL_MARGIN
+
+
+def bump_version(model, ids):
+    """Change the ETag of the `model` rows whose primary key is in `ids`.
+
+    `ids` is a list or a select of keys. Runs in the current transaction, so
+    call it next to the change it stands for.
+    """
+    primary_key = model.__mapper__.primary_key[0]
+    db.session.query(model).filter(primary_key.in_(ids)).update(
+        {model.version: model.version + 1}, synchronize_session=False
+    )
+
+
+def url_bucket():
+    # a cached presigned url is valid for at least PRESIGNED_URL_MARGIN more
+    # seconds, a response is revalidated as new once its bucket is over
+    return int(time.time() // PRESIGNED_URL_MARGIN)
+
+
+def make_etag(parts):
+    digest = hashlib.sha256(
+        json.dumps([request.full_path, parts], default=str).encode("utf-8")
+    )
+    return digest.hexdigest()[:32]
+
+
+def conditional(validator, cache_control="private, no-cache"):
+    """Answer If-None-Match with a 304 before the view runs.
+
+    `validator` gets the view arguments and returns what the response depends
+    on, e.g. row versions read with one cheap query, or None to let the view
+    answer (404 and the like). It is left in `g.validator` for the view.
+    Only 200 responses get the ETag.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.validator = validator(*args, **kwargs)
+            if g.validator is None:
+                return view(*args, **kwargs)
+
+            etag = make_etag(g.validator)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = cache_control
+            return response
+
+        return wrapper
+
+    return decorator
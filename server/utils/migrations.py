@@ -0,0 +1,87 @@
+import importlib.util
+import os
+
+import sqlalchemy
+
+# Numbered scripts in server/migrations take a database created from the
+# original database/init.sql to the current schema. A .sql file is run as is,
+# a .py file defines upgrade(connection) for changes SQL cannot do alone.
+# database/init.sql records every version in SchemaMigration, so a database
+# created from it starts with nothing to apply.
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+
+CREATE_MIGRATION_TABLE = """
+CREATE TABLE IF NOT EXISTS petbuddies_schema."SchemaMigration" (
+    "version" VARCHAR(255) PRIMARY KEY,
+    "applied_at" TIMESTAMP NOT NULL DEFAULT now()
+)
+"""
+
+
+def list_migrations(path=MIGRATIONS_PATH):
+    """Return (version, file path) of every migration, oldest first."""
+    return sorted(
+        (os.path.splitext(name)[0], os.path.join(path, name))
+        for name in os.listdir(path)
+        if name[:1].isdigit() and name.endswith((".sql", ".py"))
+    )
+
+
+def applied_versions(connection):
+    return set(
+        connection.execute(
+            sqlalchemy.text('SELECT "version" FROM petbuddies_schema."SchemaMigration"')
+        ).scalars()
+    )
+
+
+def run_migration(connection, file_path):
+    if file_path.endswith(".sql"):
+        with open(file_path, encoding="utf-8") as f:
+            connection.exec_driver_sql(f.read())
+        return
+
+    spec = importlib.util.spec_from_file_location(
+        os.path.basename(file_path)[:-3], file_path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(connection)
+
+
+def apply_migrations(engine, path=MIGRATIONS_PATH):
+    """Apply the pending migrations, each in its own transaction.
+
+    Returns the versions applied. Concurrent upgrades, e.g. of containers
+    starting together, wait for each other on an advisory lock.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql(CREATE_MIGRATION_TABLE)
+
+    applied = []
+    for version, file_path in list_migrations(path):
+        with engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.select(
+                    sqlalchemy.func.pg_advisory_xact_lock(
+                        sqlalchemy.func.hashtext("SchemaMigration")
+                    )
+                )
+            )
+            if version in applied_versions(connection):
+                continue
+
+            run_migration(connection, file_path)
+            connection.execute(
+                sqlalchemy.text(
+                    'INSERT INTO petbuddies_schema."SchemaMigration" ("version") '
+                    "VALUES (:version)"
+                ),
+                {"version": version},
+            )
+        applied.append(version)
+
+    return applied
@@ -0,0 +1,135 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+import sqlalchemy
+from flask import current_app
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "petbuddies_events"
+LISTEN_POLL_TIMEOUT = 5
+LISTEN_RECONNECT_DELAY = 2
+
+
+def notify_user(user_id, event, **data):
+    """Queue `event` for `user_id` in the current transaction.
+
+    Postgres delivers it to every listening worker when the transaction
+    commits and drops it on rollback, so call it right before the commit.
+    Payloads are limited to 8000 bytes, events only carry ids.
+    """
+    payload = json.dumps({"user_id": user_id, "event": event, "data": data})
+    db.session.execute(
+        sqlalchemy.select(sqlalchemy.func.pg_notify(NOTIFY_CHANNEL, payload))
+    )
+
+
+class EventListener:
+    """One LISTEN connection per worker process, fanned out to local subscribers.
+
+    The listening thread is started on the first subscription, i.e. after the
+    fork. Under gevent it is a greenlet and `select` yields to the hub.
+    """
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._thread = None
+
+    def subscribe(self, user_id):
+        subscriber = queue.Queue(maxsize=100)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def _dispatch(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed notification %r", payload)
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(message["user_id"], ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((message["event"], message["data"]))
+            except queue.Full:
+                # a stalled client loses events, it refetches on reconnect anyway
+                pass
+
+    def _listen(self):
+        raw = self._engine.raw_connection()
+        conn = raw.driver_connection
+        # the connection never goes back to the pool; read the driver
+        # connection first, the detached proxy no longer has it
+        raw.detach()
+        conn.autocommit = True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+            while True:
+                if select.select([conn], [], [], LISTEN_POLL_TIMEOUT) == ([], [], []):
+                    continue
+
+                conn.poll()
+                while conn.notifies:
+                    self._dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Event listener lost its connection")
+                time.sleep(LISTEN_RECONNECT_DELAY)
+
+
+def get_event_listener():
+    listener = current_app.extensions.get("event_listener")
+    if listener is None:
+        listener = current_app.extensions["event_listener"] = EventListener(db.engine)
+    return listener
+
+
+def make_psycopg2_green():
+    """Let psycopg2 wait on the gevent hub instead of blocking the worker."""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    def wait_callback(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == extensions.POLL_OK:
+                break
+            elif state == extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+    extensions.set_wait_callback(wait_callback)
@@ -0,0 +1,151 @@
+import logging
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from flask import current_app
+
+from app import db
+from db_models.database_tables import (
+    Outbox,
+    OUTBOX_PENDING,
+    OUTBOX_SENT,
+    OUTBOX_FAILED,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(recipient, subject, body):
+    """Add a mail to the outbox of the current transaction.
+
+    It is sent by the outbox worker only if the transaction commits, the
+    request itself never waits for SMTP.
+    """
+    db.session.add(Outbox(recipient=recipient, subject=subject, body=body))
+
+
+def retry_delay(attempts):
+    config = current_app.config
+    return timedelta(
+        seconds=min(
+            config["OUTBOX_RETRY_BASE"] * 2 ** (attempts - 1),
+            config["OUTBOX_RETRY_MAX"],
+        )
+    )
+
+
+def open_smtp():
+    config = current_app.config
+    smtp = smtplib.SMTP(
+        config["MAIL_SERVER"], config["MAIL_PORT"], timeout=config["MAIL_TIMEOUT"]
+    )
+    if config["MAIL_USE_TLS"]:
+        smtp.starttls()
+    if config["MAIL_USERNAME"]:
+        smtp.login(config["MAIL_USERNAME"], config["MAIL_PASSWORD"])
+    return smtp
+
+
+def build_message(message):
+    email = EmailMessage()
+    email["From"] = current_app.config["MAIL_DEFAULT_SENDER"]
+    email["To"] = message.recipient
+    email["Subject"] = message.subject
+    email.set_content(message.body)
+    return email
+
+
+class ConnectionLost(Exception):
+    """The SMTP server cannot be reached, the rest of the batch waits."""
+
+
+class SMTPConnection:
+    """A lazily opened SMTP connection, reopened once when the server drops it."""
+
+    def __init__(self):
+        self._smtp = None
+
+    def send(self, email):
+        for reconnect in (False, True):
+            if self._smtp is None:
+                try:
+                    self._smtp = open_smtp()
+                except (OSError, smtplib.SMTPException) as e:
+                    raise ConnectionLost(e) from e
+            try:
+                self._smtp.send_message(email)
+                return
+            except smtplib.SMTPServerDisconnected as e:
+                self._smtp = None
+                if reconnect:
+                    raise ConnectionLost(e) from e
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self._smtp = None
+
+
+def attempt_failed(message, error, now):
+    message.attempts += 1
+    message.last_error = str(error)[:1000]
+    if message.attempts >= current_app.config["OUTBOX_MAX_ATTEMPTS"]:
+        message.status = OUTBOX_FAILED
+        logger.error("Giving up on outbox mail %s: %s", message.outbox_id, error)
+    else:
+        message.next_attempt_at = now + retry_delay(message.attempts)
+
+
+def give_up(message, error):
+    """Fail a mail that can never be sent, e.g. one whose row cannot be built."""
+    logger.exception("Cannot send outbox mail %s", message.outbox_id)
+    message.attempts += 1
+    message.last_error = f"{type(error).__name__}: {error}"[:1000]
+    message.status = OUTBOX_FAILED
+
+
+def send_batch():
+    """Send one batch of due mails over a single SMTP connection.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can
+    drain the outbox side by side. A mail the server refuses is charged an
+    attempt, a mail that cannot be built is failed right away. When the
+    server cannot be reached the batch stops there and the rest is claimed
+    again on the next poll. Returns the number of mails handled.
+    """
+    now = datetime.now()
+    batch = (
+        db.session.query(Outbox)
+        .filter(Outbox.status == OUTBOX_PENDING, Outbox.next_attempt_at <= now)
+        .order_by(Outbox.next_attempt_at)
+        .limit(current_app.config["OUTBOX_BATCH_SIZE"])
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    handled = 0
+    smtp = SMTPConnection()
+    try:
+        for message in batch:
+            handled += 1
+            try:
+                smtp.send(build_message(message))
+            except ConnectionLost as e:
+                attempt_failed(message, e.__cause__, now)
+                break
+            except (OSError, smtplib.SMTPException) as e:
+                attempt_failed(message, e, now)
+            except Exception as e:
+                give_up(message, e)
+            else:
+                message.status = OUTBOX_SENT
+                message.sent_at = datetime.now()
+    finally:
+        smtp.close()
+
+    db.session.commit()
+    return handled
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+import math
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    """Pack the keyset values of the last returned row into an opaque token."""
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _valid(value, kind):
+    if isinstance(value, bool):
+        return False
+    if kind is float:
+        # sort keys are finite, +inf stands for rows without one
+        return isinstance(value, (int, float)) and (
+            math.isfinite(value) or value == math.inf
+        )
+    return isinstance(value, kind)
+
+
+def decode_cursor(cursor, *kinds):
+    """Unpack a token made by `encode_cursor`.
+
+    `kinds` are the types of the packed values (int, float or str); a token
+    of another shape raises InvalidCursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+    if (
+        not isinstance(values, list)
+        or len(values) != len(kinds)
+        or not all(_valid(value, kind) for value, kind in zip(values, kinds))
+    ):
+        raise InvalidCursor(cursor)
+
+    return values
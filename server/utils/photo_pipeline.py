@@ -0,0 +1,322 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import sqlalchemy
+from flask import current_app
+
+from app import db
+from db_models.database_tables import (
+    User,
+    Pet,
+    UserPhoto,
+    PetPhoto,
+    PHOTO_PENDING,
+    PHOTO_READY,
+)
+from utils.events import pet_changed, user_changed
+from utils.http_cache import bump_version
+from utils.file_storage import upload_object, delete_object
+from utils.utils_photo import process_image
+
+logger = logging.getLogger(__name__)
+
+STAGING_CHUNK_SIZE = 64 * 1024
+
+StagedPhoto = namedtuple("StagedPhoto", ["path", "name"])
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _new_process_pool():
+    return ProcessPoolExecutor(
+        max_workers=current_app.config["PHOTO_PROCESS_WORKERS"],
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+
+
+def _get_pools(broken=None):
+    """Return (process pool, io pool) owned by the current gunicorn worker.
+
+    A process pool whose child died (e.g. killed by the OOM killer) refuses
+    every later task, pass it as `broken` to have it replaced.
+    """
+    pid = os.getpid()
+
+    with _pools_lock:
+        if pid not in _pools:
+            _pools.clear()
+            _pools[pid] = (
+                _new_process_pool(),
+                ThreadPoolExecutor(
+                    max_workers=current_app.config["PHOTO_IO_WORKERS"],
+                    thread_name_prefix="photo-io",
+                ),
+            )
+        elif broken is not None and _pools[pid][0] is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _pools[pid] = (_new_process_pool(), _pools[pid][1])
+        return _pools[pid]
+
+
+def stage_photo(file):
+    """Copy an upload to the staging dir in chunks, hashing it on the way.
+
+    The sha256 of the upload becomes the photo name, so the same picture
+    always maps to the same immutable storage key.
+    """
+    digest = hashlib.sha256()
+
+    with tempfile.NamedTemporaryFile(
+        dir=current_app.config["PHOTO_STAGING_DIR"], suffix=".upload", delete=False
+    ) as staged:
+        for chunk in iter(lambda: file.stream.read(STAGING_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            staged.write(chunk)
+
+    return StagedPhoto(staged.name, digest.hexdigest())
+
+
+def stage_photos(files):
+    """Stage a batch of uploads, dropping pictures repeated within the batch."""
+    staged_lst = {}
+
+    try:
+        # browsers send an empty part for a file input left blank
+        for file in filter(None, files):
+            staged = stage_photo(file)
+            if staged.name in staged_lst:
+                os.remove(staged.path)
+            else:
+                staged_lst[staged.name] = staged
+    except Exception:
+        discard_staged(staged_lst.values())
+        raise
+
+    return list(staged_lst.values())
+
+
+def discard_staged(staged_lst):
+    """Remove staged uploads that will not be submitted, e.g. after a failed commit."""
+    for staged in staged_lst:
+        try:
+            os.remove(staged.path)
+        except FileNotFoundError:
+            pass
+
+
+def _lock_photos(filepath, photo_names):
+    """Serialize the reference counting of stored photos until the commit.
+
+    Checking for rows that use a photo and deleting or reusing its files is
+    done under this lock, so an upload of the same picture cannot end up on
+    files that are being deleted.
+    """
+    # always in the same order, two batches cannot wait for each other
+    for photo_name in sorted(set(photo_names)):
+        db.session.execute(
+            sqlalchemy.select(
+                sqlalchemy.func.pg_advisory_xact_lock(
+                    sqlalchemy.func.hashtext(f"{filepath}/{photo_name}")
+                )
+            )
+        )
+
+
+def submit_photos(staged_lst, model, filepath, pending_ids):
+    """Finish resizing and storing staged photos in the background.
+
+    Call it after the `model` rows named after the staged photos have been
+    committed with PHOTO_PENDING status; `pending_ids` maps a photo name to
+    the primary key of the row added for it. The photos are resized in
+    parallel on the process pool and every variant is PUT as its own task on
+    the io pool; a row flips to PHOTO_READY once all of its variants are
+    stored, or is removed when the upload turns out not to be an image.
+    Pictures that are already stored are not processed or uploaded again.
+    """
+    _lock_photos(filepath, [staged.name for staged in staged_lst])
+    already_stored = {
+        photo_name
+        for (photo_name,) in db.session.query(model.photo_name)
+        .filter(
+            model.photo_name.in_([staged.name for staged in staged_lst]),
+            model.status == PHOTO_READY,
+        )
+        .distinct()
+    }
+    if already_stored:
+        _mark_ready(model, already_stored)
+    db.session.commit()
+    if already_stored:
+        for staged in staged_lst:
+            if staged.name in already_stored:
+                os.remove(staged.path)
+        _announce_ready(model, already_stored)
+
+    app = current_app._get_current_object()
+    config = app.config
+    process_pool, io_pool = _get_pools()
+
+    for staged in staged_lst:
+        if staged.name in already_stored:
+            continue
+
+        row_id = pending_ids.get(staged.name)
+        args = (
+            process_image,
+            staged.path,
+            config["PHOTO_VARIANTS"],
+            config["PHOTO_MAX_PIXELS"],
+        )
+        try:
+            try:
+                future = process_pool.submit(*args)
+            except BrokenProcessPool:
+                process_pool, io_pool = _get_pools(broken=process_pool)
+                future = process_pool.submit(*args)
+        except Exception:
+            logger.exception("Submitting %s/%s failed", filepath, staged.name)
+            _discard_photo(model, filepath, staged, row_id)
+            continue
+
+        future.add_done_callback(
+            lambda done, staged=staged, row_id=row_id, pool=process_pool: (
+                io_pool.submit(
+                    _upload_variants,
+                    app,
+                    (pool, io_pool),
+                    done,
+                    model,
+                    filepath,
+                    staged,
+                    row_id,
+                )
+            )
+        )
+
+
+def _discard_photo(model, filepath, staged, row_id):
+    if os.path.exists(staged.path):
+        os.remove(staged.path)
+    _finish_failed(model, filepath, staged.name, row_id)
+    db.session.commit()
+
+
+def _release(model, filepath, photo_name):
+    _lock_photos(filepath, [photo_name])
+    still_used = (
+        db.session.query(model.photo_name)
+        .filter(model.photo_name == photo_name)
+        .first()
+    )
+    if not still_used:
+        delete_object(filepath, photo_name)
+
+
+def release_photo(model, filepath, photo_name):
+    """Delete the stored files of `photo_name` once no `model` row refers to it.
+
+    Call it after the rows that used the photo have been deleted or renamed.
+    """
+    _release(model, filepath, photo_name)
+    db.session.commit()
+
+
+def _mark_ready(model, photo_names):
+    db.session.query(model).filter(model.photo_name.in_(photo_names)).update(
+        {model.status: PHOTO_READY}, synchronize_session=False
+    )
+
+    # pet photos are shown on the owner's profile and posts
+    owners = (
+        db.session.query(UserPhoto.user_id)
+        if model is UserPhoto
+        else db.session.query(Pet.user_id).join(PetPhoto, PetPhoto.pet_id == Pet.pet_id)
+    )
+    bump_version(User, owners.filter(model.photo_name.in_(photo_names)))
+
+
+def _announce_ready(model, photo_names):
+    owner_id, changed = (
+        (PetPhoto.pet_id, pet_changed)
+        if model is PetPhoto
+        else (UserPhoto.user_id, user_changed)
+    )
+    for (changed_id,) in (
+        db.session.query(owner_id).filter(model.photo_name.in_(photo_names)).distinct()
+    ):
+        changed.send(changed_id)
+
+
+def _upload_variants(app, pools, future, model, filepath, staged, row_id):
+    process_pool, io_pool = pools
+    os.remove(staged.path)
+
+    try:
+        variants = future.result()
+    except Exception as e:
+        logger.exception("Processing of %s/%s failed", filepath, staged.name)
+        if isinstance(e, BrokenProcessPool):
+            with app.app_context():
+                _get_pools(broken=process_pool)
+        _finish_photo(app, model, filepath, staged.name, row_id, False)
+        return
+
+    uploads = [
+        io_pool.submit(_upload_variant, app, data, filepath, staged.name, size)
+        for size, data in variants.items()
+    ]
+    remaining = [len(uploads)]
+    lock = threading.Lock()
+
+    def on_uploaded(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        # the last upload to finish decides, without any thread blocking on the rest
+        stored = not any(upload.exception() for upload in uploads)
+        io_pool.submit(_finish_photo, app, model, filepath, staged.name, row_id, stored)
+
+    for upload in uploads:
+        upload.add_done_callback(on_uploaded)
+
+
+def _upload_variant(app, data, filepath, photo_name, size):
+    with app.app_context():
+        try:
+            upload_object(data, filepath, photo_name, size)
+        except Exception:
+            logger.exception("Upload of %s/%s (%s) failed", filepath, photo_name, size)
+            raise
+
+
+def _finish_failed(model, filepath, photo_name, row_id):
+    # only the row of this upload, rows of other owners may have been
+    # stored in the meantime; the files go once nothing uses them
+    if row_id is not None:
+        primary_key = model.__mapper__.primary_key[0]
+        db.session.query(model).filter(
+            primary_key == row_id, model.status == PHOTO_PENDING
+        ).delete(synchronize_session=False)
+    _release(model, filepath, photo_name)
+
+
+def _finish_photo(app, model, filepath, photo_name, row_id, stored):
+    with app.app_context():
+        if stored:
+            _lock_photos(filepath, [photo_name])
+            _mark_ready(model, [photo_name])
+        else:
+            _finish_failed(model, filepath, photo_name, row_id)
+        db.session.commit()
+
+        if stored:
+            _announce_ready(model, [photo_name])
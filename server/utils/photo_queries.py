@@ -0,0 +1,45 @@
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from db_models.database_tables import UserPhoto, PetPhoto, PHOTO_READY
+
+# Correlated scalar subqueries: each row looks up only its own photos through
+# the owner index, instead of aggregating the whole photo table first, and
+# owners with several photos still come back once.
+
+
+def pet_photo_names(pet_id):
+    """ARRAY of the ready photo names of `pet_id` in upload order (NULL if none)."""
+    return (
+        sqlalchemy.select(
+            sqlalchemy.func.array_agg(
+                aggregate_order_by(PetPhoto.photo_name, PetPhoto.pet_photo_id)
+            )
+        )
+        .where(PetPhoto.pet_id == pet_id, PetPhoto.status == PHOTO_READY)
+        .scalar_subquery()
+    )
+
+
+def pet_cover_photo(pet_id):
+    """Name of the first ready photo of `pet_id` (NULL if none)."""
+    return (
+        sqlalchemy.select(PetPhoto.photo_name)
+        .where(PetPhoto.pet_id == pet_id, PetPhoto.status == PHOTO_READY)
+        .order_by(PetPhoto.pet_photo_id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def user_photo_names(user_id):
+    """ARRAY of the ready photo names of `user_id` in upload order (NULL if none)."""
+    return (
+        sqlalchemy.select(
+            sqlalchemy.func.array_agg(
+                aggregate_order_by(UserPhoto.photo_name, UserPhoto.user_photo_id)
+            )
+        )
+        .where(UserPhoto.user_id == user_id, UserPhoto.status == PHOTO_READY)
+        .scalar_subquery()
+    )
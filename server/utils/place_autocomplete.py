@@ -0,0 +1,89 @@
+import re
+import string
+
+import numpy as np
+
+from utils.reference_snapshot import (
+    AUTOCOMPLETE_LIMIT,
+    PRECOMPUTED_PREFIX_LEN,
+    get_reference_snapshot,
+    normalize,
+    top_pairs,
+)
+
+
+def _prefix_range(keys, prefix):
+    """Range of `keys` (a sorted bytes array) starting with `prefix`."""
+    width = keys.dtype.itemsize
+    if len(prefix) > width:
+        return 0, 0
+    # prefixes are ASCII, so bumping the last byte gives the first key past the range
+    upper = prefix[:-1] + bytes([prefix[-1] + 1])
+    lo, hi = np.searchsorted(keys, np.array([prefix, upper], dtype=keys.dtype))
+    return int(lo), int(hi)
+
+
+class PlaceAutocomplete:
+    """Prefix index over DPostalCode for the /city autocomplete.
+
+    Every (place, postal code) pair is reachable from the start of each word
+    of the normalized place name and from its postal code digits. Keys are
+    kept in sorted arrays of the shared reference snapshot, so a prefix
+    selects a contiguous range by bisection. Places are ranked by how many
+    postal codes they have, a stand-in for their size; matches on the first
+    word go before matches inside the name.
+    """
+
+    def __init__(self, limit=AUTOCOMPLETE_LIMIT):
+        self.limit = min(limit, AUTOCOMPLETE_LIMIT)
+
+    def _pairs(self, snapshot, pairs):
+        pairs = np.asarray(pairs, dtype=np.int64)
+        places = snapshot.place_names.get_many(snapshot["pair_places"][pairs])
+        codes = snapshot["pair_codes"][pairs].tolist()
+        return [(place, code.decode("utf-8")) for place, code in zip(places, codes)]
+
+    def suggest(self, query):
+        """Return up to `limit` (place, postal_code) pairs matching the prefix."""
+        snapshot = get_reference_snapshot()
+
+        query = query.strip()
+        if not query:
+            return []
+
+        if query[0] in string.digits:
+            digits = re.sub(r"\D", "", query, flags=re.ASCII).encode("ascii")
+            if not digits:
+                return []
+            lo, hi = _prefix_range(snapshot["digit_keys"], digits)
+            hi = min(hi, lo + self.limit)
+            return self._pairs(snapshot, snapshot["digit_pairs"][lo:hi])
+
+        try:
+            prefix = normalize(query).encode("ascii")
+        except UnicodeEncodeError:
+            # keys are ASCII, e.g. "٣" cannot match anything
+            return []
+        if not prefix:
+            return []
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LEN:
+            keys = snapshot["prefix_keys"]
+            index = int(np.searchsorted(keys, np.array(prefix, dtype=keys.dtype)))
+            if index == len(keys) or keys[index] != prefix:
+                return []
+            top = snapshot["prefix_top"][index, : self.limit]
+            return self._pairs(snapshot, top[top >= 0])
+
+        lo, hi = _prefix_range(snapshot["completion_keys"], prefix)
+        return self._pairs(
+            snapshot,
+            top_pairs(
+                snapshot["completion_ranks"][lo:hi],
+                snapshot["completion_pairs"][lo:hi],
+                self.limit,
+            ),
+        )
+
+
+place_autocomplete = PlaceAutocomplete()
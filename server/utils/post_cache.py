@@ -0,0 +1,100 @@
+import threading
+from collections import defaultdict
+
+from utils.cache import TTLCache
+from utils.events import post_changed, pet_changed, user_changed
+
+
+class PostDetailCache:
+    """Viewer-independent post detail documents, dropped when their data changes.
+
+    Every document remembers the pets and users it was built from, so a
+    `pet_changed`/`user_changed` event only evicts the posts that show them.
+    The events are local to the worker process; the ttl bounds how long the
+    other workers can serve a document that changed under them.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._docs = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # bumped on every invalidation, so a document built from data read
+        # before the change is not stored after it
+        self._generation = 0
+        self._deps = {}
+        self._posts_by_pet = defaultdict(set)
+        self._posts_by_user = defaultdict(set)
+
+    def get(self, post_id):
+        return self._docs.get(post_id)
+
+    def generation(self):
+        return self._generation
+
+    def set(self, post_id, doc, generation, pet_ids, user_ids):
+        with self._lock:
+            if generation != self._generation:
+                return
+
+            if len(self._deps) >= 2 * self._docs.maxsize:
+                self._prune()
+
+            self._docs.set(post_id, doc)
+            self._deps[post_id] = (set(pet_ids), set(user_ids))
+            for pet_id in pet_ids:
+                self._posts_by_pet[pet_id].add(post_id)
+            for user_id in user_ids:
+                self._posts_by_user[user_id].add(post_id)
+
+    def invalidate_post(self, post_id):
+        with self._lock:
+            self._generation += 1
+            self._drop(post_id)
+
+    def invalidate_pet(self, pet_id):
+        with self._lock:
+            self._generation += 1
+            for post_id in list(self._posts_by_pet.get(pet_id, ())):
+                self._drop(post_id)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._generation += 1
+            for post_id in list(self._posts_by_user.get(user_id, ())):
+                self._drop(post_id)
+
+    def _drop(self, post_id):
+        self._docs.pop(post_id)
+        pet_ids, user_ids = self._deps.pop(post_id, ((), ()))
+
+        for pet_id in pet_ids:
+            self._posts_by_pet[pet_id].discard(post_id)
+            if not self._posts_by_pet[pet_id]:
+                del self._posts_by_pet[pet_id]
+        for user_id in user_ids:
+            self._posts_by_user[user_id].discard(post_id)
+            if not self._posts_by_user[user_id]:
+                del self._posts_by_user[user_id]
+
+    def _prune(self):
+        # forget the dependencies of documents the ttl cache already let go
+        cached = set(self._docs.keys())
+        for post_id in [post_id for post_id in self._deps if post_id not in cached]:
+            self._drop(post_id)
+
+
+post_detail_cache = PostDetailCache(maxsize=2000, ttl=60)
+
+
+@post_changed.connect
+def _on_post_changed(post_id, **kwargs):
+    post_detail_cache.invalidate_post(post_id)
+
+
+@pet_changed.connect
+def _on_pet_changed(pet_id, **kwargs):
+    post_detail_cache.invalidate_pet(pet_id)
+
+
+@user_changed.connect
+def _on_user_changed(user_id, **kwargs):
+    post_detail_cache.invalidate_user(user_id)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from utils.reference_snapshot import get_reference_snapshot
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.195
+
+
+def _find(keys, key):
+    index = int(np.searchsorted(keys, np.array(key, dtype=keys.dtype)))
+    if index < len(keys) and keys[index] == key:
+        return index
+    return None
+
+
+class PostalCodeIndex:
+    """Coordinates and radius searches over DPostalCode.
+
+    Postal codes and place names are kept sorted in the shared reference
+    snapshot (utils/reference_snapshot.py) and found by bisection. For radius
+    searches the rows are also bucketed into a regular lat/lon grid sorted by
+    cell id, so a query only touches the cells overlapping the bounding box
+    and refines the candidates with a vectorized haversine distance.
+    """
+
+    def locate(self, city=None, postal_code=None):
+        """Return (latitude, longitude) of a postal code or a city, or None."""
+        snapshot = get_reference_snapshot()
+
+        if postal_code and len(postal_code.encode("utf-8")) <= 6:
+            index = _find(snapshot["code_keys"], postal_code.encode("utf-8"))
+            if index is not None:
+                coords = snapshot["code_coords"][index]
+                return float(coords["latitude"]), float(coords["longitude"])
+        if city:
+            place_id = snapshot.place_names.find(city)
+            if place_id is not None:
+                place = snapshot["places"][place_id]
+                return float(place["latitude"]), float(place["longitude"])
+        return None
+
+    def postal_codes_within(self, latitude, longitude, kms):
+        """Return sorted postal codes whose centre lies within `kms` of the point."""
+        snapshot = get_reference_snapshot()
+        grid = snapshot.meta["grid"]
+        cell_size, n_rows, n_cols = grid["cell_size"], grid["n_rows"], grid["n_cols"]
+
+        if n_rows == 0 or kms < 0:
+            return []
+
+        dlat = kms / KM_PER_DEGREE
+        dlon = kms / (KM_PER_DEGREE * max(np.cos(np.radians(latitude)), 1e-6))
+
+        row_lo = max(int((latitude - dlat - grid["lat_min"]) // cell_size), 0)
+        row_hi = min(int((latitude + dlat - grid["lat_min"]) // cell_size), n_rows - 1)
+        col_lo = max(int((longitude - dlon - grid["lon_min"]) // cell_size), 0)
+        col_hi = min(int((longitude + dlon - grid["lon_min"]) // cell_size), n_cols - 1)
+
+        if row_lo > row_hi or col_lo > col_hi:
+            return []
+
+        # cells of one grid row form a contiguous id range in the sorted array
+        cell_id = snapshot["grid_cells"]
+        row_base = np.arange(row_lo, row_hi + 1, dtype=np.int64) * n_cols
+        starts = np.searchsorted(cell_id, row_base + col_lo, side="left")
+        ends = np.searchsorted(cell_id, row_base + col_hi, side="right")
+        candidates = np.concatenate(
+            [np.arange(start, end) for start, end in zip(starts, ends)]
+        )
+
+        if candidates.size == 0:
+            return []
+
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = snapshot["grid_lat"][candidates], snapshot["grid_lon"][candidates]
+
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        codes = np.unique(snapshot["grid_codes"][candidates[distance <= kms]])
+        return [code.decode("utf-8") for code in codes]
+
+
+postal_index = PostalCodeIndex()
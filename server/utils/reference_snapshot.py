@@ -0,0 +1,394 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import sqlalchemy
+from flask import current_app
+
+from app import db
+from db_models.database_tables import DPostalCode, ReportType
+
+# Reference tables compiled into plain .npy files and mapped read-only by
+# every worker: the pages live once in the page cache instead of once per
+# process, and no Python objects are created per row, so copy-on-write has
+# nothing to copy.
+
+SNAPSHOT_FORMAT = 2
+CELL_SIZE_DEG = 0.25
+AUTOCOMPLETE_LIMIT = 20
+# autocomplete answers for prefixes up to this length are ranked at build time,
+# longer prefixes select few enough entries to rank per query
+PRECOMPUTED_PREFIX_LEN = 3
+
+# letters NFKD does not decompose into a base letter and a diacritic
+_FOLD = str.maketrans({"ł": "l", "Ł": "L"})
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Lowercase `text`, strip Polish diacritics and reduce separators to spaces."""
+    text = unicodedata.normalize("NFKD", text.translate(_FOLD))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+class StringTable:
+    """Strings packed into one UTF-8 blob, looked up by index.
+
+    Indexing returns bytes, so a table written in sorted order can be
+    searched with `bisect` directly.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = memoryview(blob)
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.blob[self.offsets[index] : self.offsets[index + 1]])
+
+    def get(self, index):
+        return self[index].decode("utf-8")
+
+    def get_many(self, indexes):
+        indexes = np.asarray(indexes, dtype=np.int64)
+        starts = self.offsets[indexes].tolist()
+        ends = self.offsets[indexes + 1].tolist()
+        return [
+            bytes(self.blob[start:end]).decode("utf-8")
+            for start, end in zip(starts, ends)
+        ]
+
+    def find(self, text):
+        """Index of `text` in a sorted table, or None."""
+        target = text.encode("utf-8")
+        index = bisect.bisect_left(self, target)
+        if index < len(self) and self[index] == target:
+            return index
+        return None
+
+    @staticmethod
+    def pack(strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(string) for string in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return blob, offsets
+
+
+def _compile_postal_codes(rows, arrays, meta):
+    """Grid, postal code and place arrays used by utils/postal_index.py."""
+    codes = np.array([row.postal_code for row in rows], dtype="S6")
+    lat = np.array([row.latitude for row in rows], dtype=np.float64)
+    lon = np.array([row.longitude for row in rows], dtype=np.float64)
+
+    lat_min = float(lat.min()) if len(rows) else 0.0
+    lon_min = float(lon.min()) if len(rows) else 0.0
+    cell_row = np.floor((lat - lat_min) / CELL_SIZE_DEG).astype(np.int64)
+    cell_col = np.floor((lon - lon_min) / CELL_SIZE_DEG).astype(np.int64)
+    n_rows = int(cell_row.max()) + 1 if len(rows) else 0
+    n_cols = int(cell_col.max()) + 1 if len(rows) else 0
+
+    cell_id = cell_row * n_cols + cell_col
+    order = np.argsort(cell_id, kind="stable")
+
+    arrays["grid_cells"] = cell_id[order]
+    arrays["grid_codes"] = codes[order]
+    arrays["grid_lat"] = np.radians(lat[order])
+    arrays["grid_lon"] = np.radians(lon[order])
+    meta["grid"] = {
+        "cell_size": CELL_SIZE_DEG,
+        "lat_min": lat_min,
+        "lon_min": lon_min,
+        "n_rows": n_rows,
+        "n_cols": n_cols,
+    }
+
+    # first row (by postal_code_id) wins, same as the old .first() lookup
+    by_code = {}
+    by_place = {}
+    for row in rows:
+        by_code.setdefault(row.postal_code, (row.latitude, row.longitude))
+        by_place.setdefault(row.place, (row.latitude, row.longitude))
+
+    code_keys = sorted(by_code)
+    arrays["code_keys"] = np.array(code_keys, dtype="S6")
+    arrays["code_coords"] = np.array(
+        [by_code[code] for code in code_keys],
+        dtype=[("latitude", "<f8"), ("longitude", "<f8")],
+    )
+
+    # place ids are positions in UTF-8 byte order, so the name table is searchable
+    place_names = sorted(by_place, key=lambda place: place.encode("utf-8"))
+    code_count = Counter(place for place, _ in {(r.place, r.postal_code) for r in rows})
+    arrays["place_names_blob"], arrays["place_names_offsets"] = StringTable.pack(
+        place_names
+    )
+    arrays["places"] = np.array(
+        [(*by_place[place], code_count[place]) for place in place_names],
+        dtype=[("latitude", "<f8"), ("longitude", "<f8"), ("code_count", "<i4")],
+    )
+
+    return {place: place_id for place_id, place in enumerate(place_names)}
+
+
+def _compile_autocomplete(rows, place_ids, arrays):
+    """Prefix arrays used by utils/place_autocomplete.py."""
+    place_names = sorted(place_ids, key=place_ids.get)
+    pairs = sorted({(row.postal_code, place_ids[row.place]) for row in rows})
+    arrays["pair_codes"] = np.array([code for code, _ in pairs], dtype="S6")
+    arrays["pair_places"] = np.array([place for _, place in pairs], dtype=np.int32)
+
+    by_digits = sorted(
+        range(len(pairs)),
+        key=lambda pair: (
+            re.sub(r"\D", "", pairs[pair][0]),
+            place_names[pairs[pair][1]],
+            pairs[pair][0],
+        ),
+    )
+    arrays["digit_keys"] = np.array(
+        [re.sub(r"\D", "", pairs[pair][0]) for pair in by_digits], dtype="S5"
+    )
+    arrays["digit_pairs"] = np.array(by_digits, dtype=np.int32)
+
+    code_count = arrays["places"]["code_count"]
+    entries = []
+    for pair, (postal_code, place_id) in enumerate(pairs):
+        words = normalize(place_names[place_id]).split(" ")
+        for position in range(len(words)):
+            # matches on the first word go before matches inside the name,
+            # then bigger places (more postal codes) first
+            rank_key = (position > 0, -code_count[place_id], place_id, postal_code)
+            entries.append((" ".join(words[position:]), rank_key, pair))
+
+    # rank = position in relevance order, smaller is better
+    by_relevance = sorted(range(len(entries)), key=lambda i: entries[i][1])
+    rank = np.empty(len(entries), dtype=np.int32)
+    rank[by_relevance] = np.arange(len(entries), dtype=np.int32)
+
+    by_key = sorted(range(len(entries)), key=lambda i: entries[i][0])
+    width = max((len(entry[0]) for entry in entries), default=1)
+    keys = np.array([entries[i][0] for i in by_key], dtype=f"S{width}")
+    ranks = rank[by_key]
+    entry_pairs = np.array([entries[i][2] for i in by_key], dtype=np.int32)
+    arrays["completion_keys"] = keys
+    arrays["completion_ranks"] = ranks
+    arrays["completion_pairs"] = entry_pairs
+
+    prefixes = {}
+    for length in range(1, PRECOMPUTED_PREFIX_LEN + 1):
+        unique, starts = np.unique(keys.astype(f"S{length}"), return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        for prefix, start, end in zip(unique, starts, ends):
+            if prefix in prefixes:
+                # a key shorter than `length`, its range was ranked already
+                continue
+            prefixes[prefix] = top_pairs(
+                ranks[start:end], entry_pairs[start:end], AUTOCOMPLETE_LIMIT
+            )
+
+    prefix_keys = sorted(prefixes)
+    prefix_top = np.full((len(prefix_keys), AUTOCOMPLETE_LIMIT), -1, dtype=np.int32)
+    for row, prefix in enumerate(prefix_keys):
+        top = prefixes[prefix]
+        prefix_top[row, : len(top)] = top
+    arrays["prefix_keys"] = np.array(prefix_keys, dtype=f"S{PRECOMPUTED_PREFIX_LEN}")
+    arrays["prefix_top"] = prefix_top
+
+
+def top_pairs(ranks, pairs, limit):
+    """Distinct pairs of the `limit` best ranked entries of a prefix range."""
+    if len(ranks) > limit * 2:
+        # a pair shows up twice only if two of its words share the prefix
+        best = np.argpartition(ranks, limit * 2)[: limit * 2]
+    else:
+        best = np.arange(len(ranks))
+    best = best[np.argsort(ranks[best])]
+
+    top = []
+    for pair in pairs[best]:
+        if pair not in top:
+            top.append(int(pair))
+            if len(top) == limit:
+                break
+    return top
+
+
+def _compile_report_types(connection, arrays):
+    report_types = connection.execute(
+        sqlalchemy.select(
+            ReportType.report_type_id, ReportType.report_type_name
+        ).order_by(ReportType.report_type_id)
+    ).all()
+    arrays["report_type_ids"] = np.array(
+        [report_type.report_type_id for report_type in report_types], dtype=np.int32
+    )
+    (
+        arrays["report_type_names_blob"],
+        arrays["report_type_names_offsets"],
+    ) = StringTable.pack([report_type.report_type_name for report_type in report_types])
+
+
+def build_snapshot(path):
+    """Compile the reference tables into the snapshot at `path`.
+
+    `path` is a symlink to a versioned directory next to it. A new snapshot
+    is written into a directory of its own and the link is switched with one
+    os.replace, so a worker opening the snapshot sees either version whole.
+    Only versions older than the one just replaced are deleted.
+    """
+    # a connection of its own: a worker may build it in the middle of a
+    # request, whose session must not be committed or rolled back here
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            sqlalchemy.select(
+                DPostalCode.postal_code,
+                DPostalCode.place,
+                DPostalCode.latitude,
+                DPostalCode.longitude,
+            ).order_by(DPostalCode.postal_code_id)
+        ).all()
+
+        arrays = {}
+        meta = {"format": SNAPSHOT_FORMAT, "autocomplete_limit": AUTOCOMPLETE_LIMIT}
+        place_ids = _compile_postal_codes(rows, arrays, meta)
+        _compile_autocomplete(rows, place_ids, arrays)
+        _compile_report_types(connection, arrays)
+
+    # the ETag of the dictionary routes, see utils/http_cache.py
+    checksum = hashlib.sha256()
+    for name in sorted(arrays):
+        checksum.update(name.encode("utf-8"))
+        checksum.update(np.ascontiguousarray(arrays[name]).tobytes())
+    meta["checksum"] = checksum.hexdigest()
+
+    path = os.path.abspath(path)
+    parent, link_name = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    version_prefix = f".{link_name}-"
+    version = os.path.join(
+        parent, f"{version_prefix}{SNAPSHOT_FORMAT}-{meta['checksum'][:16]}"
+    )
+
+    if not os.path.isdir(version):
+        staging = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(staging, version)
+        except OSError:
+            # another process has built the same version first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(version):
+                raise
+
+    previous = None
+    if os.path.islink(path):
+        previous = os.path.join(parent, os.readlink(path))
+    elif os.path.isdir(path):
+        # a snapshot directory from before the versioned layout
+        previous = os.path.join(parent, f"{version_prefix}legacy-{os.getpid()}")
+        os.rename(path, previous)
+
+    link = os.path.join(parent, f".{link_name}.link-{os.getpid()}")
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, path)
+
+    # a worker may still be opening `previous`, the ones before it are done;
+    # a concurrent build may have switched the link again in the meantime
+    keep = {os.readlink(path), os.path.basename(version)}
+    if previous:
+        keep.add(os.path.basename(previous))
+    for name in os.listdir(parent):
+        if name.startswith(version_prefix) and name not in keep:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+class ReferenceSnapshot:
+    def __init__(self, path):
+        # one version throughout, even if the link is switched meanwhile
+        path = os.path.realpath(path)
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        if self.meta.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported reference snapshot format in {path}")
+
+        # plain ndarray views of the mappings, np.memmap indexing is much slower
+        self.arrays = {
+            name[: -len(".npy")]: np.asarray(
+                np.load(os.path.join(path, name), mmap_mode="r")
+            )
+            for name in os.listdir(path)
+            if name.endswith(".npy")
+        }
+        self.place_names = StringTable(
+            self.arrays["place_names_blob"], self.arrays["place_names_offsets"]
+        )
+        self.report_type_names = StringTable(
+            self.arrays["report_type_names_blob"],
+            self.arrays["report_type_names_offsets"],
+        )
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+
+def snapshot_format(path):
+    """Format of the snapshot in `path`, or None if there is none."""
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            return json.load(f).get("format")
+    except FileNotFoundError:
+        return None
+
+
+_snapshot_lock = threading.Lock()
+
+
+def get_reference_snapshot():
+    """The snapshot of this app, built first if nobody has built it yet.
+
+    gunicorn builds it in the master before forking (gunicorn_config.py),
+    so workers only map it; if the master could not reach the database, the
+    first worker that needs it builds it.
+    """
+    snapshot = current_app.extensions.get("reference_snapshot")
+    if snapshot is not None:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = current_app.extensions.get("reference_snapshot")
+        if snapshot is None:
+            path = current_app.config["REFERENCE_SNAPSHOT_PATH"]
+            # a snapshot left by an older release is rebuilt like a missing one
+            if snapshot_format(path) != SNAPSHOT_FORMAT:
+                try:
+                    build_snapshot(path)
+                except OSError:
+                    # another worker has moved its build into place first
+                    if snapshot_format(path) != SNAPSHOT_FORMAT:
+                        raise
+            try:
+                snapshot = ReferenceSnapshot(path)
+            except FileNotFoundError:
+                # the version it resolved to was deleted under it, the link
+                # points to a newer one by now
+                snapshot = ReferenceSnapshot(path)
+            current_app.extensions["reference_snapshot"] = snapshot
+    return snapshot
@@ -15,3 +15,50 @@ def resize_image(image, size=(400, 400)):
     img_io.seek(0)  # Go to the beginning of the BytesIO object
 
     return img_io
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def resize_image_variants(image, sizes, max_pixels=None):
+    """Decode the image once and return {size: WebP BytesIO} for every size.
+
+    The header is checked against `max_pixels` before any pixel data is
+    decoded, and JPEGs are decoded straight at the smallest DCT scale that
+    still covers the largest variant, so a 48 MP photo never lands in memory
+    at full resolution.
+    """
+    img = Image.open(image)
+
+    width, height = img.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLarge(f"{width}x{height} exceeds {max_pixels} pixels")
+
+    largest = max(sizes)
+    img.draft("RGB", (largest, largest))
+    img = img.convert("RGB")
+
+    variants = {}
+    # each thumbnail is taken from the previous, larger one
+    for size in sorted(sizes, reverse=True):
+        img.thumbnail((size, size), reducing_gap=3.0)
+
+        img_io = io.BytesIO()
+        img.save(img_io, "WEBP", quality=80)
+        img_io.seek(0)
+        variants[size] = img_io
+
+    return variants
+
+
+def process_image(source, sizes, max_pixels=None):
+    """Turn an upload (file path or bytes) into {size: WebP bytes}.
+
+    Only takes picklable arguments so it can run in a process pool.
+    """
+    image = source if isinstance(source, str) else io.BytesIO(source)
+    return {
+        size: img_io.getvalue()
+        for size, img_io in resize_image_variants(image, sizes, max_pixels).items()
+    }